@@ -5,6 +5,7 @@ import os
 import streamlit as st
 
 from config.logging import setup_logging
+from config.settings import TRANSCRIPT_STORE_PATH
 from hackathon.transcripts.transcript_handling import Transcript
 
 get_logger = setup_logging()
@@ -83,8 +84,13 @@ with st.expander("#### Upload audio recording", expanded=False):
 with st.expander("#### Upload transcript", expanded=False):
     data_path = st.file_uploader(label="Upload transcript")
     if data_path is not None:
-        transcript = Transcript(data_path)
-        data = transcript.data
+        # keep the parsed transcript across reruns until a different file is uploaded
+        if st.session_state.get("transcript_file_id") != data_path.file_id:
+            st.session_state.transcript = Transcript(data_path)
+            st.session_state.transcript_file_id = data_path.file_id
+        transcript = st.session_state.transcript
+        # plain strings so the editor can assign speakers not already in the transcript
+        data = transcript.data.astype({"Speaker": str})
         st.session_state["transcript_uploaded"] = True
 
 with st.expander("#### Edit meeting attendees", expanded=False):
@@ -111,6 +117,14 @@ with st.expander("#### Edit meeting transcript", expanded=False):
         )
         if st.button("Approve transcript", type="primary"):
             transcript.update_data(st_transcript_table)
+            # stored as arrow so reopening the meeting is a memory map, not a csv parse
+            os.makedirs(TRANSCRIPT_STORE_PATH, exist_ok=True)
+            transcript.save_transcript(
+                os.path.join(
+                    TRANSCRIPT_STORE_PATH,
+                    os.path.splitext(data_path.name)[0] + ".arrow",
+                )
+            )
             st.success("Transcription approved")
             st.download_button(
                 "Download transcript as .txt file",
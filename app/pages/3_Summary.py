@@ -3,20 +3,26 @@ import datetime as dt
 import io
 import os
 import time
+from typing import Iterator
 
 import streamlit as st
 from PIL import Image
 
 from config.logging import setup_logging
-from config.settings import ENV
-from hackathon.llm.llm_api import conversation_api, fact_check_api, glossery_api, summary_api
+from config.settings import ENV, TRANSCRIPT_STORE_PATH
+from hackathon.llm.conversation import ConversationSession
+from hackathon.llm.llm_api import conversation_api
+from hackathon.llm.llm_orchestrator import summary_orchestrator
+from hackathon.llm.response_cache import make_cache_key, response_cache
 from hackathon.transcripts.transcript_handling import Transcript
+from hackathon.vectorstore.query_cache import query_cache
 
 get_logger = setup_logging()
 logger = get_logger(__name__)
 
 st.set_page_config(page_title="QuickQuill", page_icon="memo", layout="wide")
 
+
 # Image loading
 def image_to_base64(image):
     buffered = io.BytesIO()
@@ -101,48 +107,45 @@ st.markdown(
 
 
 def llm_summarise(transcript: str) -> str:
-    post_response = summary_api.invoke_post(transcript)
-    fact_check_response = fact_check_api.invoke_post(transcript)
-    conversation_response = conversation_api.invoke_post(transcript)
-    time.sleep(20)
-
-    get_summary_response = summary_api.invoke_get(post_response["conversationId"])
-    get_fact_response = fact_check_api.invoke_get(fact_check_response["conversationId"])
-
-    post_glossary = glossery_api.invoke_post(get_summary_response)
-    time.sleep(25)
-    time.sleep(25)
-    get_glossary = glossery_api.invoke_get(post_glossary["conversationId"])
-    conversation_api.invoke_get(conversation_response["conversationId"])
-    conversation_api.invoke_get(conversation_response["conversationId"])
-    return {
-        "summary": get_summary_response,
-        "facts": get_fact_response,
-        "glossary": get_glossary,
-        "conversationConversationId": conversation_response["conversationId"],
-        "conversationConversationId": conversation_response["conversationId"],
-    }
-        "summary": get_summary_response,
-        "facts": get_fact_response,
-        "glossary": get_glossary,
-        "conversationConversationId": conversation_response["conversationId"],
-    }
-
-
-
-def query_llm(prompt: str, transcript: str, conversationId) -> str:
-    query = f"With knowledge of this transcript:\n{transcript}\n\nAnswer this query: {prompt}"
-    print(query)
-    query_response = conversation_api.invoke_post(query, conversationId)
-    time.sleep(15)
-    chat_response = conversation_api.invoke_get(query_response["conversationId"])
-    return chat_response
-
-data= ""
+    return summary_orchestrator.run(transcript)
+
+
+def query_llm(
+    prompt: str, transcript: str, session: ConversationSession
+) -> Iterator[str]:
+    if response_cache is not None:
+        cache_key = make_cache_key(transcript, "query", prompt)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            yield cached_response
+            return
+    start = time.perf_counter()
+    chat_response = ""
+    for chunk in session.stream_query(prompt):
+        chat_response += chunk
+        yield chunk
+    if response_cache is not None:
+        response_cache.set(cache_key, chat_response, time.perf_counter() - start)
+
+
+data = ""
 with st.expander("#### Upload transcript", expanded=True):
     data_path = st.file_uploader(label="Upload transcript:")
+    approved_transcripts = []
+    if os.path.isdir(TRANSCRIPT_STORE_PATH):
+        approved_transcripts = sorted(os.listdir(TRANSCRIPT_STORE_PATH))
+    approved_transcript = st.selectbox(
+        "Or open an approved transcript:", [""] + approved_transcripts
+    )
+    if data_path is None and approved_transcript:
+        data_path = os.path.join(TRANSCRIPT_STORE_PATH, approved_transcript)
     if data_path is not None:
-        transcript = Transcript(data_path)
+        # keep the parsed transcript across reruns until a different file is chosen
+        file_id = getattr(data_path, "file_id", data_path)
+        if st.session_state.get("transcript_file_id") != file_id:
+            st.session_state.transcript = Transcript(data_path)
+            st.session_state.transcript_file_id = file_id
+        transcript = st.session_state.transcript
         data = str(transcript)
         st.session_state.transcript_uploaded = True
 
@@ -156,10 +159,11 @@ with st.expander("#### Generate summary", expanded=True):
             if not st.session_state.summary_generated:
                 returned_data = llm_summarise(transcript=data)
                 st.session_state.returned_data = returned_data
-            returned_data = st.session_state.returned_data
-            if not st.session_state.summary_generated:
-                returned_data = llm_summarise(transcript=data)
-                st.session_state.returned_data = returned_data
+                st.session_state.conversation_session = ConversationSession(
+                    conversation_api,
+                    data,
+                    conversation_id=returned_data["conversationConversationId"],
+                )
             returned_data = st.session_state.returned_data
             st.session_state.summary_generated = True
             st.markdown(returned_data["summary"])
@@ -167,11 +171,34 @@ with st.expander("#### Generate summary", expanded=True):
             st_query_button = st.button("Query LLM")
             if st_query_button and prompt != "":
                 st.session_state.chat_history += f"User: {prompt}\n\n"
-                st.session_state.chat_history += f"Claude: {query_llm(prompt, data, conversationId=returned_data['conversationConversationId'])}\n\n"
-                st.session_state.chat_history += f"Claude: {query_llm(prompt, data, conversationId=returned_data['conversationConversationId'])}\n\n"
                 st.markdown(st.session_state.chat_history)
+                chat_response = st.write_stream(
+                    query_llm(prompt, data, st.session_state.conversation_session)
+                )
+                st.session_state.chat_history += f"Claude: {chat_response}\n\n"
             # TODO: Add button to download summary as txt file
 
+if response_cache is not None:
+    cache_stats = response_cache.stats()
+    st.sidebar.caption(
+        f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['seconds_saved']:.0f}s saved"
+    )
+if query_cache is not None:
+    results_stats = query_cache.results.stats()
+    embedding_stats = query_cache.embeddings.stats()
+    seconds_saved = results_stats["seconds_saved"] + embedding_stats["seconds_saved"]
+    st.sidebar.caption(
+        f"Search cache: {results_stats['hits']} hits, {results_stats['misses']} misses, "
+        f"{embedding_stats['hits']} query embeddings reused, {seconds_saved:.0f}s saved"
+    )
+if "conversation_session" in st.session_state:
+    token_stats = st.session_state.conversation_session.stats()
+    st.sidebar.caption(
+        f"Chat tokens: {token_stats['tokens_sent']} sent, "
+        f"{token_stats['tokens_saved']} saved over {token_stats['queries']} queries"
+    )
+
 with st.expander("#### Identify facts", expanded=False):
     if returned_data.get("facts") and st.session_state.summary_generated:
         returned_data = st.session_state.returned_data
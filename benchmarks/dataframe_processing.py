@@ -0,0 +1,100 @@
+"""
+Benchmark of `Processor._dataframe_process` against the row by row implementation it replaced,
+on synthetic rows of a csv source.
+
+Run from the repo root with:
+    python -m benchmarks.dataframe_processing
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.loader.processors import CSVProcessor
+
+SIZES = [10_000, 100_000, 1_000_000]
+CONTENT_COLUMNS = ["title", "description"]
+METADATA_COLUMNS = ["grade", "salary", "department", "location"]
+KEY_COLUMNS = ["id"]
+
+
+def synthetic_rows(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(["policy", "data", "analyst", "senior", "digital", "lead", "team"])
+    description = [" ".join(rng.choice(words, 20)) for _ in range(n_rows)]
+    return pd.DataFrame(
+        {
+            "id": np.arange(n_rows),
+            "title": rng.choice(["Data Analyst ", " Policy Lead", "Engineer"], n_rows),
+            "description": description,
+            "grade": rng.integers(1, 8, n_rows),
+            "salary": rng.normal(45_000, 8_000, n_rows).round(2),
+            "department": rng.choice(["DfT", "HMRC", "DWP", "MoJ"], n_rows),
+            "location": rng.choice(["London", "Leeds", "Cardiff", None], n_rows),
+        }
+    )
+
+
+def legacy_dataframe_process(processor: CSVProcessor, df: pd.DataFrame):
+    """The row by row implementation, with four applies over the rows."""
+
+    def process_metadata(row):
+        metadata = {}
+        for col in processor.metadata_columns:
+            value = row[col]
+            if isinstance(value, int):
+                metadata[col] = int(value)
+            elif isinstance(value, float):
+                metadata[col] = float(value)
+            elif isinstance(value, list):
+                metadata[col] = list(value)
+            else:
+                metadata[col] = str(value)
+        return metadata
+
+    df["content"] = df.apply(
+        lambda row: "\n".join(
+            [str(row[col]).strip() for col in processor.content_columns]
+        ),
+        axis=1,
+    )
+    df["metadata"] = df.apply(process_metadata, axis=1)
+    df["metadata"] = df["metadata"].apply(lambda x: None if pd.isna(x) else x)
+    docs = df.apply(
+        lambda row: Document(page_content=row["content"], metadata=row["metadata"]),
+        axis=1,
+    ).tolist()
+    keys = df[processor.key_columns].astype(str).agg("|".join, axis=1)
+    for doc, key in zip(docs, keys):
+        doc.metadata[SOURCE_KEY_FIELD] = key
+    return docs
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    processor = CSVProcessor(
+        metadata_columns=METADATA_COLUMNS,
+        content_columns=CONTENT_COLUMNS,
+        key_columns=KEY_COLUMNS,
+    )
+    print(f"{'rows':>10} {'row by row':>11} {'vectorised':>11} {'speedup':>8}")
+    for n_rows in SIZES:
+        df = synthetic_rows(n_rows)
+        docs, vectorised = timed(processor._dataframe_process, df.copy())
+        legacy_docs, legacy = timed(legacy_dataframe_process, processor, df.copy())
+        assert docs == legacy_docs
+        print(
+            f"{n_rows:>10} {legacy:>10.2f}s {vectorised:>10.2f}s {legacy / vectorised:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark of `BatchingEmbeddings` against a local stub of a sagemaker embeddings endpoint.
+
+Run from the repo root with:
+    python -m benchmarks.embedding_batching
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+from langchain.embeddings import SagemakerEndpointEmbeddings
+
+from hackathon.vectorstore.embeddings import BatchingEmbeddings, ContentHandler
+
+N_TEXTS = 2_000
+DIMENSIONS = 384
+# fixed cost of a request to the endpoint, plus a cost per text embedded
+REQUEST_LATENCY = 0.02
+TEXT_LATENCY = 0.0002
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stub of the sagemaker runtime invocations api which counts the requests sent to it."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["text_inputs"]
+        with StubHandler.lock:
+            StubHandler.requests += 1
+        time.sleep(REQUEST_LATENCY + TEXT_LATENCY * len(texts))
+        data = json.dumps(
+            {"embedding": [[float(len(t))] * DIMENSIONS for t in texts]}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_embeddings(url: str) -> SagemakerEndpointEmbeddings:
+    client = boto3.client(
+        "sagemaker-runtime",
+        region_name="eu-west-2",
+        endpoint_url=url,
+        aws_access_key_id="stub",
+        aws_secret_access_key="stub",
+    )
+    return SagemakerEndpointEmbeddings(
+        endpoint_name="stub",
+        region_name="eu-west-2",
+        client=client,
+        content_handler=ContentHandler(),
+        model_kwargs={"mode": "embedding"},
+    )
+
+
+def measure(name, embeddings, texts):
+    StubHandler.requests = 0
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+    print(
+        f"{name:<32} {StubHandler.requests:>4} requests  {elapsed:.3f}s"
+        f"  {len(texts) / elapsed:>8.0f} texts/s"
+    )
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    texts = [f"chunk {i} " + "word " * (i % 200) for i in range(N_TEXTS)]
+    embeddings = stub_embeddings(url)
+    try:
+        measure("SagemakerEndpointEmbeddings", embeddings, texts)
+        measure(
+            "batched, 1 in flight",
+            BatchingEmbeddings(embeddings, max_in_flight=1),
+            texts,
+        )
+        measure("batched, 4 in flight", BatchingEmbeddings(embeddings), texts)
+        measure(
+            "batched, 256 per request",
+            BatchingEmbeddings(embeddings, max_batch_size=256),
+            texts,
+        )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
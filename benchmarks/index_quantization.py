@@ -0,0 +1,169 @@
+"""
+Benchmark of recall against latency and memory of the index configurations of `IndexConfig`:
+float32, fp16 and byte vectors, with and without PCA.
+
+The corpus is the local embedding cache when it holds vectors, synthetic embeddings otherwise.
+By default each configuration is simulated with numpy, storing the vectors as the index would
+and searching them exactly, which isolates the recall lost to quantisation and PCA. Pass an
+opensearch url to build a real index of each configuration and sweep ef_search as well.
+
+Run from the repo root with:
+    python -m benchmarks.index_quantization [--opensearch http://localhost:9200]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+from opensearchpy import OpenSearch
+from opensearchpy.helpers import bulk
+
+from config.settings import EMBEDDING_CACHE_PATH, OPENSEARCH_BATCH_SIZE
+from hackathon.vectorstore.embedding_cache import EmbeddingStore
+from hackathon.vectorstore.index_config import IndexConfig
+
+N_ROWS = 20_000
+DIMENSIONS = 384
+N_QUERIES = 200
+K = 10
+CONFIGS = {
+    "float32": IndexConfig(quantization="", pca_dimensions=0),
+    "fp16": IndexConfig(quantization="fp16", pca_dimensions=0),
+    "byte": IndexConfig(quantization="byte", pca_dimensions=0),
+    "pca 128": IndexConfig(quantization="", pca_dimensions=128),
+    "pca 128 fp16": IndexConfig(quantization="fp16", pca_dimensions=128),
+    "pca 128 byte": IndexConfig(quantization="byte", pca_dimensions=128),
+}
+EF_SEARCHES = [16, 64, 256]
+BYTES_PER_VALUE = {"": 4, "fp16": 2, "byte": 1}
+
+
+def synthetic_embeddings(n_rows: int, seed: int = 0) -> np.ndarray:
+    """Vectors scattered around topics, as sentence embeddings of a corpus are."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(10, n_rows // 100), DIMENSIONS))
+    vectors = topics[rng.integers(len(topics), size=n_rows)]
+    vectors += rng.normal(size=vectors.shape)
+    return vectors.astype(np.float32)
+
+
+def load_corpus() -> np.ndarray:
+    """Vectors of the local embedding cache, or synthetic embeddings if it is empty."""
+    directories = glob.glob(os.path.join(EMBEDDING_CACHE_PATH, "*", "meta.json"))
+    for directory in map(os.path.dirname, directories if EMBEDDING_CACHE_PATH else []):
+        store = EmbeddingStore(directory)
+        if len(store) >= 2 * N_QUERIES:
+            print(f"Corpus of {len(store)} vectors from {directory}")
+            return store.get(list(store._rows))
+    print(f"Corpus of {N_ROWS} synthetic vectors")
+    return synthetic_embeddings(N_ROWS)
+
+
+def nearest(vectors: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Rows of the K vectors nearest each query by l2 distance."""
+    distances = (
+        (queries**2).sum(axis=1, keepdims=True)
+        - 2 * queries @ vectors.T
+        + (vectors**2).sum(axis=1)
+    )
+    return np.argsort(distances, axis=1)[:, :K]
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+
+
+def stored(config: IndexConfig, vectors: np.ndarray, queries: np.ndarray):
+    """Vectors and queries as an index of config stores and searches them."""
+    # fitted to the first batch, as an ingestion does
+    transform = config.fit_transform(vectors[:OPENSEARCH_BATCH_SIZE])
+    vectors = np.asarray(transform.apply(vectors), dtype=np.float32)
+    queries = np.asarray(transform.apply(queries), dtype=np.float32)
+    if config.quantization == "fp16":
+        vectors = vectors.astype(np.float16).astype(np.float32)
+    return vectors, queries
+
+
+def simulate(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray) -> None:
+    print(f"{'config':>14} {'bytes/vector':>13} {'latency':>10} {'recall':>7}")
+    for name, config in CONFIGS.items():
+        index_vectors, index_queries = stored(config, vectors, queries)
+        start = time.perf_counter()
+        found = nearest(index_vectors, index_queries)
+        latency = (time.perf_counter() - start) / len(queries)
+        size = index_vectors.shape[1] * BYTES_PER_VALUE[config.quantization]
+        print(
+            f"{name:>14} {size:>13} {latency * 1000:>8.3f}ms {recall(found, truth):>7.3f}"
+        )
+
+
+def benchmark_opensearch(
+    url: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray
+) -> None:
+    client = OpenSearch(url, timeout=120)
+    print(f"{'config':>14} {'ef_search':>9} {'latency':>10} {'recall':>7}")
+    for name, config in CONFIGS.items():
+        index_name = f"benchmark-{name.replace(' ', '-')}"
+        transform = config.fit_transform(vectors[:OPENSEARCH_BATCH_SIZE])
+        index_vectors = transform.apply(vectors)
+        index_queries = transform.apply(queries)
+        if client.indices.exists(index=index_name):
+            client.indices.delete(index=index_name)
+        client.indices.create(
+            index=index_name, body=config.mapping(len(index_vectors[0]))
+        )
+        bulk(
+            client,
+            (
+                {"_index": index_name, "_id": str(i), "vector_field": vector}
+                for i, vector in enumerate(index_vectors)
+            ),
+            chunk_size=OPENSEARCH_BATCH_SIZE,
+        )
+        client.indices.refresh(index=index_name)
+        try:
+            for ef_search in EF_SEARCHES:
+                client.indices.put_settings(
+                    index=index_name,
+                    body={"index": {"knn.algo_param.ef_search": ef_search}},
+                )
+                found, took = [], 0
+                for query in index_queries:
+                    response = client.search(
+                        index=index_name,
+                        body={
+                            "size": K,
+                            "_source": False,
+                            "query": {
+                                "knn": {"vector_field": {"vector": query, "k": K}}
+                            },
+                        },
+                    )
+                    found.append([int(hit["_id"]) for hit in response["hits"]["hits"]])
+                    took += response["took"]
+                print(
+                    f"{name:>14} {ef_search:>9} {took / len(queries):>8.3f}ms"
+                    f" {recall(found, truth):>7.3f}"
+                )
+        finally:
+            client.indices.delete(index=index_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--opensearch", help="url of an opensearch cluster to index")
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    vectors = load_corpus()
+    queries = vectors[rng.integers(len(vectors), size=N_QUERIES)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    truth = nearest(vectors, queries)
+    simulate(vectors, queries, truth)
+    if args.opensearch:
+        benchmark_opensearch(args.opensearch, vectors, queries, truth)
+
+
+if __name__ == "__main__":
+    main()
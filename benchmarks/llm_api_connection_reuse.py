@@ -0,0 +1,129 @@
+"""
+Benchmark of connection reuse in `hackathon.llm.llm_api` against a local stub of the chat backend.
+
+Run from the repo root with:
+    python -m benchmarks.llm_api_connection_reuse
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from hackathon.llm.llm_api import API, AsyncAPI, create_async_client, create_session
+
+N_REQUESTS = 200
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive stub of the chat backend which counts the connections opened to it."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubHandler.lock:
+            StubHandler.connections += 1
+
+    def _reply(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self._reply({"conversationId": "stub", "messageId": "user"})
+
+    def do_GET(self):
+        self._reply(
+            {
+                "lastMessageId": "bot",
+                "messageMap": {
+                    "bot": {
+                        "role": "assistant",
+                        "parent": "user",
+                        "content": [{"body": "stub reply"}],
+                    }
+                },
+            }
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = N_REQUESTS
+
+
+class UnpooledAPI(API):
+    """The previous behaviour of `API`, a new connection for every request."""
+
+    def invoke_post(self, message, conversation_id=None):
+        response = requests.post(
+            self.url + "/conversation",
+            json=self.post_data(message, conversation_id),
+            headers=self.headers,
+        )
+        return response.json()
+
+    def get_conversation(self, conversation_id):
+        response = requests.get(
+            self.url + "/conversation/" + conversation_id, headers=self.headers
+        )
+        return response.json()
+
+
+def run_sync(api: API):
+    for _ in range(N_REQUESTS // 2):
+        post_response = api.invoke_post("transcript")
+        api.get_response(post_response["conversationId"], post_response["messageId"])
+
+
+async def run_async(url: str):
+    async with create_async_client() as client:
+        api = AsyncAPI(API("key", url), client)
+
+        async def ask():
+            post_response = await api.invoke_post("transcript")
+            await api.get_response(
+                post_response["conversationId"], post_response["messageId"]
+            )
+
+        await asyncio.gather(*(ask() for _ in range(N_REQUESTS // 2)))
+
+
+def measure(name, func, *args):
+    StubHandler.connections = 0
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<24} {N_REQUESTS} requests  {StubHandler.connections:>4} connections"
+        f"  {elapsed:.3f}s"
+    )
+
+
+def main():
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        measure("requests (no pooling)", run_sync, UnpooledAPI("key", url))
+        measure("API (pooled session)", run_sync, API("key", url, create_session()))
+        measure("AsyncAPI (httpx pool)", lambda: asyncio.run(run_async(url)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of query latency and recall of `NumpyVectorSearch` on synthetic clustered embeddings.
+
+Run from the repo root with:
+    python -m benchmarks.local_vector_store
+"""
+
+import time
+
+import numpy as np
+
+from hackathon.vectorstore.local_vectorstore import NumpyVectorSearch
+
+DIMENSIONS = 384
+SIZES = [1_000, 10_000, 100_000]
+N_QUERIES = 200
+K = 10
+NPROBES = [4, 8, 16, 32]
+
+
+def synthetic_embeddings(n_rows: int, seed: int = 0) -> np.ndarray:
+    """Vectors scattered around topics, as sentence embeddings of a corpus are."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(10, n_rows // 100), DIMENSIONS))
+    vectors = topics[rng.integers(len(topics), size=n_rows)]
+    vectors += rng.normal(size=vectors.shape)
+    return vectors.astype(np.float32)
+
+
+def build(vectors: np.ndarray, **kwargs) -> NumpyVectorSearch:
+    store = NumpyVectorSearch(embedding_function=None, **kwargs)
+    ids = [str(i) for i in range(len(vectors))]
+    store.add_vectors(vectors, ids, ids=ids)
+    return store
+
+
+def timed_search(store: NumpyVectorSearch, queries: np.ndarray, **kwargs):
+    # one query at a time, as the app searches
+    start = time.perf_counter()
+    results = [store.search_by_vectors([q], K, **kwargs)[0] for q in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def recall(results, truth) -> float:
+    return np.mean(
+        [
+            len({d.page_content for d, _ in r} & {d.page_content for d, _ in t}) / K
+            for r, t in zip(results, truth)
+        ]
+    )
+
+
+def main():
+    rng = np.random.default_rng(1)
+    print(f"{'rows':>8} {'search':>12} {'latency':>10} {'recall':>7}")
+    for n_rows in SIZES:
+        vectors = synthetic_embeddings(n_rows)
+        queries = vectors[rng.integers(n_rows, size=N_QUERIES)]
+        queries += 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+        store = build(vectors, ann_threshold=0)
+        truth, exact = timed_search(store, queries, exact=True)
+        print(f"{n_rows:>8} {'exact':>12} {exact * 1000:>8.3f}ms {1.0:>7.3f}")
+        store.search_by_vectors(queries[:1], K)  # trains the IVF lists
+        for nprobe in NPROBES:
+            store.nprobe = nprobe
+            results, latency = timed_search(store, queries)
+            print(
+                f"{n_rows:>8} {f'ivf nprobe {nprobe}':>12} {latency * 1000:>8.3f}ms"
+                f" {recall(results, truth):>7.3f}"
+            )
+
+        batched = time.perf_counter()
+        store.search_by_vectors(queries, K, exact=True)
+        batched = (time.perf_counter() - batched) / N_QUERIES
+        print(f"{n_rows:>8} {'exact batch':>12} {batched * 1000:>8.3f}ms {1.0:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
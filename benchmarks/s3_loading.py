@@ -0,0 +1,124 @@
+"""
+Benchmark of `S3Loader` against a local stub of s3 whose connections are each limited in
+bandwidth, as connections to s3 are: a single GET of the object, as the loader made before,
+against concurrent ranged GETs into a spooled file and streamed through `open`.
+
+Run from the repo root with:
+    python -m benchmarks.s3_loading
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hackathon.loader.loader import S3Loader
+
+OBJECT_BYTES = 128 * 1024 * 1024
+# fixed cost of a request, and the bandwidth of one connection
+REQUEST_LATENCY = 0.02
+CONNECTION_BYTES_PER_SECOND = 64 * 1024 * 1024
+WRITE_BYTES = 1024 * 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stub of the s3 object api serving one object, which counts the GETs sent to it."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    data = b""
+    requests = 0
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.data)))
+        self.send_header("ETag", '"stub"')
+        self.end_headers()
+
+    def do_GET(self):
+        with StubHandler.lock:
+            StubHandler.requests += 1
+        body = memoryview(self.data)
+        if "Range" in self.headers:
+            start, end = self.headers["Range"].split("=")[1].split("-")
+            body = body[int(start) : int(end) + 1]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"stub"')
+        self.end_headers()
+        time.sleep(REQUEST_LATENCY)
+        for offset in range(0, len(body), WRITE_BYTES):
+            self.wfile.write(body[offset : offset + WRITE_BYTES])
+            time.sleep(WRITE_BYTES / CONNECTION_BYTES_PER_SECOND)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def single_get(loader: S3Loader, file_name: str) -> bytes:
+    """The loader before ranged reads, one GET of the whole object."""
+    obj = loader.s3_client.get_object(Bucket=loader.bucket, Key=file_name)
+    return obj["Body"].read()
+
+
+def read_streamed(file) -> int:
+    """Reads the file front to back in blocks, as an incremental processor does."""
+    read = 0
+    try:
+        while block := file.read(WRITE_BYTES):
+            read += len(block)
+    finally:
+        file.close()
+    return read
+
+
+def measure(name, func, *args):
+    StubHandler.requests = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<28} {StubHandler.requests:>4} GETs  {elapsed:>6.2f}s"
+        f"  {OBJECT_BYTES / elapsed / 1024**2:>7.1f}MB/s  peak {peak / 1024**2:>6.1f}MB"
+    )
+    return result
+
+
+def main():
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-2")
+    StubHandler.data = os.urandom(OBJECT_BYTES)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        loader = S3Loader("stub", endpoint_url=url)
+        data = measure("single GET", single_get, loader, "object")
+        assert data == StubHandler.data
+        del data
+        for concurrency in [1, 4, 8, 16]:
+            loader = S3Loader("stub", endpoint_url=url, max_concurrency=concurrency)
+            read = measure(
+                f"ranged, {concurrency} at once",
+                lambda: read_streamed(loader.load("object")),
+            )
+            assert read == OBJECT_BYTES
+        loader = S3Loader("stub", endpoint_url=url)
+        read = measure(
+            "streamed with open", lambda: read_streamed(loader.open("object"))
+        )
+        assert read == OBJECT_BYTES
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of rendering a `Transcript` to text on synthetic transcripts.
+
+Run from the repo root with:
+    python -m benchmarks.transcript_rendering
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from hackathon.transcripts.transcript_handling import Transcript
+
+SIZES = [10_000, 100_000, 1_000_000]
+# the row by row renderer is quadratic, so is only timed on the smallest size
+LEGACY_MAX_ROWS = 10_000
+
+
+def synthetic_transcript(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(["budget", "rail", "housing", "agreed", "the", "minister", "we"])
+    text = [" ".join(rng.choice(words, 12)) for _ in range(n_rows)]
+    return pd.DataFrame(
+        {
+            "Time": np.arange(n_rows, dtype=float),
+            "Speaker": rng.choice(["Alice", "Bob", "Carol", "Dan"], n_rows),
+            "Text": text,
+        }
+    )
+
+
+def legacy_render(transcript: Transcript) -> str:
+    s = ""
+    for ix, row in transcript.data.iterrows():
+        s = f"{s}\n\n{row['Speaker']}: {row['Text']}"
+    return s
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    print(f"{'rows':>10} {'iterrows':>10} {'vectorised':>11} {'cached':>10}")
+    for n_rows in SIZES:
+        transcript = Transcript(data=synthetic_transcript(n_rows))
+        rendered, vectorised = timed(str, transcript)
+        _, cached = timed(str, transcript)
+        legacy = "skipped"
+        if n_rows <= LEGACY_MAX_ROWS:
+            legacy_rendered, legacy_time = timed(legacy_render, transcript)
+            assert legacy_rendered == rendered
+            legacy = f"{legacy_time:.3f}s"
+        print(f"{n_rows:>10} {legacy:>10} {vectorised:>10.3f}s {cached:>9.6f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,14 +17,21 @@ EMBEDDING_ENDPOINT_NAME = os.environ.get(
 
 S3_LOADER_BUCKET = os.environ.get("S3_LOADER_BUCKET", "")
 S3_LOADER_FILE_NAME = os.environ.get("S3_LOADER_FILE_NAME", "")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. a local MinIO
+S3_PART_SIZE = int(os.environ.get("S3_PART_SIZE", 8 * 1024 * 1024))
+S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", 8))
+# downloads up to this size are held in memory, larger ones spill to a temp file
+S3_SPOOL_BYTES = int(os.environ.get("S3_SPOOL_BYTES", 64 * 1024 * 1024))
 AWS_REGION = os.environ.get("AWS_REGION", "eu-west-2")
 ENV = os.environ.get("ENV", "prod")
 
 
 LOADER_CONFIG = os.environ.get("LOADER_CONFIG", "s3_loader")  # "file_loader"
-VECTOR_STORE_CONFIG = os.environ.get(
-    "VECTOR_STORE_CONFIG", "opensearch"
-)  # "opensearch"
+VECTOR_STORE_CONFIG = os.environ.get("VECTOR_STORE_CONFIG", "opensearch")  # "local"
+CHUNKER_CONFIG = os.environ.get("CHUNKER_CONFIG", "text")  # "transcript"
+# rows of a source file processed at a time, bounding the memory a load takes
+LOADER_BATCH_ROWS = int(os.environ.get("LOADER_BATCH_ROWS", 10_000))
+LOAD_PROGRESS_EVERY = int(os.environ.get("LOAD_PROGRESS_EVERY", 10_000))  # chunks
 LLM_MODEL = os.environ.get("LLM_MODEL", "hosted_llm")  # "local_llm"
 
 AWS_REGION = os.environ.get("AWS_REGION", "eu-west-2")
@@ -42,3 +49,103 @@ GLOSSERY_API = os.environ.get("GLOSSERY_API")
 GLOSSERY_URL = os.environ.get("GLOSSERY_URL")
 CONVERSATION_API = os.environ.get("CONVERSATION_API")
 CONVERSATION_URL = os.environ.get("CONVERSATION_URL")
+
+LLM_POLL_INITIAL_DELAY = float(os.environ.get("LLM_POLL_INITIAL_DELAY", 1.0))
+LLM_POLL_MAX_DELAY = float(os.environ.get("LLM_POLL_MAX_DELAY", 10.0))
+LLM_POLL_BACKOFF = float(os.environ.get("LLM_POLL_BACKOFF", 2.0))
+LLM_POLL_TIMEOUT = float(os.environ.get("LLM_POLL_TIMEOUT", 300.0))
+LLM_STREAM_POLL_INTERVAL = float(os.environ.get("LLM_STREAM_POLL_INTERVAL", 0.5))
+
+LLM_API_POOL_SIZE = int(os.environ.get("LLM_API_POOL_SIZE", 10))
+LLM_API_CONNECT_TIMEOUT = float(os.environ.get("LLM_API_CONNECT_TIMEOUT", 5.0))
+LLM_API_READ_TIMEOUT = float(os.environ.get("LLM_API_READ_TIMEOUT", 60.0))
+LLM_API_RETRIES = int(os.environ.get("LLM_API_RETRIES", 3))
+LLM_API_RETRY_BACKOFF = float(os.environ.get("LLM_API_RETRY_BACKOFF", 0.5))
+
+STYLE_SHEET_PATH = os.environ.get("STYLE_SHEET_PATH", "style-sheet.txt")
+RESPONSE_CACHE_PATH = os.environ.get(
+    "RESPONSE_CACHE_PATH", ".cache/llm_responses.sqlite"
+)  # "" disables the cache
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 7 * 24 * 60 * 60))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+RESPONSE_CACHE_MAX_BYTES = int(
+    os.environ.get("RESPONSE_CACHE_MAX_BYTES", 100 * 1024 * 1024)
+)
+
+CHARS_PER_TOKEN = float(os.environ.get("CHARS_PER_TOKEN", 4.0))
+LLM_CONTEXT_TOKEN_LIMIT = int(os.environ.get("LLM_CONTEXT_TOKEN_LIMIT", 200000))
+LLM_REPLY_TOKEN_ALLOWANCE = int(os.environ.get("LLM_REPLY_TOKEN_ALLOWANCE", 4000))
+SNIPPET_TOKEN_BUDGET = int(os.environ.get("SNIPPET_TOKEN_BUDGET", 20000))
+
+SUMMARY_WINDOW_TOKENS = int(os.environ.get("SUMMARY_WINDOW_TOKENS", 3000))
+SUMMARY_MAX_WORKERS = int(os.environ.get("SUMMARY_MAX_WORKERS", 4))
+
+TRANSCRIPT_CHUNK_SIZE = int(os.environ.get("TRANSCRIPT_CHUNK_SIZE", 100000))
+TRANSCRIPT_STORE_PATH = os.environ.get("TRANSCRIPT_STORE_PATH", "data/transcripts")
+# token budget of a chunk of speaker turns, and turns repeated between consecutive chunks
+TRANSCRIPT_CHUNK_TOKENS = int(os.environ.get("TRANSCRIPT_CHUNK_TOKENS", 256))
+TRANSCRIPT_CHUNK_OVERLAP_TURNS = int(
+    os.environ.get("TRANSCRIPT_CHUNK_OVERLAP_TURNS", 1)
+)
+
+EMBEDDING_BATCH_BYTES = int(os.environ.get("EMBEDDING_BATCH_BYTES", 256 * 1024))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_MAX_IN_FLIGHT = int(os.environ.get("EMBEDDING_MAX_IN_FLIGHT", 4))
+
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH", ".cache/embeddings"
+)  # "" disables the cache
+EMBEDDING_CACHE_DTYPE = os.environ.get(
+    "EMBEDDING_CACHE_DTYPE", "float32"
+)  # float16 halves the cache size
+
+INGEST_EMBED_WORKERS = int(os.environ.get("INGEST_EMBED_WORKERS", 2))
+INGEST_INDEX_WORKERS = int(os.environ.get("INGEST_INDEX_WORKERS", 2))
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 4))  # batches per stage
+INGEST_RETRIES = int(os.environ.get("INGEST_RETRIES", 3))
+INGEST_RETRY_BACKOFF = float(os.environ.get("INGEST_RETRY_BACKOFF", 1.0))
+
+OPENSEARCH_REPLICAS = int(os.environ.get("OPENSEARCH_REPLICAS", 1))
+OPENSEARCH_REFRESH_INTERVAL = os.environ.get("OPENSEARCH_REFRESH_INTERVAL", "1s")
+# seconds a replaced index is kept, so queries already running against it can finish
+OPENSEARCH_INDEX_GRACE_PERIOD = float(
+    os.environ.get("OPENSEARCH_INDEX_GRACE_PERIOD", 15 * 60)
+)
+# vectors are stored as float32 unless quantised to fp16 (faiss) or byte (lucene)
+OPENSEARCH_QUANTIZATION = os.environ.get("OPENSEARCH_QUANTIZATION", "")
+OPENSEARCH_PCA_DIMENSIONS = int(
+    os.environ.get("OPENSEARCH_PCA_DIMENSIONS", 0)
+)  # 0 keeps every dimension
+OPENSEARCH_HNSW_M = int(os.environ.get("OPENSEARCH_HNSW_M", 16))
+OPENSEARCH_HNSW_EF_CONSTRUCTION = int(
+    os.environ.get("OPENSEARCH_HNSW_EF_CONSTRUCTION", 512)
+)
+OPENSEARCH_HNSW_EF_SEARCH = int(os.environ.get("OPENSEARCH_HNSW_EF_SEARCH", 512))
+# seconds a search keeps the vector transform of an index before reading it again, so a
+# reindex by another process is picked up, 0 reads it only when this process changes the index
+OPENSEARCH_TRANSFORM_TTL = float(os.environ.get("OPENSEARCH_TRANSFORM_TTL", 60))
+# index the vector transforms of the other indexes are stored in, one document per index
+OPENSEARCH_TRANSFORM_INDEX = os.environ.get(
+    "OPENSEARCH_TRANSFORM_INDEX", "vector-transforms"
+)
+
+LOCAL_VECTOR_STORE_PATH = os.environ.get(
+    "LOCAL_VECTOR_STORE_PATH", ".cache/vectorstore"
+)  # "" keeps the local vector store in memory
+LOCAL_VECTOR_SPACE_TYPE = os.environ.get("LOCAL_VECTOR_SPACE_TYPE", "l2")
+# corpus size from which the local vector store searches an IVF index instead of every vector
+LOCAL_VECTOR_ANN_THRESHOLD = int(os.environ.get("LOCAL_VECTOR_ANN_THRESHOLD", 50_000))
+LOCAL_VECTOR_NPROBE = int(os.environ.get("LOCAL_VECTOR_NPROBE", 8))
+
+QUERY_CACHE_MAX_ENTRIES = int(
+    os.environ.get("QUERY_CACHE_MAX_ENTRIES", 1024)
+)  # 0 disables the cache
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", 10 * 60))
+
+# search pipeline which fuses hybrid query ranks server side, needs OpenSearch 2.19+
+OPENSEARCH_HYBRID_PIPELINE = os.environ.get(
+    "OPENSEARCH_HYBRID_PIPELINE", "hybrid-rrf"
+)  # "" fuses ranks client side
+HYBRID_RANK_CONSTANT = int(os.environ.get("HYBRID_RANK_CONSTANT", 60))
+# candidates each of the text and vector queries contribute to the fusion
+HYBRID_WINDOW = int(os.environ.get("HYBRID_WINDOW", 50))
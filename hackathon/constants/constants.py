@@ -1,2 +1,7 @@
 METADATA_COLUMNS = []
 CONTENT_COLUMNS = [""]
+# columns which together identify a source row, used to give its chunks stable ids
+KEY_COLUMNS = []
+SOURCE_KEY_FIELD = "source_key"
+# (column, operator, value) conditions source rows must meet to be loaded, e.g. ("year", ">=", 2023)
+LOAD_FILTERS = []
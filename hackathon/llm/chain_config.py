@@ -5,7 +5,11 @@ from typing import Dict, List
 from langchain.schema.output_parser import StrOutputParser
 from langchain_core.output_parsers.transform import BaseTransformOutputParser
 
-from hackathon.llm.prompts.core import PromptTemplate
+from hackathon.llm.prompts.core import (
+    MAP_SUMMARISE_PROMPT,
+    REDUCE_SUMMARISE_PROMPT,
+    PromptTemplate,
+)
 
 
 @dataclass
@@ -62,3 +66,16 @@ class ChainConfig:
         self.var_input = {key: itemgetter(key) for key in input_values}
         self.out_parser = out_parser
         self.chain_type = chain_type
+
+
+MAP_SUMMARY_CHAIN = ChainConfig(
+    name="map_summary",
+    prompt=MAP_SUMMARISE_PROMPT,
+    input_values=["transcript"],
+)
+
+REDUCE_SUMMARY_CHAIN = ChainConfig(
+    name="reduce_summary",
+    prompt=REDUCE_SUMMARISE_PROMPT,
+    input_values=["summaries"],
+)
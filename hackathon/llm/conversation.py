@@ -0,0 +1,180 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from config.logging import setup_logging
+from config.settings import (
+    LLM_CONTEXT_TOKEN_LIMIT,
+    LLM_REPLY_TOKEN_ALLOWANCE,
+    SNIPPET_TOKEN_BUDGET,
+)
+from hackathon.llm.llm_api import API
+from hackathon.llm.tokens import count_tokens
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def select_snippets(transcript: str, query: str, token_budget: int) -> str:
+    """
+    Picks the transcript passages most relevant to a query that fit in a token budget.
+    Passages are the blank line separated speaker turns of the transcript, scored by the
+    tf-idf weighted overlap of their words with the query and returned in transcript order.
+    Args:
+        transcript (str): transcript text
+        query (str): query the passages should help answer
+        token_budget (int): maximum number of tokens to return
+    """
+    passages = [p.strip() for p in transcript.split("\n\n") if p.strip()]
+    passage_words = [Counter(_words(p)) for p in passages]
+    document_frequency = Counter(w for words in passage_words for w in words)
+    query_words = set(_words(query))
+    scores = [
+        sum(
+            words[w] * math.log(len(passages) / document_frequency[w])
+            for w in query_words
+            if w in words
+        )
+        for words in passage_words
+    ]
+    ranked = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+    chosen, used = [], 0
+    for i in ranked:
+        if scores[i] <= 0:
+            break
+        tokens = count_tokens(passages[i])
+        if used + tokens > token_budget:
+            continue
+        chosen.append(i)
+        used += tokens
+    return "\n\n".join(passages[i] for i in sorted(chosen))
+
+
+class ConversationSession:
+    """
+    A conversation about a transcript with a chat bot which sends the transcript only once.
+    Once the conversation holds the transcript only the query is sent, when the transcript
+    and conversation would overflow the context window each query is instead sent to a new
+    conversation along with the transcript passages most relevant to it.
+
+    Attributes:
+        api (API): conversation bot
+        transcript (str): transcript text the conversation is about
+        conversation_id (Optional[str]): conversation holding the transcript, None until primed
+        context_token_limit (int): context window of the model in tokens
+        snippet_token_budget (int): tokens of transcript passages sent when falling back to retrieval
+        context_tokens (int): estimated tokens held in the conversation
+        tokens_sent (int): estimated tokens sent to the bot by this session
+        naive_tokens (int): estimated tokens had the transcript been sent with every query
+    """
+
+    def __init__(
+        self,
+        api: API,
+        transcript: str,
+        conversation_id: Optional[str] = None,
+        context_token_limit: int = LLM_CONTEXT_TOKEN_LIMIT,
+        snippet_token_budget: int = SNIPPET_TOKEN_BUDGET,
+    ) -> None:
+        """
+        Args:
+            conversation_id (Optional[str]): existing conversation which has already been sent
+                the transcript, defaults to None which sends the transcript with the first query
+        """
+        self.api = api
+        self.transcript = transcript
+        self.conversation_id = conversation_id
+        self.context_token_limit = context_token_limit
+        self.snippet_token_budget = snippet_token_budget
+        self.transcript_tokens = count_tokens(transcript)
+        self.context_tokens = self.transcript_tokens if conversation_id else 0
+        self.tokens_sent = 0
+        self.naive_tokens = 0
+        self.queries = 0
+
+    @property
+    def primed(self) -> bool:
+        return self.conversation_id is not None
+
+    def _fits(self, tokens: int) -> bool:
+        return (
+            self.context_tokens + tokens + LLM_REPLY_TOKEN_ALLOWANCE
+            <= self.context_token_limit
+        )
+
+    def build_message(self, prompt: str) -> Dict:
+        """
+        Builds the message to send for a query and the conversation to send it to.
+        Args:
+            prompt (str): the user's query
+        """
+        prompt_tokens = count_tokens(prompt)
+        if self.primed and self._fits(prompt_tokens):
+            return {"message": prompt, "conversation_id": self.conversation_id}
+        if not self.primed and self._fits(self.transcript_tokens + prompt_tokens):
+            return {
+                "message": f"With knowledge of this transcript:\n{self.transcript}\n\n"
+                f"Answer this query: {prompt}",
+                "conversation_id": None,
+            }
+        logger.info("Transcript conversation would overflow, sending relevant passages")
+        snippets = select_snippets(self.transcript, prompt, self.snippet_token_budget)
+        return {
+            "message": f"With knowledge of these passages from a transcript:\n{snippets}\n\n"
+            f"Answer this query: {prompt}",
+            "conversation_id": None,
+            "retrieval": True,
+        }
+
+    def stream_query(self, prompt: str) -> Iterator[str]:
+        """
+        Sends a query to the bot, yielding its reply as it arrives.
+        Args:
+            prompt (str): the user's query
+        """
+        request = self.build_message(prompt)
+        message = request["message"]
+        post_response = self.api.invoke_post(message, request["conversation_id"])
+        reply = ""
+        for chunk in self.api.stream_response(
+            post_response["conversationId"], post_response.get("messageId")
+        ):
+            reply += chunk
+            yield chunk
+
+        message_tokens = count_tokens(message)
+        if not request.get("retrieval"):
+            self.conversation_id = post_response["conversationId"]
+            self.context_tokens += message_tokens + count_tokens(reply)
+        self.queries += 1
+        self.tokens_sent += message_tokens
+        self.naive_tokens += self.transcript_tokens + count_tokens(prompt)
+        logger.debug(f"Conversation token usage {self.stats()}")
+
+    def query(self, prompt: str) -> str:
+        """
+        Sends a query to the bot and returns its full reply.
+        Args:
+            prompt (str): the user's query
+        """
+        return "".join(self.stream_query(prompt))
+
+    def stats(self) -> Dict:
+        """
+        Returns the token counts of the session, `tokens_saved` is the reduction against
+        sending the whole transcript with every query.
+        """
+        return {
+            "queries": self.queries,
+            "tokens_sent": self.tokens_sent,
+            "naive_tokens": self.naive_tokens,
+            "tokens_saved": self.naive_tokens - self.tokens_sent,
+            "context_tokens": self.context_tokens,
+        }
@@ -1,4 +1,11 @@
+import asyncio
+import time
+from typing import Dict, Iterator, Optional
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config.settings import (
     CONVERSATION_API,
@@ -7,6 +14,13 @@ from config.settings import (
     FACTCHECK_URL,
     GLOSSERY_API,
     GLOSSERY_URL,
+    LLM_API_CONNECT_TIMEOUT,
+    LLM_API_POOL_SIZE,
+    LLM_API_READ_TIMEOUT,
+    LLM_API_RETRIES,
+    LLM_API_RETRY_BACKOFF,
+    LLM_POLL_TIMEOUT,
+    LLM_STREAM_POLL_INTERVAL,
     MODEL,
     SUMMARISE_API,
     SUMMARISE_URL,
@@ -48,16 +62,105 @@ The infromation from the summary could link to a previous meeting, an email, a n
 Return a list of words and phrases which could have a link formed and a short description of why it could be linked. 
 """
 
+
+class ResponseNotReady(Exception):
+    """Exception for when a conversation has no finished bot reply yet."""
+
+    pass
+
+
+class ResponseTimeout(Exception):
+    """Exception for if a bot has not replied before the polling timeout."""
+
+    pass
+
+
+class ResponseRewritten(Exception):
+    """Exception for when a bot reply being streamed is rewritten rather than extended."""
+
+    pass
+
+
+RETRY_STATUSES = (500, 502, 503, 504)
+# methods which are safe to send again once the request may have reached the backend
+RETRY_METHODS = frozenset({"GET"})
+
+
+def create_session(
+    pool_size: int = LLM_API_POOL_SIZE,
+    retries: int = LLM_API_RETRIES,
+    backoff_factor: float = LLM_API_RETRY_BACKOFF,
+) -> requests.Session:
+    """
+    Creates a keep-alive requests session which reuses connections to the chat backend.
+    Args:
+        pool_size (int): number of connections kept open per host
+        retries (int): number of times a request is retried on a connection error, or for
+            GETs also on a 5xx response or read error
+        backoff_factor (float): backoff factor between retries, see urllib3 `Retry`
+    """
+    # posts start conversations and model replies, so are only retried if they were never sent
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_async_client(
+    pool_size: int = LLM_API_POOL_SIZE,
+    connect_timeout: float = LLM_API_CONNECT_TIMEOUT,
+    read_timeout: float = LLM_API_READ_TIMEOUT,
+    retries: int = LLM_API_RETRIES,
+) -> httpx.AsyncClient:
+    """
+    Creates a keep-alive httpx client for use with `AsyncAPI`.
+    The client is bound to the event loop it is used in, so create one per `asyncio.run`.
+    Args:
+        pool_size (int): maximum number of open connections
+        connect_timeout (float): seconds to wait for a connection
+        read_timeout (float): seconds to wait for a response
+        retries (int): number of times a failed connection attempt is retried, as the request
+            was never sent this is safe for posts too
+    """
+    # limits are set on the transport, the client ignores them when given a transport
+    limits = httpx.Limits(
+        max_connections=pool_size, max_keepalive_connections=pool_size
+    )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        transport=httpx.AsyncHTTPTransport(limits=limits, retries=retries),
+    )
+
+
 class API:
-    def __init__(self, api_key, url):
+    def __init__(
+        self,
+        api_key,
+        url,
+        session: Optional[requests.Session] = None,
+        connect_timeout: float = LLM_API_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_API_READ_TIMEOUT,
+    ):
         self.api_key = api_key
         self.url = url
+        self.session = session or create_session()
+        self.timeout = (connect_timeout, read_timeout)
         self.headers = {
             "Content-Type": "application/json",
             "X-API-Key": f"{self.api_key}",
         }
 
-    def invoke_post(self, message, conversation_id=None):
+    def post_data(self, message, conversation_id=None) -> Dict:
         post_data = {
             "message": {
                 "content": [
@@ -68,25 +171,204 @@ class API:
         }
         if conversation_id is not None:
             post_data["conversationId"] = conversation_id
-        response = requests.post(
-            self.url + "/conversation", json=post_data, headers=self.headers
+        return post_data
+
+    def invoke_post(self, message, conversation_id=None):
+        response = self.session.post(
+            self.url + "/conversation",
+            json=self.post_data(message, conversation_id),
+            headers=self.headers,
+            timeout=self.timeout,
         )
         json_respn = response.json()
         return json_respn
 
-    def invoke_get(self, conversation_id):
+    def get_conversation(self, conversation_id) -> Dict:
         uri_path = "/conversation/" + conversation_id
-        response = requests.get(
+        response = self.session.get(
             self.url + uri_path,
             headers=self.headers,
+            timeout=self.timeout,
         )
-        json_response = response.json()
+        return response.json()
+
+    def invoke_get(self, conversation_id):
+        json_response = self.get_conversation(conversation_id)
 
         last_msg_id = json_response["lastMessageId"]
         return json_response["messageMap"][last_msg_id]["content"][0]["body"]
 
+    def get_response(self, conversation_id, message_id: Optional[str] = None) -> str:
+        """
+        Returns the body of the finished bot reply in a conversation.
+        Args:
+            conversation_id (str): conversation to fetch
+            message_id (Optional[str]): id of the posted message the reply must answer,
+                defaults to None which accepts any bot reply as the last message
+        Raises:
+            ResponseNotReady: if the bot has not finished replying yet.
+        """
+        return self.read_response(self.get_conversation(conversation_id), message_id)
+
+    @staticmethod
+    def read_reply(conversation: Dict, message_id: Optional[str] = None) -> Dict:
+        """
+        Reads the bot reply out of a conversation returned by the backend, finished or not.
+        Args:
+            conversation (Dict): json conversation returned by the backend
+            message_id (Optional[str]): id of the posted message the reply must answer
+        Raises:
+            ResponseNotReady: if the last message is not a bot reply to `message_id`.
+        """
+        last_msg_id = conversation.get("lastMessageId")
+        last_msg = conversation.get("messageMap", {}).get(last_msg_id)
+        if not last_msg or last_msg.get("role") != "assistant":
+            raise ResponseNotReady("No bot reply in conversation yet")
+        if message_id is not None and last_msg.get("parent") != message_id:
+            raise ResponseNotReady(f"No bot reply to message {message_id} yet")
+        return last_msg
+
+    @staticmethod
+    def reply_finished(reply: Dict) -> bool:
+        """
+        Whether a bot reply has finished. The backend stores a reply once it has been
+        generated, backends which store it as it is generated leave its stopReason empty
+        until it has finished.
+        """
+        return reply.get("stopReason", "") is not None
+
+    @classmethod
+    def read_response(cls, conversation: Dict, message_id: Optional[str] = None) -> str:
+        """
+        Reads the finished bot reply out of a conversation returned by the backend.
+        Args:
+            conversation (Dict): json conversation returned by the backend
+            message_id (Optional[str]): id of the posted message the reply must answer
+        Raises:
+            ResponseNotReady: if the last message is not a finished bot reply to `message_id`.
+        """
+        reply = cls.read_reply(conversation, message_id)
+        if not cls.reply_finished(reply):
+            raise ResponseNotReady("Bot reply has not finished yet")
+        return reply["content"][0]["body"]
+
+    def stream_response(
+        self,
+        conversation_id,
+        message_id: Optional[str] = None,
+        interval: float = LLM_STREAM_POLL_INTERVAL,
+        timeout: float = LLM_POLL_TIMEOUT,
+    ) -> Iterator[str]:
+        """
+        Yields the bot reply in a conversation as it arrives, by polling the conversation.
+        Each item is the text added to the end of the reply since the previous item, the
+        stream ends once the backend marks the reply finished.
+        Args:
+            conversation_id (str): conversation to poll
+            message_id (Optional[str]): id of the posted message the reply must answer
+            interval (float): seconds between polls
+            timeout (float): seconds to wait for the reply to start or to grow
+        Raises:
+            ResponseTimeout: if the bot has not replied, or its reply has not grown, within
+                `timeout` seconds.
+            ResponseRewritten: if the reply is rewritten rather than extended, as the text
+                already yielded can't be taken back.
+        """
+        deadline = time.monotonic() + timeout
+        sent = ""
+        while True:
+            try:
+                reply = self.read_reply(
+                    self.get_conversation(conversation_id), message_id
+                )
+            except ResponseNotReady:
+                reply = None
+            if reply is not None:
+                body = reply["content"][0]["body"]
+                if not body.startswith(sent):
+                    raise ResponseRewritten(
+                        f"Reply in conversation {conversation_id} was rewritten while streamed"
+                    )
+                if len(body) > len(sent):
+                    yield body[len(sent) :]
+                    sent = body
+                    deadline = time.monotonic() + timeout
+                if self.reply_finished(reply):
+                    return
+            if time.monotonic() > deadline:
+                raise ResponseTimeout(
+                    f"No finished reply in conversation {conversation_id} after {timeout} seconds"
+                )
+            time.sleep(interval)
+
+
+class AsyncAPI:
+    """
+    Async counterpart of `API` which sends requests through a shared httpx client.
+
+    Attributes:
+        api (API): api holding the url and credentials of the bot
+        client (httpx.AsyncClient): pooled client, see `create_async_client`
+        retries (int): number of times a GET is retried on a 5xx response, connection
+            errors are retried by the client's transport
+        backoff_factor (float): seconds to wait before the first retry, doubled on every retry
+    """
+
+    def __init__(
+        self,
+        api: API,
+        client: httpx.AsyncClient,
+        retries: int = LLM_API_RETRIES,
+        backoff_factor: float = LLM_API_RETRY_BACKOFF,
+    ):
+        self.api = api
+        self.client = client
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    async def _request(self, method: str, uri_path: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            response = await self.client.request(
+                method, self.api.url + uri_path, headers=self.api.headers, **kwargs
+            )
+            if (
+                method not in RETRY_METHODS
+                or response.status_code not in RETRY_STATUSES
+                or attempt == self.retries
+            ):
+                return response
+            await asyncio.sleep(self.backoff_factor * 2**attempt)
+
+    async def invoke_post(self, message, conversation_id=None) -> Dict:
+        response = await self._request(
+            "POST", "/conversation", json=self.api.post_data(message, conversation_id)
+        )
+        return response.json()
+
+    async def get_conversation(self, conversation_id) -> Dict:
+        response = await self._request("GET", "/conversation/" + conversation_id)
+        return response.json()
+
+    async def invoke_get(self, conversation_id):
+        json_response = await self.get_conversation(conversation_id)
+
+        last_msg_id = json_response["lastMessageId"]
+        return json_response["messageMap"][last_msg_id]["content"][0]["body"]
+
+    async def get_response(
+        self, conversation_id, message_id: Optional[str] = None
+    ) -> str:
+        """
+        Returns the body of the finished bot reply in a conversation, see `API.get_response`.
+        Raises:
+            ResponseNotReady: if the bot has not finished replying yet.
+        """
+        conversation = await self.get_conversation(conversation_id)
+        return API.read_response(conversation, message_id)
+
 
-summary_api = API(SUMMARISE_API, SUMMARISE_URL)
-fact_check_api = API(FACTCHECK_API, FACTCHECK_URL)
-glossery_api = API(GLOSSERY_API, GLOSSERY_URL)
-conversation_api = API(CONVERSATION_API, CONVERSATION_URL)
+api_session = create_session()
+summary_api = API(SUMMARISE_API, SUMMARISE_URL, api_session)
+fact_check_api = API(FACTCHECK_API, FACTCHECK_URL, api_session)
+glossery_api = API(GLOSSERY_API, GLOSSERY_URL, api_session)
+conversation_api = API(CONVERSATION_API, CONVERSATION_URL, api_session)
@@ -1,11 +1,12 @@
 from abc import ABC
-from typing import Dict
+from typing import Dict, Iterator
 
 from langchain_core.runnables import RunnableSequence
 
 from config.logging import setup_logging
 from hackathon.llm.chain_config import SINGLE_CHAIN, ChainConfig
 from hackathon.llm.llm import LLM
+from hackathon.llm.llm_api import API
 
 get_logger = setup_logging()
 logger = get_logger(__name__)
@@ -30,15 +31,18 @@ class LLMChain(ABC):
             config.var_input | config.prompt | llm.get_llm() | config.out_parser()
         )
 
-    def invoke_query(self, query: Dict):
+    def invoke_query(self, query: Dict, stream: bool = False):
         """
         Invokes query against chain.
 
         Args:
             query (Dict): dictionary object for the input variables for the llm chain.
+            stream (bool): return an iterator over the output as it is generated, see `stream_query`
         Raises:
             TokenLimitExceeded: If LLM token limit has been exceeded.
         """
+        if stream:
+            return self.stream_query(query)
         try:
             response = self.chain.invoke(query)
             logger.debug("query result %s", response)
@@ -50,6 +54,52 @@ class LLMChain(ABC):
             #     raise TokenLimitExceeded(e)
         return response
 
+    def stream_query(self, query: Dict) -> Iterator[str]:
+        """
+        Invokes query against chain, yielding the output as the llm generates it.
+
+        Args:
+            query (Dict): dictionary object for the input variables for the llm chain.
+        Raises:
+            TokenLimitExceeded: If LLM token limit has been exceeded.
+        """
+        try:
+            for chunk in self.chain.stream(query):
+                yield chunk
+        except Exception as e:
+            logger.error(e)
+            raise TokenLimitExceeded(e)
+
+
+class APIChain:
+    """
+    Chain which sends its prompt to a chat bot rather than an llm, has the `invoke_query`
+    of `LLMChain` so the two can be used interchangeably.
+    """
+
+    def __init__(self, config: ChainConfig, api: API):
+        """
+        Attributes:
+            config (ChainConfig): configuration for the chain, only its prompt is used
+            api (API): bot to send the prompt to, each query in a new conversation
+        """
+        self.prompt = config.prompt
+        self.api = api
+
+    def invoke_query(self, query: Dict) -> str:
+        """
+        Sends the prompt filled in with the query to the bot and waits for its reply.
+
+        Args:
+            query (Dict): dictionary object for the input variables of the prompt.
+        """
+        post_response = self.api.invoke_post(self.prompt.format(**query))
+        return "".join(
+            self.api.stream_response(
+                post_response["conversationId"], post_response.get("messageId")
+            )
+        )
+
 
 class LLMChainFactory:
     """
@@ -41,18 +41,19 @@ class LLMRunner:
         """
         self.llm.initialise_llm()
 
-    def query(self, query: Dict, chain: ChainConfig):
+    def query(self, query: Dict, chain: ChainConfig, stream: bool = False):
         """
         Execute a query on a given chain.
 
         Args:
             query (Dict): dictionary object for the input variables for the llm chain.
             chain (ChainConfig): chain config that the chain is stored under.
+            stream (bool): return an iterator over the output as it is generated.
         Raises:
             ValueError: if `chain.name` is not found.
         """
         chain: LLMChain = self.chains.get(chain.name)
         if chain:
-            return chain.invoke_query(query)
+            return chain.invoke_query(query, stream=stream)
         else:
             raise ValueError(f"Chain with name {chain.name} not found")
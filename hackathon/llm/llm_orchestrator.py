@@ -0,0 +1,254 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from config.logging import setup_logging
+from config.settings import (
+    LLM_CONTEXT_TOKEN_LIMIT,
+    LLM_POLL_BACKOFF,
+    LLM_POLL_INITIAL_DELAY,
+    LLM_POLL_MAX_DELAY,
+    LLM_POLL_TIMEOUT,
+    LLM_REPLY_TOKEN_ALLOWANCE,
+)
+from hackathon.llm.llm_api import (
+    API,
+    AsyncAPI,
+    ResponseNotReady,
+    ResponseTimeout,
+    conversation_api,
+    create_async_client,
+    fact_check_api,
+    glossery_api,
+    summary_api,
+)
+from hackathon.llm.response_cache import ResponseCache, make_cache_key, response_cache
+from hackathon.llm.summariser import HierarchicalSummariser
+from hackathon.llm.tokens import count_tokens
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+
+async def poll_response(
+    api: AsyncAPI,
+    conversation_id: str,
+    message_id: Optional[str] = None,
+    initial_delay: float = LLM_POLL_INITIAL_DELAY,
+    max_delay: float = LLM_POLL_MAX_DELAY,
+    backoff: float = LLM_POLL_BACKOFF,
+    timeout: float = LLM_POLL_TIMEOUT,
+) -> str:
+    """
+    Polls a conversation with exponential backoff until the bot has replied.
+    Args:
+        api (AsyncAPI): api the conversation was posted to
+        conversation_id (str): conversation to poll
+        message_id (Optional[str]): id of the posted message the reply must answer
+        initial_delay (float): seconds to wait after the first unfinished poll
+        max_delay (float): upper bound on the wait between polls
+        backoff (float): multiplier applied to the wait after every unfinished poll
+        timeout (float): seconds to keep polling before giving up
+    Raises:
+        ResponseTimeout: if the bot has not replied within `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = initial_delay
+    polls = 0
+    while True:
+        polls += 1
+        try:
+            response = await api.get_response(conversation_id, message_id)
+            logger.debug(f"Conversation {conversation_id} ready after {polls} polls")
+            return response
+        except ResponseNotReady:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise ResponseTimeout(
+                f"No reply in conversation {conversation_id} after {timeout} seconds"
+            )
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_delay)
+
+
+class SummaryOrchestrator:
+    """
+    Runs the summary, fact check, glossary and conversation bots for a transcript.
+    Independent bots are posted to concurrently and polled until they reply, the glossary
+    is requested as soon as the summary is ready, so the total time is that of the slowest bot.
+
+    Transcripts which would overflow the context window are summarised window by window by
+    the summariser instead, the facts are then checked in the summary and the conversation
+    bot is not primed, leaving `ConversationSession` to send it passages of the transcript.
+
+    Attributes:
+        summary_api (API): bot which summarises the transcript
+        fact_check_api (API): bot which pulls out and checks facts in the transcript
+        glossery_api (API): bot which creates a glossary from the summary
+        conversation_api (API): bot which holds the transcript for follow up queries
+        cache (Optional[ResponseCache]): cache checked before posting to a bot, defaults to None
+        summariser (Optional[HierarchicalSummariser]): summariser of transcripts which would
+            overflow the context window, defaults to None which sends them whole
+        context_token_limit (int): context window of the bots in tokens
+        poll_kwargs: keyword arguments passed on to `poll_response`
+    """
+
+    def __init__(
+        self,
+        summary_api: API,
+        fact_check_api: API,
+        glossery_api: API,
+        conversation_api: API,
+        cache: Optional[ResponseCache] = None,
+        summariser: Optional[HierarchicalSummariser] = None,
+        context_token_limit: int = LLM_CONTEXT_TOKEN_LIMIT,
+        **poll_kwargs,
+    ) -> None:
+        self.summary_api = summary_api
+        self.fact_check_api = fact_check_api
+        self.glossery_api = glossery_api
+        self.conversation_api = conversation_api
+        self.cache = cache
+        self.summariser = summariser
+        self.context_token_limit = context_token_limit
+        self.poll_kwargs = poll_kwargs
+
+    def fits(self, transcript: str) -> bool:
+        """Whether a transcript can be sent to a bot whole, leaving room for its reply."""
+        return (
+            count_tokens(transcript) + LLM_REPLY_TOKEN_ALLOWANCE
+            <= self.context_token_limit
+        )
+
+    async def ask(
+        self, api: AsyncAPI, message: str, conversation_id: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Posts a message to a bot and waits for its reply.
+        Args:
+            api (AsyncAPI): bot to post to
+            message (str): message to send
+            conversation_id (Optional[str]): existing conversation to continue
+        Returns:
+            Tuple of the conversation id and the reply body.
+        """
+        post_response = await api.invoke_post(message, conversation_id)
+        conversation_id = post_response["conversationId"]
+        reply = await poll_response(
+            api, conversation_id, post_response.get("messageId"), **self.poll_kwargs
+        )
+        return conversation_id, reply
+
+    async def ask_cached(
+        self,
+        api: AsyncAPI,
+        bot_type: str,
+        transcript: str,
+        message: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        `ask` which first checks the cache for a response to the same transcript and bot.
+        Only for bots whose reply depends on the transcript alone, not for conversations.
+        Args:
+            api (AsyncAPI): bot to post to
+            bot_type (str): name of the bot, part of the cache key
+            transcript (str): transcript the response is derived from, part of the cache key
+            message (Optional[str]): message to send, defaults to the transcript
+        Returns:
+            Tuple of the conversation id and the reply body.
+        """
+        if self.cache is None:
+            return await self.ask(api, message or transcript)
+        key = make_cache_key(transcript, bot_type)
+        cached = self.cache.get(key)
+        if cached is not None:
+            conversation_id, reply = json.loads(cached)
+            return conversation_id, reply
+        start = time.perf_counter()
+        conversation_id, reply = await self.ask(api, message or transcript)
+        self.cache.set(
+            key, json.dumps([conversation_id, reply]), time.perf_counter() - start
+        )
+        return conversation_id, reply
+
+    async def _summary_and_glossary(
+        self, summary_api: AsyncAPI, glossery_api: AsyncAPI, transcript: str
+    ) -> Tuple[str, str]:
+        _, summary = await self.ask_cached(summary_api, "summary", transcript)
+        _, glossary = await self.ask_cached(
+            glossery_api, "glossary", transcript, summary
+        )
+        return summary, glossary
+
+    async def _long_transcript(
+        self, fact_check_api: AsyncAPI, glossery_api: AsyncAPI, transcript: str
+    ) -> Tuple[str, str, str]:
+        logger.info(
+            "Transcript would overflow the context window, summarising by window"
+        )
+        summary = await asyncio.to_thread(self.summariser.summarise, transcript)
+        (_, facts), (_, glossary) = await asyncio.gather(
+            self.ask_cached(fact_check_api, "facts", transcript, summary),
+            self.ask_cached(glossery_api, "glossary", transcript, summary),
+        )
+        return summary, facts, glossary
+
+    async def arun(self, transcript: str) -> Dict:
+        """
+        Runs all the bots for a transcript concurrently over one pooled client.
+        Args:
+            transcript (str): transcript text to send to the bots
+        """
+        async with create_async_client() as client:
+            summary_api, fact_check_api, glossery_api, conversation_api = (
+                AsyncAPI(api, client)
+                for api in (
+                    self.summary_api,
+                    self.fact_check_api,
+                    self.glossery_api,
+                    self.conversation_api,
+                )
+            )
+            if self.summariser is not None and not self.fits(transcript):
+                summary, facts, glossary = await self._long_transcript(
+                    fact_check_api, glossery_api, transcript
+                )
+                conversation_id = None
+            else:
+                (summary, glossary), (_, facts), (conversation_id, _) = (
+                    await asyncio.gather(
+                        self._summary_and_glossary(
+                            summary_api, glossery_api, transcript
+                        ),
+                        self.ask_cached(fact_check_api, "facts", transcript),
+                        # never cached, every session needs its own conversation
+                        self.ask(conversation_api, transcript),
+                    )
+                )
+        return {
+            "summary": summary,
+            "facts": facts,
+            "glossary": glossary,
+            "conversationConversationId": conversation_id,
+        }
+
+    def run(self, transcript: str) -> Dict:
+        """
+        Blocking wrapper around `arun` for callers without an event loop, such as streamlit.
+        Args:
+            transcript (str): transcript text to send to the bots
+        """
+        return asyncio.run(self.arun(transcript))
+
+
+summary_orchestrator = SummaryOrchestrator(
+    summary_api,
+    fact_check_api,
+    glossery_api,
+    conversation_api,
+    response_cache,
+    summariser=HierarchicalSummariser(summary_api),
+)
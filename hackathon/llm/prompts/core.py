@@ -39,3 +39,26 @@ document_retrieval_prompt = PromptTemplate.from_template(
     """
 """
 )
+
+MAP_SUMMARISE_PROMPT = PromptTemplate.from_template(
+    """
+Summarise this section of a meeting transcript. Keep every decision, action and figure
+and who raised it. The input format is speaker: text for each turn of the transcript.
+
+{transcript}
+----------------------
+ANSWER:
+"""
+)
+
+REDUCE_SUMMARISE_PROMPT = PromptTemplate.from_template(
+    """
+These are summaries of consecutive sections of one meeting transcript. Combine them into
+a single summary of the meeting in order, keeping every decision, action and figure and
+who raised it.
+
+{summaries}
+----------------------
+ANSWER:
+"""
+)
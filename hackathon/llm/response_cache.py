@@ -0,0 +1,217 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from config.logging import setup_logging
+from config.settings import (
+    MODEL,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+    STYLE_SHEET_PATH,
+)
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+
+def read_style_sheet(path: str = STYLE_SHEET_PATH) -> str:
+    """
+    Reads the style sheet the bots summarise with, an empty string if there is none.
+    Args:
+        path (str): path to the style sheet
+    """
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def make_cache_key(
+    transcript: str,
+    bot_type: str,
+    *extra: str,
+    model: str = MODEL,
+    style_sheet: Optional[str] = None,
+) -> str:
+    """
+    Content addressed key for a bot response, the sha256 of everything that determines it.
+    Args:
+        transcript (str): transcript text the bot was sent
+        bot_type (str): name of the bot, e.g. "summary"
+        extra (str): any further inputs, such as a user query
+        model (str): model the bot runs on
+        style_sheet (Optional[str]): style sheet text, defaults to the one at STYLE_SHEET_PATH
+    """
+    if style_sheet is None:
+        style_sheet = read_style_sheet()
+    digest = hashlib.sha256()
+    for part in (transcript, bot_type, model, style_sheet, *extra):
+        encoded = part.encode("utf-8")
+        # length prefix so parts can't run into each other
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    Cache of bot responses with hit and miss counters.
+
+    Attributes:
+        hits (int): number of lookups served from the cache
+        misses (int): number of lookups not in the cache
+        seconds_saved (float): bot time saved by the hits, as recorded when the response was stored
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, key: str, value: str, cost: float = 0.0) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError()
+
+    def stats(self) -> Dict:
+        """
+        Returns the hit and miss counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+        }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Response cache persisted in a SQLite file, with TTL expiry and LRU eviction.
+
+    Attributes:
+        path (str): path of the SQLite file
+        ttl (float): seconds an entry is valid for, 0 for no expiry
+        max_entries (int): maximum number of entries kept
+        max_bytes (int): maximum total size of the stored values
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    cost REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached value for key, None if it is missing or expired.
+        Args:
+            key (str): cache key, see `make_cache_key`
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, cost, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[2] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                logger.debug(f"Response cache miss for {key}")
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            self.seconds_saved += row[1]
+            logger.debug(f"Response cache hit for {key}")
+            return row[0]
+
+    def set(self, key: str, value: str, cost: float = 0.0) -> None:
+        """
+        Stores a value, evicting expired and then least recently used entries to stay in the limits.
+        Args:
+            key (str): cache key, see `make_cache_key`
+            value (str): response to store
+            cost (float): seconds it took to produce the response
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), cost, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+        count, total_size = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total_size -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} responses from the response cache")
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+
+response_cache = SQLiteResponseCache() if RESPONSE_CACHE_PATH else None
@@ -0,0 +1,154 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+
+from config.logging import setup_logging
+from config.settings import SUMMARY_MAX_WORKERS, SUMMARY_WINDOW_TOKENS
+from hackathon.llm.chain_config import (
+    MAP_SUMMARY_CHAIN,
+    REDUCE_SUMMARY_CHAIN,
+    ChainConfig,
+)
+from hackathon.llm.llm import LLM
+from hackathon.llm.llm_api import API
+from hackathon.llm.llm_chains import APIChain, LLMChainFactory
+from hackathon.llm.response_cache import ResponseCache, make_cache_key, response_cache
+from hackathon.llm.tokens import count_tokens
+from hackathon.transcripts.transcript_handling import Transcript
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+
+class HierarchicalSummariser:
+    """
+    Map-reduce summariser for transcripts too long to summarise in one llm call.
+    The transcript is split into windows of whole speaker turns within a token budget, the
+    windows are summarised in parallel and the partial summaries are combined recursively
+    until one summary is left. Every summary is cached by the text it summarises, so
+    editing one section of a transcript only re-summarises the windows it falls in.
+
+    Runs on an llm, or on a chat bot which is sent each prompt in a new conversation.
+
+    Attributes:
+        map_config (ChainConfig): chain which summarises a window, takes its text as its only input
+        reduce_config (ChainConfig): chain which combines summaries, takes them as its only input
+        token_budget (int): maximum tokens of transcript or summaries sent in one call
+        max_workers (int): maximum number of llm calls made at once
+        cache (Optional[ResponseCache]): cache of window and combined summaries
+        model_id (str): identifies the llm in cache keys
+    """
+
+    def __init__(
+        self,
+        llm: Union[LLM, API],
+        map_config: ChainConfig = MAP_SUMMARY_CHAIN,
+        reduce_config: ChainConfig = REDUCE_SUMMARY_CHAIN,
+        token_budget: int = SUMMARY_WINDOW_TOKENS,
+        max_workers: int = SUMMARY_MAX_WORKERS,
+        cache: Optional[ResponseCache] = response_cache,
+        model_id: Optional[str] = None,
+    ) -> None:
+        self.map_config = map_config
+        self.reduce_config = reduce_config
+        self.map_chain = self._create_chain(map_config, llm)
+        self.reduce_chain = self._create_chain(reduce_config, llm)
+        self.token_budget = token_budget
+        self.max_workers = max_workers
+        self.cache = cache
+        self.model_id = model_id or type(llm).__name__
+
+    @staticmethod
+    def _create_chain(config: ChainConfig, llm: Union[LLM, API]):
+        if isinstance(llm, API):
+            return APIChain(config, llm)
+        return LLMChainFactory.create_chain(config, llm)
+
+    def split_windows(self, transcript: Union[Transcript, str]) -> List[str]:
+        """
+        Splits a transcript into windows of whole speaker turns within the token budget.
+        A single turn over the budget is split on its own into budget sized pieces.
+        Once a window is half full it also ends at turns whose hash picks them as anchors,
+        so an edit which moves one window boundary doesn't move all those after it.
+        Args:
+            transcript (Union[Transcript, str]): transcript to split, or its rendered text
+                whose blank line separated paragraphs are taken as the turns
+        """
+        if isinstance(transcript, Transcript):
+            turns = transcript.speaker_turns()
+            lines = (turns["Speaker"].astype(str) + ": " + turns["Text"]).tolist()
+        else:
+            lines = [line.strip() for line in transcript.split("\n\n") if line.strip()]
+        windows, window, window_tokens = [], [], 0
+        for line in lines:
+            line_tokens = count_tokens(line)
+            is_anchor = zlib.crc32(line.encode("utf-8")) % 4 == 0
+            if window and (
+                window_tokens + line_tokens > self.token_budget
+                or (is_anchor and window_tokens >= self.token_budget // 2)
+            ):
+                windows.append("\n\n".join(window))
+                window, window_tokens = [], 0
+            if line_tokens > self.token_budget:
+                size = len(line) * self.token_budget // line_tokens
+                windows.extend(line[i : i + size] for i in range(0, len(line), size))
+                continue
+            window.append(line)
+            window_tokens += line_tokens
+        if window:
+            windows.append("\n\n".join(window))
+        return windows
+
+    def _group(self, summaries: List[str]) -> List[List[str]]:
+        """
+        Packs consecutive summaries into groups within the token budget, at least two to
+        a group so that every round of reduction shrinks the number of summaries.
+        """
+        groups, group, group_tokens = [], [], 0
+        for summary in summaries:
+            tokens = count_tokens(summary)
+            if len(group) >= 2 and group_tokens + tokens > self.token_budget:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(summary)
+            group_tokens += tokens
+        if len(group) == 1 and groups:
+            groups[-1].append(group[0])
+        elif group:
+            groups.append(group)
+        return groups
+
+    def _invoke(self, chain, config: ChainConfig, text: str) -> str:
+        key = make_cache_key(text, config.name, model=self.model_id)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        (input_key,) = config.var_input
+        summary = chain.invoke_query({input_key: text})
+        if self.cache is not None:
+            self.cache.set(key, summary)
+        return summary
+
+    def _map(self, window: str) -> str:
+        return self._invoke(self.map_chain, self.map_config, window)
+
+    def _reduce(self, summaries: List[str]) -> str:
+        return self._invoke(
+            self.reduce_chain, self.reduce_config, "\n\n".join(summaries)
+        )
+
+    def summarise(self, transcript: Union[Transcript, str]) -> str:
+        """
+        Summarises a transcript of any length.
+        Args:
+            transcript (Union[Transcript, str]): transcript to summarise, or its rendered text
+        """
+        windows = self.split_windows(transcript)
+        logger.info(f"Summarising transcript in {len(windows)} windows")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            summaries = list(pool.map(self._map, windows))
+            while len(summaries) > 1:
+                summaries = list(pool.map(self._reduce, self._group(summaries)))
+                logger.debug(f"Reduced to {len(summaries)} summaries")
+        return summaries[0] if summaries else ""
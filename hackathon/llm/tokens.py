@@ -0,0 +1,14 @@
+import math
+
+from config.settings import CHARS_PER_TOKEN
+
+
+def count_tokens(text: str, chars_per_token: float = CHARS_PER_TOKEN) -> int:
+    """
+    Estimates the number of tokens in text, the model tokenisers aren't available locally
+    so this uses the average characters per token of English text.
+    Args:
+        text (str): text to count
+        chars_per_token (float): average characters per token
+    """
+    return math.ceil(len(text) / chars_per_token)
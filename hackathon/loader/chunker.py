@@ -1,14 +1,27 @@
+import itertools
+import re
 from abc import ABC, abstractmethod
-from typing import List
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from config.settings import TRANSCRIPT_CHUNK_OVERLAP_TURNS, TRANSCRIPT_CHUNK_TOKENS
+from hackathon.llm.tokens import count_tokens
+
+# a paragraph of a rendered transcript, "Speaker: what they said"
+_RENDERED_TURN = re.compile(r"^([^:\n]{1,100}):\s*(.*)$", re.DOTALL)
+
 
 class Chunker(ABC):
 
     @abstractmethod
-    def chunk_documents(self) -> List[Document]:
+    def chunk_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Args:
+            documents (Iterable[Document]): documents to chunk, read as the chunks are consumed
+        """
         raise NotImplementedError()
 
 
@@ -18,19 +31,178 @@ class TextChunker(Chunker):
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.chunker = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size, chunk_overlap=self.overlap
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.overlap,
         )
 
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
-        print(len(documents))
-        docs = []
+    def chunk_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
         for doc in documents:
-            chunks = self.chunker.split_documents([doc])
-            for chunk in chunks:
-                new_doc = Document(
-                    page_content=chunk.page_content, metadata={**doc.metadata}
+            text = doc.page_content
+            if len(text) <= self.chunk_size:
+                yield Document(
+                    page_content=text, metadata={**doc.metadata, "start_index": 0}
+                )
+                continue
+            start_index = -1
+            for chunk in self.chunker.split_text(text):
+                # keeps the start_index of the chunk, which identifies it within its row
+                start_index = text.find(chunk, start_index + 1)
+                yield Document(
+                    page_content=chunk,
+                    metadata={**doc.metadata, "start_index": start_index},
                 )
-                docs.append(new_doc)
 
-        print(len(docs))
-        return docs
+
+@dataclass
+class _Turn:
+    """Consecutive utterances of one speaker, or part of them when they exceed the budget."""
+
+    transcript: Hashable
+    speaker: str
+    text: str
+    start_time: Any
+    end_time: Any
+    metadata: Dict
+
+    def render(self) -> str:
+        return f"{self.speaker}: {self.text}"
+
+
+class TranscriptChunker(Chunker):
+    """
+    Chunks transcripts into whole speaker turns packed up to a token budget, the last turns
+    of a chunk repeated at the start of the next. Chunks carry the speakers, start_time and
+    end_time of their turns as metadata, and start_index numbers their first turn within its
+    transcript. Documents are read in one pass and chunks yielded as soon as they are full.
+
+    Documents are either utterances in order, such as the rows of a transcript csv processed
+    with Speaker and Time metadata columns, or whole transcripts rendered as "Speaker: text"
+    paragraphs, see `Transcript`. Turns which exceed the budget alone are split into pieces.
+
+    Attributes:
+        max_tokens (int): token budget of a chunk
+        overlap_turns (int): turns repeated at the start of the next chunk
+        speaker_field (str): metadata field holding the speaker of an utterance
+        time_field (str): metadata field holding the time of an utterance
+        transcript_field (Optional[str]): metadata field identifying the transcript of an
+            utterance, chunks never span transcripts, None when every utterance is of one
+        length_function (Callable[[str], int]): counts the tokens of text
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = TRANSCRIPT_CHUNK_TOKENS,
+        overlap_turns: int = TRANSCRIPT_CHUNK_OVERLAP_TURNS,
+        speaker_field: str = "Speaker",
+        time_field: str = "Time",
+        transcript_field: Optional[str] = None,
+        length_function: Callable[[str], int] = count_tokens,
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_turns = overlap_turns
+        self.speaker_field = speaker_field
+        self.time_field = time_field
+        self.transcript_field = transcript_field
+        self.length_function = length_function
+
+    def _utterances(self, documents: Iterable[Document]) -> Iterator[_Turn]:
+        rendered = itertools.count()
+        for doc in documents:
+            metadata = doc.metadata
+            if self.speaker_field in metadata:
+                time = metadata.get(self.time_field)
+                transcript = (
+                    metadata.get(self.transcript_field)
+                    if self.transcript_field
+                    else None
+                )
+                yield _Turn(
+                    ("utterance", transcript),
+                    str(metadata[self.speaker_field]),
+                    doc.page_content.strip(),
+                    time,
+                    time,
+                    metadata,
+                )
+                continue
+            transcript = ("rendered", next(rendered))
+            for paragraph in re.split(r"\n\s*\n", doc.page_content):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                match = _RENDERED_TURN.match(paragraph)
+                speaker, text = match.groups() if match else ("", paragraph)
+                yield _Turn(transcript, speaker.strip(), text, None, None, metadata)
+
+    def _turns(self, documents: Iterable[Document]) -> Iterator[_Turn]:
+        """Joins consecutive utterances of a speaker, splitting turns over the budget."""
+        turn = None
+        for utterance in itertools.chain(self._utterances(documents), [None]):
+            if (
+                turn is not None
+                and utterance is not None
+                and utterance.transcript == turn.transcript
+                and utterance.speaker == turn.speaker
+            ):
+                turn.text = f"{turn.text} {utterance.text}"
+                turn.end_time = utterance.end_time
+                continue
+            if turn is not None:
+                if self.length_function(turn.render()) <= self.max_tokens:
+                    yield turn
+                else:
+                    # room for the speaker's name at the start of every piece
+                    budget = self.max_tokens - self.length_function(f"{turn.speaker}: ")
+                    splitter = RecursiveCharacterTextSplitter(
+                        chunk_size=max(budget, 1),
+                        chunk_overlap=0,
+                        length_function=self.length_function,
+                    )
+                    for piece in splitter.split_text(turn.text):
+                        yield replace(turn, text=piece)
+            turn = utterance
+
+    def _chunk(self, turns: List[_Turn], start_index: int) -> Document:
+        metadata = {
+            key: value
+            for key, value in turns[0].metadata.items()
+            if key not in (self.speaker_field, self.time_field)
+        }
+        metadata["speakers"] = list(dict.fromkeys(turn.speaker for turn in turns))
+        times = [turn for turn in turns if turn.start_time is not None]
+        if times:
+            metadata["start_time"] = times[0].start_time
+            metadata["end_time"] = times[-1].end_time
+        metadata["start_index"] = start_index
+        return Document(
+            page_content="\n\n".join(turn.render() for turn in turns),
+            metadata=metadata,
+        )
+
+    def chunk_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        window: List[_Turn] = []
+        sizes: List[int] = []
+        # number of the first turn of the window, and of the first turn not yet chunked
+        first, unchunked, number = 0, 0, 0
+        for turn in self._turns(documents):
+            size = self.length_function(turn.render())
+            if window and turn.transcript != window[0].transcript:
+                if number > unchunked:
+                    yield self._chunk(window, first)
+                window, sizes, first, unchunked, number = [], [], 0, 0, 0
+            elif window and sum(sizes) + size > self.max_tokens:
+                if number > unchunked:
+                    yield self._chunk(window, first)
+                    unchunked = number
+                keep = min(self.overlap_turns, len(window))
+                window, sizes = window[len(window) - keep :], sizes[len(sizes) - keep :]
+                first = number - keep
+                while window and sum(sizes) + size > self.max_tokens:
+                    window.pop(0)
+                    sizes.pop(0)
+                    first += 1
+            window.append(turn)
+            sizes.append(size)
+            number += 1
+        if window and number > unchunked:
+            yield self._chunk(window, first)
@@ -1,12 +1,24 @@
+import io
+import tempfile
+import threading
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
 import boto3
 import pandas as pd
+from botocore.config import Config
 from langchain_core.documents import Document
 
-from config.settings import PROJECT_PATH
+from config.settings import (
+    PROJECT_PATH,
+    S3_ENDPOINT_URL,
+    S3_MAX_CONCURRENCY,
+    S3_PART_SIZE,
+    S3_SPOOL_BYTES,
+)
 from hackathon.loader.processors import ProcessorFactory
 
 
@@ -19,6 +31,15 @@ class Loader(ABC):
         """
         raise NotImplementedError()
 
+    def open(self, file_name):
+        """
+        Returns the file to be read front to back, for processors which read incrementally.
+        Defaults to `load`.
+        Args:
+            file_name (str): name of the file to load
+        """
+        return self.load(file_name)
+
 
 class FileLoader(Loader):
     """
@@ -30,18 +51,154 @@ class FileLoader(Loader):
         return file_path
 
 
+class S3StreamingFile(io.RawIOBase):
+    """
+    Read only file over an s3 object, read front to back with ranged GETs. Up to
+    max_concurrency parts download ahead of the reader, so memory is bounded by
+    part_size * (max_concurrency + 1) whatever the size of the object.
+
+    Attributes:
+        size (int): size of the object in bytes
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key: str,
+        part_size: int = S3_PART_SIZE,
+        max_concurrency: int = S3_MAX_CONCURRENCY,
+    ) -> None:
+        super().__init__()
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        self.size = head["ContentLength"]
+        self._get_part = lambda start: _get_range(
+            s3_client,
+            bucket,
+            key,
+            head["ETag"],
+            start,
+            min(start + part_size, self.size),
+        )
+        self._starts = iter(range(0, self.size, part_size))
+        self._pool = ThreadPoolExecutor(max_concurrency)
+        self._pending = deque()
+        self._part = memoryview(b"")
+        for _ in range(max_concurrency):
+            self._fetch_next()
+
+    def _fetch_next(self) -> None:
+        start = next(self._starts, None)
+        if start is not None:
+            self._pending.append(self._pool.submit(self._get_part, start))
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._part:
+            if not self._pending:
+                return 0
+            self._part = memoryview(self._pending.popleft().result())
+            self._fetch_next()
+        n = min(len(buffer), len(self._part))
+        buffer[:n] = self._part[:n]
+        self._part = self._part[n:]
+        return n
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+        super().close()
+
+
+def _get_range(s3_client, bucket: str, key: str, etag: str, start: int, end: int):
+    # IfMatch fails the read rather than mixing parts of two versions of the object
+    response = s3_client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}", IfMatch=etag
+    )
+    return response["Body"].read()
+
+
 class S3Loader(Loader):
     """
-    S3 loader which loads files from s3.
+    S3 loader which loads files from s3. Objects larger than a part are downloaded with
+    concurrent ranged GETs into a temporary file, held in memory up to spool_bytes and
+    on disk beyond, and can be streamed front to back with `open`.
+
+    Attributes:
+        bucket (str): bucket the files are in
+        endpoint_url (Optional[str]): url of an s3 compatible store, None for AWS
+        part_size (int): bytes fetched by each ranged GET
+        max_concurrency (int): ranged GETs made at once
+        spool_bytes (int): size from which downloads are written to disk rather than memory
     """
 
-    def __init__(self, bucket: str) -> None:
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        part_size: int = S3_PART_SIZE,
+        max_concurrency: int = S3_MAX_CONCURRENCY,
+        spool_bytes: int = S3_SPOOL_BYTES,
+    ) -> None:
         self.bucket = bucket
-        self.s3_client = boto3.client("s3")
+        self.endpoint_url = endpoint_url
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.spool_bytes = spool_bytes
+        self.s3_client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max(10, max_concurrency)),
+        )
+
+    def load(self, file_name: str) -> IO[bytes]:
+        head = self.s3_client.head_object(Bucket=self.bucket, Key=file_name)
+        size = head["ContentLength"]
+        if size <= self.part_size:
+            obj = self.s3_client.get_object(Bucket=self.bucket, Key=file_name)
+            # BytesIO shares the bytes it is given rather than copying them
+            return BytesIO(obj["Body"].read())
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        lock = threading.Lock()
+
+        def download(start: int) -> None:
+            end = min(start + self.part_size, size)
+            part = _get_range(
+                self.s3_client, self.bucket, file_name, head["ETag"], start, end
+            )
+            with lock:
+                spool.seek(start)
+                spool.write(part)
 
-    def load(self, file_name: str) -> BytesIO:
-        obj = self.s3_client.get_object(Bucket=self.bucket, Key=file_name)
-        return BytesIO(obj["Body"].read())
+        try:
+            with ThreadPoolExecutor(self.max_concurrency) as pool:
+                # list raises the first failed download
+                list(pool.map(download, range(0, size, self.part_size)))
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+    def open(self, file_name: str) -> IO[bytes]:
+        """
+        Returns a buffered reader over the object which downloads it as it is read.
+        Args:
+            file_name (str): key of the object
+        """
+        return io.BufferedReader(
+            S3StreamingFile(
+                self.s3_client,
+                self.bucket,
+                file_name,
+                self.part_size,
+                self.max_concurrency,
+            ),
+            buffer_size=1024 * 1024,
+        )
 
 
 def load_and_process_file(
@@ -50,18 +207,37 @@ def load_and_process_file(
     source_column: Optional[str] = None,
     metadata_columns: Optional[List[str]] = None,
     content_columns: Optional[List[str]] = None,
-) -> List[Document]:
+    key_columns: Optional[List[str]] = None,
+    filters: Optional[List[Tuple[str, str, Any]]] = None,
+) -> Iterator[Document]:
     """
     This method takes a specific loader which controls where the file is loaded from and then
     takes a filename which is passed to a factory to chose which processor it needs and then
     load and process the data, The column config is used for processing the data.
+    Documents are yielded as the file is read, a batch of rows at a time.
     Args:
         loader (Loader): the loader which will be used to load the file
         file_path (str): name of file to process
+        filters (Optional[List[Tuple[str, str, Any]]]): (column, operator, value) conditions rows must meet to be read
     """
     processor = ProcessorFactory.get_processor(
-        file_name, source_column, metadata_columns, content_columns
+        file_name,
+        source_column,
+        metadata_columns,
+        content_columns,
+        key_columns,
+        filters,
     )
-    raw_data = loader.load(file_name)
-    docs = processor.transform_to_docs(raw_data)
-    return docs
+    raw_data = (
+        loader.open(file_name) if processor.incremental else loader.load(file_name)
+    )
+    return _transform_and_close(processor, raw_data)
+
+
+def _transform_and_close(processor, raw_data) -> Iterator[Document]:
+    """Yields the documents of the raw data, closing it once they are read."""
+    try:
+        yield from processor.transform_to_docs(raw_data)
+    finally:
+        if hasattr(raw_data, "close"):
+            raw_data.close()
@@ -1,8 +1,29 @@
+import operator
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 from langchain_core.documents import Document
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from config.settings import LOADER_BATCH_ROWS
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+
+# comparisons a filter can make, they apply to pandas columns and arrow expressions alike
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda column, values: column.isin(values),
+    "not in": lambda column, values: ~column.isin(values),
+}
 
 
 class Processor(ABC):
@@ -14,93 +35,192 @@ class Processor(ABC):
         source_column (Optional[str]): Unused currently an old paramater
         metadata_columns (Optional[List[str]]): Columns that will be set in the metadata
         content_columns (Optional[List[str]]): Columns which will be joined and formated into the document content
+        key_columns (Optional[List[str]]): Columns which identify a row, joined into the source_key metadata
+        batch_rows (int): Rows read and processed at a time
+        filters (Optional[List[Tuple[str, str, Any]]]): (column, operator, value) conditions rows must all
+            meet to be read, see FILTER_OPERATORS for the operators
     """
 
+    # whether the raw data is read front to back, so can be streamed as it downloads
+    incremental = False
+
     def __init__(
         self,
         source_column: Optional[str] = None,
         metadata_columns: Optional[List[str]] = None,
         content_columns: Optional[List[str]] = None,
+        key_columns: Optional[List[str]] = None,
+        batch_rows: int = LOADER_BATCH_ROWS,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
     ):
         self.source_column = source_column
         self.metadata_columns = metadata_columns
         self.content_columns = content_columns
+        self.key_columns = key_columns
+        self.batch_rows = batch_rows
+        self.filters = filters or []
+        for _, op, _ in self.filters:
+            if op not in FILTER_OPERATORS:
+                raise ValueError(
+                    f"Filter operator {op} is not one of {list(FILTER_OPERATORS)}"
+                )
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns the documents are built from, the only ones read from the file."""
+        columns = (
+            (self.content_columns or [])
+            + (self.metadata_columns or [])
+            + (self.key_columns or [])
+        )
+        return list(dict.fromkeys(columns))
+
+    def _filter_clauses(self, column_of) -> list:
+        return [
+            FILTER_OPERATORS[op](column_of(column), value)
+            for column, op, value in self.filters
+        ]
 
     @abstractmethod
-    def transform_to_docs(self, raw_data) -> pd:
+    def read_batches(self, raw_data) -> Iterator[pd.DataFrame]:
         """
+        Reads the raw data as dataframes of up to batch_rows rows.
         Args:
             raw_data (): raw file data to read
         """
         raise NotImplementedError()
 
+    def transform_to_docs(self, raw_data) -> Iterator[Document]:
+        """
+        Lazily processes the raw data into documents a batch of rows at a time, so memory
+        is bounded by batch_rows rather than by the size of the file.
+        Args:
+            raw_data (): raw file data to read
+        """
+        for df in self.read_batches(raw_data):
+            yield from self._dataframe_process(df)
+
     def _dataframe_process(self, df) -> List[Document]:
         """
         Processes a dataframe of the data into a list of langchain document.
-        It creates the document content and it's metadata from each row in the dataframe.
+        It creates the document content and it's metadata from each row in the dataframe,
+        working a column at a time so the only pass over the rows builds the documents.
         Args:
             df (pandas): a dataframe of the data.
         """
-        df["content"] = df.apply(
-            lambda row: "\n".join(
-                [str(row[col]).strip() for col in self.content_columns]
-            ),
-            axis=1,
-        )
-        if self.metadata_columns:
-            df["metadata"] = df.apply(self._process_metadata, axis=1)
+        contents = _join_columns(df, self.content_columns, "\n", strip=True)
+        metadata = {col: _filterable(df[col]) for col in self.metadata_columns or []}
+        if self.key_columns:
+            metadata[SOURCE_KEY_FIELD] = _join_columns(df, self.key_columns, "|")
+        if metadata:
+            records = pd.DataFrame(metadata, index=df.index).to_dict("records")
         else:
-            df["metadata"] = {}
+            records = [{} for _ in range(len(df))]
 
-        df["metadata"] = df["metadata"].apply(lambda x: None if pd.isna(x) else x)
+        # TODO re-add source column setting
 
-        docs = df.apply(
-            lambda row: Document(page_content=row["content"], metadata=row["metadata"]),
-            axis=1,
-        ).tolist()
+        return [
+            Document(page_content=content, metadata=record)
+            for content, record in zip(contents, records)
+        ]
 
-        # TODO re-add source column setting
 
-        return docs
+def _join_columns(
+    df: pd.DataFrame, columns: List[str], separator: str, strip: bool = False
+) -> pd.Series:
+    """Joins the values of columns as strings, concatenating whole columns at a time."""
+    joined = None
+    for col in columns:
+        values = df[col].astype(str)
+        if strip:
+            values = values.str.strip()
+        joined = values if joined is None else joined + separator + values
+    return joined
 
-    def _process_metadata(self, row):
-        """
-        Sets the values of metadata ensuring it's type so it can be filterd on.
-        Args:
-            row (): a row of data
-        """
-        metadata = {}
-        for col in self.metadata_columns:
-            value = row[col]
-            if isinstance(value, int):
-                metadata[col] = int(value)
-            elif isinstance(value, float):
-                metadata[col] = float(value)
-            elif isinstance(value, list):
-                metadata[col] = list(value)
-            else:
-                metadata[col] = str(value)
-        return metadata
+
+def _filterable_value(value: Any) -> Any:
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, list):
+        return list(value)
+    return str(value)
+
+
+def _filterable(values: pd.Series) -> pd.Series:
+    """
+    Casts a metadata column to types it can be filterd on, the same way the values of each
+    row used to be cast so that content hashes don't change: ints, floats and lists are
+    kept, bools become ints and anything else a string, such as "2020-01-01 00:00:00" for
+    a datetime. Number columns are kept whole, others are cast a value at a time.
+    Args:
+        values (pd.Series): a metadata column
+    """
+    if is_numeric_dtype(values) and not is_bool_dtype(values):
+        return values
+    return values.map(_filterable_value)
 
 
 class CSVProcessor(Processor):
-    def transform_to_docs(self, raw_data) -> List[Document]:
+    incremental = True
+
+    def read_batches(self, raw_data) -> Iterator[pd.DataFrame]:
         """
+        Reads chunks of the csv parsing only the columns needed, rows not meeting the
+        filters are dropped from each chunk.
         Args:
             raw_data (): raw csv data to read
         """
-        df = pd.read_csv(raw_data)
-        return self._dataframe_process(df)
+        usecols = None
+        if self.columns:
+            usecols = list(
+                dict.fromkeys(self.columns + [c for c, _, _ in self.filters])
+            )
+        with pd.read_csv(
+            raw_data, usecols=usecols, chunksize=self.batch_rows
+        ) as reader:
+            for df in reader:
+                clauses = self._filter_clauses(lambda column: df[column])
+                if clauses:
+                    df = df[np.logical_and.reduce(clauses)]
+                if len(df):
+                    yield df
 
 
 class ParquetProcessor(Processor):
-    def transform_to_docs(self, raw_data) -> List[Document]:
+    def read_batches(self, raw_data) -> Iterator[pd.DataFrame]:
         """
+        Reads the parquet a row group at a time, decoding only the columns needed. Row groups
+        whose statistics show no row can meet the filters are skipped without being read,
+        and the rest are filtered as they are decoded.
         Args:
             raw_data (): raw parquet data to read
         """
-        df = pd.read_parquet(raw_data)
-        return self._dataframe_process(df)
+        is_path = isinstance(raw_data, (str, os.PathLike))
+        if is_path:
+            fragment = ds.ParquetFileFormat().make_fragment(
+                os.fspath(raw_data), filesystem=pafs.LocalFileSystem()
+            )
+        else:
+            fragment = ds.ParquetFileFormat().make_fragment(raw_data)
+        schema = fragment.physical_schema
+        clauses = self._filter_clauses(ds.field)
+        expression = None
+        for clause in clauses:
+            expression = clause if expression is None else expression & clause
+        for row_group in fragment.split_by_row_group(expression, schema=schema):
+            batches = row_group.to_batches(
+                schema=schema,
+                columns=self.columns or None,
+                filter=expression,
+                batch_size=self.batch_rows,
+                # arrow's threads can't safely read python file objects
+                use_threads=is_path,
+            )
+            for batch in batches:
+                if batch.num_rows:
+                    yield batch.to_pandas()
 
 
 class ProcessorFactory:
@@ -114,17 +234,34 @@ class ProcessorFactory:
         source_column: Optional[str] = None,
         metadata_columns: Optional[List[str]] = None,
         content_columns: Optional[List[str]] = None,
+        key_columns: Optional[List[str]] = None,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
     ):
         """
         Args:
             file_path (str): File name and path that will be processed
+            filters (Optional[List[Tuple[str, str, Any]]]): conditions rows must meet to be read
         Raises:
             ValueError: when the file type is not got a supportted processor
         """
         extension = file_path.split(".")[-1].lower()
         if extension == "csv":
-            return CSVProcessor(source_column, metadata_columns, content_columns)
+            return CSVProcessor(
+                source_column,
+                metadata_columns,
+                content_columns,
+                key_columns,
+                filters=filters,
+            )
         elif extension == "parquet":
-            return ParquetProcessor(source_column, metadata_columns, content_columns)
+            return ParquetProcessor(
+                source_column,
+                metadata_columns,
+                content_columns,
+                key_columns,
+                filters=filters,
+            )
         else:
-            ValueError(f"File type {extension} does not have a supported processor")
+            raise ValueError(
+                f"File type {extension} does not have a supported processor"
+            )
@@ -22,6 +22,7 @@ from config.logging import setup_logging
 from config.settings import (
     AWS_REGION,
     AWS_SAGEMAKER_ENDPOINT,
+    CHUNKER_CONFIG,
     EMBEDDING_ENDPOINT_NAME,
     LLM_MODEL,
     LOADER_CONFIG,
@@ -39,11 +40,13 @@ from config.settings import (
 # )
 from hackathon.llm.llm import LLama2, SagemakerHostedLLM
 from hackathon.llm.llm_handler import LLMRunner
-from hackathon.loader.chunker import TextChunker
+from hackathon.loader.chunker import TextChunker, TranscriptChunker
 from hackathon.loader.loader import FileLoader, S3Loader
 from hackathon.vectorstore.embeddings import (
+    create_batched_sagemaker_embeddings,
     create_sagemaker_embeddings_from_hosted_model,
 )
+from hackathon.vectorstore.local_vectorstore import LocalVectorStore
 from hackathon.vectorstore.opensearch import OpensearchClient
 from hackathon.vectorstore.vectorstore import (
     OpensearchClientStore,
@@ -70,11 +73,14 @@ def initialise_llm_runner():
             EMBEDDING_ENDPOINT_NAME, AWS_REGION
         )
 
-    vector_store = OpenSearchStore(
-        st_embedder,
-        OPENSEARCH_INDEX_NAME,
-        st.session_state["vacancy_os_client"],
-    )
+    if VECTOR_STORE_CONFIG == "local":
+        vector_store = get_local_vector_store(st_embedder)
+    else:
+        vector_store = OpenSearchStore(
+            st_embedder,
+            OPENSEARCH_INDEX_NAME,
+            st.session_state["vacancy_os_client"],
+        )
 
     if LLM_MODEL == "local_llm":
         llm_model_path = f"{PROJECT_PATH}/models/llama-2-7b-chat.Q4_K_M.gguf"
@@ -93,24 +99,37 @@ def initialise_llm_runner():
     st.session_state["runner"] = llm_runner
 
 
+def get_local_vector_store(embedder):
+    """
+    The local vector store is shared through the session, as the loader and llm runner
+    must search and load the same in memory data.
+    """
+    if "local_vector_store" not in st.session_state:
+        st.session_state["local_vector_store"] = LocalVectorStore(embedder)
+    return st.session_state["local_vector_store"]
+
+
 def initialise_vector_store_loader():
     if LLM_MODEL == "local_llm":
         st_embedder = SentenceTransformerEmbeddings(
             model_name="sentence-transformers/all-MiniLM-L6-v2"
         )
     else:
-        st_embedder = create_sagemaker_embeddings_from_hosted_model(
+        st_embedder = create_batched_sagemaker_embeddings(
             EMBEDDING_ENDPOINT_NAME, AWS_REGION
         )
 
-    if "vacancy_os_client" not in st.session_state:
-        st.session_state["vacancy_os_client"] = OpensearchClient(
-            OPENSEARCH_INDEX_NAME, OPENSEARCH_ENDPOINT_NAME, AWS_REGION
-        )
-    vector_store = OpensearchClientStore(
-        st_embedder,
-        OPENSEARCH_INDEX_NAME,
-        st.session_state["vacancy_os_client"],
+    if VECTOR_STORE_CONFIG == "local":
+        vector_store = get_local_vector_store(st_embedder)
+    else:
+        if "vacancy_os_client" not in st.session_state:
+            st.session_state["vacancy_os_client"] = OpensearchClient(
+                OPENSEARCH_INDEX_NAME, OPENSEARCH_ENDPOINT_NAME, AWS_REGION
+            )
+        vector_store = OpensearchClientStore(
+            st_embedder,
+            OPENSEARCH_INDEX_NAME,
+            st.session_state["vacancy_os_client"],
         )
 
     if LOADER_CONFIG == "file_loader":
@@ -122,10 +141,17 @@ def initialise_vector_store_loader():
     else:
         raise ValueError("Invalid loader configured")
 
+    if CHUNKER_CONFIG == "text":
+        chunker = TextChunker(chunk_size=1000, overlap=10)
+    elif CHUNKER_CONFIG == "transcript":
+        chunker = TranscriptChunker()
+    else:
+        raise ValueError("Invalid chunker configured")
+
     st.session_state["vs_loader"] = VectorstoreLoader(
         vectorstore_client=vector_store,
         loader=loader,
-        chunker=TextChunker(chunk_size=1000, overlap=10),
+        chunker=chunker,
     )
 
 
@@ -1,24 +1,223 @@
 import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterator, List, Optional, Set
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.settings import TRANSCRIPT_CHUNK_SIZE
+
+COLUMNAR_EXTENSIONS = (".parquet", ".arrow", ".feather")
+# text is held in arrow string arrays, which concatenate without copying
+TEXT_DTYPE = pd.StringDtype("pyarrow")
+
+
+def _file_extension(file_path) -> str:
+    """Extension of a path, or of the name of a file-like object such as a streamlit upload."""
+    if isinstance(file_path, (str, os.PathLike)):
+        name = os.fspath(file_path)
+    else:
+        name = getattr(file_path, "name", "")
+    return os.path.splitext(name)[1].lower()
+
+
+def _arrow_types(arrow_type: pa.DataType):
+    # keep strings in the arrow buffers rather than copying them out to python objects
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def _selected(names: List[str], columns: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Names of a file's columns to read, matched to the columns wanted by title case as the
+    columns are named once read. None reads every column.
+    """
+    if columns is None:
+        return None
+    wanted = {col.title() for col in columns}
+    return [name for name in names if name.title() in wanted]
+
+
+def _check_columns(columns) -> None:
+    if not "Speaker" in columns:
+        raise ValueError('No "Speaker" column in transcript')
+    if not "Text" in columns:
+        raise ValueError('No "Text" field found in transcript')
+
+
+def _typed(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gives the Speaker and Text columns of transcript data their dtypes, whatever format it
+    was read from. Time and other columns keep the dtype they were read with, as times may
+    be numbers or strings such as 12:01:00 and a fixed dtype could change their order.
+    """
+    return data.astype({"Speaker": "category", "Text": TEXT_DTYPE})
+
+
+def _in_time_order(time: pd.Series) -> bool:
+    """Whether times are increasing with any missing times at the end, as sorting leaves them."""
+    present = int(time.notna().sum())
+    return bool(time.iloc[:present].notna().all()) and (
+        time.iloc[:present].is_monotonic_increasing
+    )
+
+
+def _merge_sorted_runs(
+    run_paths: List[str], speaker_dtype: pd.CategoricalDtype, block_rows: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Merges parquet files each sorted on Time into blocks of rows sorted on Time,
+    holding at most one block of rows per file in memory.
+    Args:
+        run_paths (List[str]): sorted parquet files to merge, with no missing times
+        speaker_dtype (pd.CategoricalDtype): dtype of the Speaker column across all files
+        block_rows (int): rows read from a file at a time
+    """
+    batches = [
+        pq.ParquetFile(path).iter_batches(batch_size=block_rows) for path in run_paths
+    ]
+
+    def next_block(run):
+        batch = next(batches[run], None)
+        if batch is None:
+            return None
+        block = _typed(batch.to_pandas(types_mapper=_arrow_types))
+        block["Speaker"] = block["Speaker"].astype(speaker_dtype)
+        return block
+
+    blocks = {run: next_block(run) for run in range(len(run_paths))}
+    blocks = {run: block for run, block in blocks.items() if block is not None}
+    while blocks:
+        # every row up to the smallest of the blocks' last times is final
+        threshold = min(block["Time"].iloc[-1] for block in blocks.values())
+        ready = []
+        for run in list(blocks):
+            block = blocks[run]
+            is_ready = block["Time"] <= threshold
+            ready.append(block[is_ready])
+            rest = block[~is_ready]
+            if len(rest) == 0:
+                rest = next_block(run)
+            if rest is None:
+                del blocks[run]
+            else:
+                blocks[run] = rest
+        yield pd.concat(ready).sort_values("Time", kind="stable")
+
+
+@dataclass
+class TranscriptChange:
+    """
+    A row level edit to a transcript.
+
+    Attributes:
+        version (int): transcript version the edit produced
+        row (Hashable): index label of the row, None when the whole transcript was replaced
+        kind (str): "changed", "added", "removed" or "replaced"
+        column (Optional[str]): column of a changed value
+        old (Any): value before a change
+        new (Any): value after a change
+    """
+
+    version: int
+    row: Hashable
+    kind: str
+    column: Optional[str] = None
+    old: Any = None
+    new: Any = None
+
+
+def _render_lines(data: pd.DataFrame) -> pd.Series:
+    return (
+        "\n\n"
+        + data["Speaker"].astype(str)
+        + ": "
+        + data["Text"].fillna("").astype(str)
+    )
+
+
+def _differs(before: pd.Series, after: pd.Series) -> np.ndarray:
+    """Mask of the positions where two aligned series hold different values, nulls equal."""
+    if before.dtype != after.dtype:
+        before, after = before.astype(object), after.astype(object)
+    differs = (before != after).fillna(True).to_numpy(dtype=bool)
+    return differs & ~(before.isna() & after.isna()).to_numpy()
+
+
+def _diff(old: pd.DataFrame, new: pd.DataFrame, version: int) -> List[TranscriptChange]:
+    """
+    Row level differences between two versions of transcript data, matched on index.
+    Args:
+        old (pd.DataFrame): data before the edit
+        new (pd.DataFrame): data after the edit
+        version (int): version to record on the changes
+    """
+    if not (old.index.is_unique and new.index.is_unique):
+        return [TranscriptChange(version, None, "replaced")]
+    changes = [
+        TranscriptChange(version, row, "removed")
+        for row in old.index.difference(new.index, sort=False)
+    ]
+    changes += [
+        TranscriptChange(version, row, "added")
+        for row in new.index.difference(old.index, sort=False)
+    ]
+    same_index = new.index.equals(old.index)
+    common = new.index if same_index else new.index.intersection(old.index, sort=False)
+    for column in new.columns:
+        after = new[column] if same_index else new.loc[common, column]
+        if column not in old.columns:
+            before = pd.Series(None, index=common, dtype=object)
+        else:
+            before = old[column] if same_index else old.loc[common, column]
+        differs = _differs(before, after)
+        changes += [
+            TranscriptChange(version, row, "changed", column, before[row], after[row])
+            for row in common[differs]
+        ]
+    return changes
 
 
 class Transcript:
 
-    def __init__(self, file_path: str = None, data: pd.DataFrame = None):
+    def __init__(
+        self,
+        file_path: str = None,
+        data: pd.DataFrame = None,
+        chunksize: Optional[int] = TRANSCRIPT_CHUNK_SIZE,
+        columns: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            file_path (str): csv, parquet or arrow file, or file-like object, to read the transcript from
+            data (pd.DataFrame): transcript data to use when no file_path is given
+            chunksize (Optional[int]): rows of a csv read at a time, None reads it in one go
+            columns (Optional[List[str]]): only read these columns from the file, in any case, defaults to all
+        """
         self.file_path = file_path
 
         if file_path is not None:
-            data = pd.read_csv(file_path)
+            if _file_extension(file_path) in COLUMNAR_EXTENSIONS:
+                data = self._read_columnar(file_path, columns)
+            else:
+                usecols = None
+                if columns is not None:
+                    usecols = lambda col: bool(_selected([col], columns))
+                if chunksize:
+                    data = self._read_csv_chunked(file_path, chunksize, usecols)
+                else:
+                    data = pd.read_csv(file_path, usecols=usecols)
         data.columns = [col.title() for col in data.columns]
 
-        if not "Speaker" in data.columns:
-            raise ValueError('No "Speaker" column in transcript')
-        if not "Text" in data.columns:
-            raise ValueError('No "Text" field found in transcript')
+        _check_columns(data.columns)
+        data = _typed(data)
 
-        if "Time" in data.columns:
-            data = data.sort_values("Time")
+        if "Time" in data.columns and not _in_time_order(data["Time"]):
+            data = data.sort_values("Time", kind="stable")
 
         if "Approved?" not in data.columns:
             data["Approved?"] = False
@@ -30,27 +229,209 @@ class Transcript:
         else:
             self.is_approved = False
 
-        data = data[[col for col in data.columns if "Unnamed" not in col]]
+        if any("Unnamed" in col for col in data.columns):
+            data = data[[col for col in data.columns if "Unnamed" not in col]]
 
         self.data = data
+        self.version = 0
+        self.changes: List[TranscriptChange] = []
+        self._lines = None
+        self._rendered = None
+        self._rendered_version = None
+
+    @staticmethod
+    def _read_csv_chunked(file_path, chunksize: int, usecols=None) -> pd.DataFrame:
+        """
+        Reads a transcript csv in chunks of rows with a categorical Speaker column and
+        arrow backed Text, so the chunks are joined without copying the text and memory
+        stays close to the size of the final frame however large the file.
+        When the file is not in Time order each chunk is sorted and spilled to disk,
+        and the chunks are merged back with an external merge sort. Rows with no time
+        go last, as `sort_values` leaves them.
+        Args:
+            file_path (str): csv file, or file-like object
+            chunksize (int): rows to read at a time
+            usecols: columns to read, see `pd.read_csv`
+        """
+        chunks, run_paths, untimed, speakers = [], [], [], set()
+        is_sorted, last_time = True, None
+        with tempfile.TemporaryDirectory() as spill_dir:
+            reader = pd.read_csv(file_path, chunksize=chunksize, usecols=usecols)
+            for i, chunk in enumerate(reader):
+                chunk.columns = [col.title() for col in chunk.columns]
+                if i == 0:
+                    _check_columns(chunk.columns)
+                chunk = _typed(
+                    chunk.drop(
+                        columns=[col for col in chunk.columns if "Unnamed" in col]
+                    )
+                )
+                speakers.update(chunk["Speaker"].cat.categories)
+                if "Time" in chunk.columns:
+                    # rows with no time can't be merged on, they are put aside for the end
+                    no_time = chunk["Time"].isna()
+                    if no_time.any():
+                        untimed.append(chunk[no_time])
+                        chunk = chunk[~no_time]
+                    if len(chunk):
+                        is_sorted = (
+                            is_sorted
+                            and chunk["Time"].is_monotonic_increasing
+                            and (
+                                last_time is None or chunk["Time"].iloc[0] >= last_time
+                            )
+                        )
+                        last_time = chunk["Time"].iloc[-1]
+                if is_sorted:
+                    chunks.append(chunk)
+                    continue
+                # out of order, spill everything read so far as sorted runs
+                for run in [run for run in chunks + [chunk] if len(run)]:
+                    path = os.path.join(spill_dir, f"{len(run_paths)}.parquet")
+                    run.sort_values("Time", kind="stable").to_parquet(path)
+                    run_paths.append(path)
+                chunks = []
+
+            speaker_dtype = pd.CategoricalDtype(sorted(speakers, key=str))
+            if run_paths:
+                chunks = list(_merge_sorted_runs(run_paths, speaker_dtype, chunksize))
+            chunks += untimed
+            for chunk in chunks:
+                chunk["Speaker"] = chunk["Speaker"].astype(speaker_dtype)
+            return pd.concat(chunks, copy=False)
+
+    @staticmethod
+    def _read_columnar(file_path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Reads a transcript saved as parquet or as an arrow file. Files on disk are memory
+        mapped, and arrow files are read without copying, Speaker stays dictionary encoded
+        as a categorical column and Text has the dtype it has when read from a csv.
+        Args:
+            file_path (str): parquet or arrow file, or file-like object
+            columns (Optional[List[str]]): only read these columns, matched in any case as
+                for a csv, defaults to all
+        """
+        is_path = isinstance(file_path, (str, os.PathLike))
+        if _file_extension(file_path) == ".parquet":
+            parquet_file = pq.ParquetFile(file_path, memory_map=is_path)
+            table = parquet_file.read(
+                columns=_selected(parquet_file.schema_arrow.names, columns)
+            )
+        else:
+            source = pa.memory_map(os.fspath(file_path)) if is_path else file_path
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(_selected(table.column_names, columns))
+        return _typed(table.to_pandas(types_mapper=_arrow_types))
 
     def __repr__(self):
         return f"Transcript object stored at {self.file_path}\n\n{self.data.__repr__()}"
 
     def __str__(self):
-        s = ""
-        for ix, row in self.data.iterrows():
-            s = f"{s}\n\n{row['Speaker']}: {row['Text']}"
-        return s
+        # rendered once per version, changes to the data must go through update_data
+        if self._rendered_version != self.version:
+            if self._lines is None:
+                self._lines = _render_lines(self.data)
+            self._rendered = "".join(self._lines.tolist())
+            self._rendered_version = self.version
+        return self._rendered
 
     def __getitem__(self, key):
         return getattr(self.data, key)
 
+    def speaker_turns(self) -> pd.DataFrame:
+        """
+        Returns the transcript as speaker turns, consecutive rows by the same speaker joined.
+        Has Speaker and Text columns, plus Start Time and End Time if the transcript has times.
+        """
+        data = self.data
+        turn = (data["Speaker"] != data["Speaker"].shift()).cumsum()
+        grouped = data.assign(Text=data["Text"].fillna("").astype(str)).groupby(
+            turn, sort=False
+        )
+        turns = pd.DataFrame(
+            {
+                "Speaker": grouped["Speaker"].first(),
+                "Text": grouped["Text"].agg(" ".join),
+            }
+        )
+        if "Time" in data.columns:
+            turns["Start Time"] = grouped["Time"].first()
+            turns["End Time"] = grouped["Time"].last()
+        return turns.reset_index(drop=True)
+
     def update_data(self, data: pd.DataFrame) -> None:
+        """
+        Replaces the transcript data, recording the row level edits in `changes`.
+        Only the rows that changed are re-rendered, and the version is only bumped
+        when something did change.
+        Args:
+            data (pd.DataFrame): edited transcript data, rows matched to the current data on index
+        """
+        changes = _diff(self.data, data, self.version + 1)
+        if not changes:
+            return
+        if changes[0].kind == "replaced":
+            self._lines = None
+        elif self._lines is not None:
+            rerender = {
+                change.row
+                for change in changes
+                if change.kind == "added" or change.column in ("Speaker", "Text")
+            }
+            lines = self._lines.reindex(data.index)
+            if rerender:
+                rows = [row for row in data.index if row in rerender]
+                lines.loc[rows] = _render_lines(data.loc[rows])
+            self._lines = lines
+        if "Approved?" in data.columns:
+            self.is_approved = bool(data["Approved?"].all())
         self.data = data
+        self.version += 1
+        self.changes += changes
+
+    def changes_since(self, version: int) -> List[TranscriptChange]:
+        """
+        Returns the edits made after a version, for dependents to update only what changed.
+        Args:
+            version (int): the version the dependent was computed at
+        """
+        return [change for change in self.changes if change.version > version]
+
+    def rows_changed_since(self, version: int) -> Optional[Set[Hashable]]:
+        """
+        Returns the index labels of rows edited, added or removed after a version,
+        None if the whole transcript was replaced.
+        Args:
+            version (int): the version the dependent was computed at
+        """
+        rows = set()
+        for change in self.changes_since(version):
+            if change.kind == "replaced":
+                return None
+            rows.add(change.row)
+        return rows
 
     def save_transcript(self, write_path: str) -> None:
-        if write_path[-4:] != ".csv":
-            raise ValueError("Must be saved to a .csv!")
+        """
+        Saves the transcript as a csv, parquet or arrow file depending on the extension.
+        Arrow files are written uncompressed so they can be memory mapped when read back.
+        Args:
+            write_path (str): path to save to
+        """
+        extension = _file_extension(write_path)
+        if extension not in (".csv",) + COLUMNAR_EXTENSIONS:
+            raise ValueError("Must be saved to a .csv, .parquet or .arrow!")
 
-        self.data.to_csv(write_path, index=False)
+        if extension == ".csv":
+            self.data.to_csv(write_path, index=False)
+            return
+
+        data = self.data.astype({"Speaker": "category"})
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        if extension == ".parquet":
+            pq.write_table(table, write_path)
+        else:
+            with pa.OSFile(write_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
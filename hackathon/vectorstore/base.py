@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+@dataclass
+class RetrievalResult:
+    """
+    Results of one query of a batch.
+
+    Attributes:
+        query (str): the query searched
+        hits (List[Tuple[Document, float]]): documents found with their scores, most similar first
+        seconds (float): time the search of this query took
+        error (Optional[str]): why the search failed, None if it succeeded
+    """
+
+    query: str
+    hits: List[Tuple[Document, float]]
+    seconds: float
+    error: Optional[str] = None
+
+
+class VectorStore(ABC):
+    """
+    VectorStore class in control of searching an exisiting vector store.
+    """
+
+    @abstractmethod
+    def store_data(self, documents: List[Document]):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def retrieve_data(self, query: str):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_as_retriever(self, search_kwargs: int = 2):
+        raise NotImplementedError()
+
+
+class VectorStoreClient(ABC):
+    """
+    Vector Store Client class charged with loading data into the vector store.
+    """
+
+    @abstractmethod
+    def store_data(self, documents):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def sync_data(self, documents):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def reindex_data(self, documents):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def check_data_exists(self, store=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def create_store(self, store=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete_data_store(self, store=None):
+        raise NotImplementedError()
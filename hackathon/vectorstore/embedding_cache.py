@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.logging import setup_logging
+from config.settings import EMBEDDING_CACHE_DTYPE, EMBEDDING_CACHE_PATH
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+KEY_BYTES = 32
+
+
+def embeddings_model_id(embeddings: Embeddings) -> str:
+    """
+    Name of the model behind an embeddings function, used to key its cached vectors.
+    Args:
+        embeddings (Embeddings): embeddings function, wrappers are looked through
+    """
+    inner = getattr(embeddings, "embeddings", None)
+    if isinstance(inner, Embeddings):
+        return embeddings_model_id(inner)
+    for attribute in ("endpoint_name", "model_name", "model_id", "model"):
+        value = getattr(embeddings, attribute, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+
+def make_embedding_key(text: str, model_id: str, kind: str = "document") -> bytes:
+    """
+    Content addressed key for an embedding, the sha256 of the text and the model which embedded it.
+    Args:
+        text (str): text embedded
+        model_id (str): model the text was embedded with
+        kind (str): "document" or "query", as some models embed them differently
+    """
+    digest = hashlib.sha256()
+    for part in (model_id, kind, text):
+        encoded = part.encode("utf-8")
+        # length prefix so parts can't run into each other
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.digest()
+
+
+class EmbeddingStore:
+    """
+    Append only store of vectors on disk. Vectors are rows of a memory mapped matrix in
+    `vectors.bin` and the key of every row is stored at the same position in `index.bin`,
+    so opening the store only reads the keys.
+
+    Attributes:
+        path (str): directory of the store
+        dtype (np.dtype): type the vectors are stored as
+        dimensions (Optional[int]): length of the vectors, None until the first is stored
+    """
+
+    def __init__(self, path: str, dtype: str = EMBEDDING_CACHE_DTYPE) -> None:
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.dimensions: Optional[int] = None
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._index_path = os.path.join(path, "index.bin")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._rows: Dict[bytes, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _open(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if meta["dtype"] != self.dtype.name:
+            raise ValueError(
+                f"Embedding store {self.path} holds {meta['dtype']} vectors, not {self.dtype.name}"
+            )
+        self.dimensions = meta["dimensions"]
+        row_bytes = self.dimensions * self.dtype.itemsize
+        with open(self._index_path, "rb") as f:
+            keys = f.read()
+        rows = min(
+            len(keys) // KEY_BYTES, os.path.getsize(self._vectors_path) // row_bytes
+        )
+        # drop anything written by an append which didn't complete
+        os.truncate(self._index_path, rows * KEY_BYTES)
+        os.truncate(self._vectors_path, rows * row_bytes)
+        self._rows = {keys[i * KEY_BYTES : (i + 1) * KEY_BYTES]: i for i in range(rows)}
+        self._map()
+        logger.info(f"Opened embedding store {self.path} with {rows} vectors")
+
+    def _map(self) -> None:
+        if self._rows:
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=self.dtype,
+                mode="r",
+                shape=(len(self._rows), self.dimensions),
+            )
+
+    def missing(self, keys: Sequence[bytes]) -> List[bytes]:
+        """Returns the keys which have no vector stored."""
+        return [key for key in keys if key not in self._rows]
+
+    def get(self, keys: Sequence[bytes]) -> np.ndarray:
+        """
+        Returns the vectors of the keys as a float32 matrix, all keys must be stored.
+        Args:
+            keys (Sequence[bytes]): keys of the vectors, see `make_embedding_key`
+        """
+        with self._lock:
+            rows = [self._rows[key] for key in keys]
+            if not rows:
+                return np.empty((0, self.dimensions or 0), dtype=np.float32)
+            return self._matrix[rows].astype(np.float32)
+
+    def add(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Appends vectors to the store, skipping keys which are already stored.
+        Args:
+            keys (Sequence[bytes]): keys of the vectors, see `make_embedding_key`
+            vectors (Sequence[Sequence[float]]): vectors in the order of the keys
+        """
+        with self._lock:
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    new[key] = vector
+            if not new:
+                return
+            matrix = np.asarray(list(new.values()), dtype=self.dtype)
+            if self.dimensions is None:
+                self.dimensions = matrix.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump(
+                        {"dtype": self.dtype.name, "dimensions": self.dimensions}, f
+                    )
+            elif matrix.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Embedding store {self.path} holds vectors of length {self.dimensions}, "
+                    f"not {matrix.shape[1]}"
+                )
+            # vectors before keys, so a key is never stored without its vector
+            with open(self._vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self._index_path, "ab") as f:
+                f.write(b"".join(new))
+            for key in new:
+                self._rows[key] = len(self._rows)
+            self._map()
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embeds a batch of queries as queries, not documents, so they are cached as queries and
+    embedded with the model's query instructions. Uses the embeddings' own embed_queries
+    if they have one, otherwise embeds each query in turn.
+    Args:
+        embeddings (Embeddings): embeddings function
+        texts (List[str]): queries to embed
+    """
+    batched = getattr(embeddings, "embed_queries", None)
+    if batched is not None:
+        return batched(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings which are only computed for documents not embedded before, vectors are kept
+    in an `EmbeddingStore` keyed by the text and the model which embedded it. Queries are
+    passed through.
+
+    Attributes:
+        embeddings (Embeddings): embeddings function used for texts not in the store
+        store (EmbeddingStore): store of previously computed vectors
+        model_id (str): identifies the model in the keys of the store
+        hits (int): number of documents served from the store
+        misses (int): number of documents which had to be embedded
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        store: EmbeddingStore,
+        model_id: Optional[str] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.store = store
+        self.model_id = model_id or embeddings_model_id(embeddings)
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, texts: List[str], kind: str, embed) -> List[List[float]]:
+        keys = [make_embedding_key(text, self.model_id, kind) for text in texts]
+        missing = dict.fromkeys(self.store.missing(keys))
+        if missing:
+            text_of = dict(zip(keys, texts))
+            self.store.add(list(missing), embed([text_of[key] for key in missing]))
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        logger.debug(
+            f"Embedded {len(missing)} of {len(keys)} texts, the rest were cached"
+        )
+        return self.store.get(keys).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document", self.embeddings.embed_documents)
+
+    # queries are free text from users, so they are left to the bounded in memory
+    # QueryEmbeddingCache rather than kept on disk for good
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return embed_queries(self.embeddings, texts)
+
+    def stats(self) -> Dict:
+        """
+        Returns the hit and miss counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "vectors": len(self.store),
+        }
+
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def cache_embeddings(
+    embeddings: Embeddings,
+    path: str = EMBEDDING_CACHE_PATH,
+    dtype: str = EMBEDDING_CACHE_DTYPE,
+) -> Embeddings:
+    """
+    Wraps an embeddings function in a `CachedEmbeddings`, stored in a directory of path
+    per model. Returns the embeddings unchanged if they are already cached or path is empty.
+    Args:
+        embeddings (Embeddings): embeddings function to cache
+        path (str): directory of the cache
+        dtype (str): type the vectors are stored as, float32 or float16
+    """
+    if not path or isinstance(embeddings, CachedEmbeddings):
+        return embeddings
+    model_id = embeddings_model_id(embeddings)
+    directory = os.path.join(path, re.sub(r"[^\w.-]", "_", model_id))
+    # one store per directory, as two stores appending to the same files would corrupt them
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = EmbeddingStore(directory, dtype)
+        store = _stores[directory]
+    return CachedEmbeddings(embeddings, store, model_id)
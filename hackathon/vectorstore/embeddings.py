@@ -1,9 +1,18 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
 
 from langchain.embeddings import SagemakerEndpointEmbeddings
 from langchain.embeddings.sagemaker_endpoint import EmbeddingsContentHandler
+from langchain_core.embeddings import Embeddings
 
 from config.logging import setup_logging
+from config.settings import (
+    EMBEDDING_BATCH_BYTES,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_IN_FLIGHT,
+)
+from hackathon.vectorstore.embedding_cache import embed_queries
 
 get_logger = setup_logging()
 logger = get_logger(__name__)
@@ -48,3 +57,102 @@ def create_sagemaker_embeddings_from_hosted_model(
         },
     )
     return embeddings
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper which packs texts into as few endpoint requests as the payload
+    limits allow, and sends the requests concurrently.
+
+    Attributes:
+        embeddings (Embeddings): embeddings to send the batches to
+        max_batch_bytes (int): maximum utf-8 size of the texts in one request
+        max_batch_size (int): maximum number of texts in one request
+        max_in_flight (int): maximum number of requests sent at once
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_bytes: int = EMBEDDING_BATCH_BYTES,
+        max_batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+    ) -> None:
+        self.embeddings = embeddings
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_size = max_batch_size
+        self.max_in_flight = max_in_flight
+
+    def _batches(self, texts: List[str]) -> Iterator[List[str]]:
+        """Packs consecutive texts into batches within the size limits."""
+        batch, batch_bytes = [], 0
+        for text in texts:
+            text_bytes = len(text.encode("utf-8"))
+            if batch and (
+                batch_bytes + text_bytes > self.max_batch_bytes
+                or len(batch) >= self.max_batch_size
+            ):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(text)
+            batch_bytes += text_bytes
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        if isinstance(self.embeddings, SagemakerEndpointEmbeddings):
+            # one request for the whole batch rather than the default chunks of 64
+            return self.embeddings.embed_documents(batch, chunk_size=len(batch))
+        return self.embeddings.embed_documents(batch)
+
+    def _embed_query_batch(self, batch: List[str]) -> List[List[float]]:
+        if isinstance(self.embeddings, SagemakerEndpointEmbeddings):
+            # the endpoint embeds queries as it does documents, so they can share a request
+            return self.embeddings.embed_documents(batch, chunk_size=len(batch))
+        return embed_queries(self.embeddings, batch)
+
+    def _embed_batches(self, texts: List[str], embed_batch) -> List[List[float]]:
+        batches = list(self._batches(texts))
+        if len(batches) <= 1:
+            return [v for batch in batches for v in embed_batch(batch)]
+        logger.debug(f"Embedding {len(texts)} texts in {len(batches)} requests")
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            results = pool.map(embed_batch, batches)
+            return [vector for vectors in results for vector in vectors]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts in concurrent batches, returning the vectors in the order of the texts.
+        Args:
+            texts (List[str]): texts to embed
+        """
+        return self._embed_batches(texts, self._embed_batch)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds queries in batches as `embed_documents` does, rather than a request per query.
+        Args:
+            texts (List[str]): queries to embed
+        """
+        return self._embed_batches(texts, self._embed_query_batch)
+
+
+def create_batched_sagemaker_embeddings(
+    embeddings_model_endpoint_name: str, aws_region: str, **batch_kwargs
+) -> BatchingEmbeddings:
+    """
+    Sagemaker hosted embeddings which send texts in concurrent batches, see `BatchingEmbeddings`.
+    Args:
+        embeddings_model_endpoint_name (str): name of the sagemaker endpoint
+        aws_region (str): region the endpoint is deployed in
+        batch_kwargs: keyword arguments passed on to `BatchingEmbeddings`
+    """
+    return BatchingEmbeddings(
+        create_sagemaker_embeddings_from_hosted_model(
+            embeddings_model_endpoint_name, aws_region
+        ),
+        **batch_kwargs,
+    )
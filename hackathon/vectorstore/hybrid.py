@@ -0,0 +1,52 @@
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from config.settings import HYBRID_RANK_CONSTANT
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]], rank_constant: int = HYBRID_RANK_CONSTANT
+) -> List[Tuple[Hashable, float]]:
+    """
+    Fuses rankings into one, scoring each item by the sum of 1 / (rank_constant + rank) over
+    the rankings it appears in, ranks starting at 1. Returns the items with their scores,
+    highest first.
+    Args:
+        rankings (Sequence[Sequence[Hashable]]): rankings of items, best first
+        rank_constant (int): dampens the weight of the top ranks, 60 as in the original paper
+    """
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1 / (rank_constant + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def text_query(query: str, pre_filter: Optional[Dict] = None) -> Dict:
+    """BM25 match of query on the text field, with pre_filter applied to the metadata."""
+    match = {"match": {"text": {"query": query}}}
+    if not pre_filter:
+        return match
+    return {"bool": {"must": [match], "filter": pre_filter}}
+
+
+def knn_query(vector: List[float], k: int, pre_filter: Optional[Dict] = None) -> Dict:
+    """k-NN query of the k nearest neighbours of vector, with pre_filter applied to the metadata."""
+    knn = {"knn": {"vector_field": {"vector": vector, "k": k}}}
+    if not pre_filter:
+        return knn
+    return {"bool": {"must": [knn], "filter": pre_filter}}
+
+
+def rrf_pipeline(rank_constant: int = HYBRID_RANK_CONSTANT) -> Dict:
+    """Body of a search pipeline which fuses the sub-queries of a hybrid query by rank."""
+    return {
+        "description": "Reciprocal rank fusion of hybrid queries",
+        "phase_results_processors": [
+            {
+                "score-ranker-processor": {
+                    "combination": {"technique": "rrf", "rank_constant": rank_constant}
+                }
+            }
+        ],
+    }
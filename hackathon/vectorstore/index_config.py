@@ -0,0 +1,285 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from opensearchpy.exceptions import NotFoundError
+
+from config.settings import (
+    OPENSEARCH_HNSW_EF_CONSTRUCTION,
+    OPENSEARCH_HNSW_EF_SEARCH,
+    OPENSEARCH_HNSW_M,
+    OPENSEARCH_PCA_DIMENSIONS,
+    OPENSEARCH_QUANTIZATION,
+    OPENSEARCH_TRANSFORM_INDEX,
+)
+from hackathon.vectorstore.embedding_cache import embed_queries
+
+QUANTIZATIONS = ("", "fp16", "byte")
+# engine each quantisation is supported by, float32 vectors keep langchain's default
+ENGINES = {"": "nmslib", "fp16": "faiss", "byte": "lucene"}
+# key of the transform in the mapping _meta of indexes created before transforms were
+# stored in OPENSEARCH_TRANSFORM_INDEX
+TRANSFORM_META = "vector_transform"
+
+
+@dataclass
+class VectorTransform:
+    """
+    Transform fitted on a sample of embeddings and applied to every vector stored in and
+    searched against an index: an optional PCA projection to fewer dimensions, then an
+    optional scaling of the values into the signed byte range.
+
+    Attributes:
+        mean (Optional[np.ndarray]): mean the vectors are centred on before projecting
+        components (Optional[np.ndarray]): principal components, one row per output dimension
+        scale (Optional[float]): factor mapping values into [-128, 127], None to keep floats
+        samples (Optional[int]): number of vectors the transform was fitted to, None if unknown
+    """
+
+    mean: Optional[np.ndarray] = None
+    components: Optional[np.ndarray] = None
+    scale: Optional[float] = None
+    samples: Optional[int] = None
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: Sequence[Sequence[float]],
+        pca_dimensions: int = 0,
+        quantize_bytes: bool = False,
+    ) -> "VectorTransform":
+        """
+        Fits a transform to a sample of vectors. A PCA fitted to fewer vectors than
+        pca_dimensions has zero components past the rank of the sample: distances between the
+        sample vectors are kept, anything outside their span is lost, see `undersampled`.
+        Args:
+            vectors (Sequence[Sequence[float]]): sample of the vectors to be transformed
+            pca_dimensions (int): dimensions to project the vectors to, 0 to keep them all
+            quantize_bytes (bool): whether to scale the vectors for byte storage
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        transform = cls(samples=len(vectors))
+        if pca_dimensions:
+            transform.mean = vectors.mean(axis=0)
+            # rows of vt are the principal components, largest variance first
+            _, _, vt = np.linalg.svd(vectors - transform.mean, full_matrices=False)
+            transform.components = np.zeros(
+                (pca_dimensions, vectors.shape[1]), dtype=np.float32
+            )
+            transform.components[: len(vt)] = vt[:pca_dimensions]
+        if quantize_bytes:
+            largest = float(np.abs(transform._project(vectors)).max())
+            transform.scale = 127 / max(largest, 1e-12)
+        return transform
+
+    @property
+    def pca_dimensions(self) -> int:
+        return 0 if self.components is None else len(self.components)
+
+    @property
+    def undersampled(self) -> bool:
+        """Whether the PCA was fitted to fewer vectors than it has dimensions."""
+        return self.samples is not None and self.samples < self.pca_dimensions
+
+    def matches(self, config: "IndexConfig") -> bool:
+        """
+        Whether the transform produces the vectors an index of config stores, and was fitted
+        to enough vectors to be reused for a new index.
+        """
+        return (
+            self.pca_dimensions == config.pca_dimensions
+            and (self.scale is not None) == (config.quantization == "byte")
+            and not self.undersampled
+        )
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        if self.components is None:
+            return vectors
+        return (vectors - self.mean) @ self.components.T
+
+    def apply(self, vectors: Sequence[Sequence[float]]) -> List[List[float]]:
+        """Returns the transformed vectors, as ints when they are scaled for byte storage."""
+        vectors = self._project(np.asarray(vectors, dtype=np.float32))
+        if self.scale is None:
+            return vectors.tolist()
+        return (
+            np.clip(np.rint(vectors * self.scale), -128, 127).astype(np.int8).tolist()
+        )
+
+    def to_meta(self) -> Dict:
+        return {
+            "mean": None if self.mean is None else self.mean.tolist(),
+            "components": None if self.components is None else self.components.tolist(),
+            "scale": self.scale,
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_meta(cls, meta: Dict) -> "VectorTransform":
+        return cls(
+            mean=None if meta["mean"] is None else np.asarray(meta["mean"], np.float32),
+            components=(
+                None
+                if meta["components"] is None
+                else np.asarray(meta["components"], np.float32)
+            ),
+            scale=meta["scale"],
+            samples=meta.get("samples"),
+        )
+
+
+@dataclass
+class IndexConfig:
+    """
+    How the vectors of an opensearch index are stored and searched.
+
+    Attributes:
+        quantization (str): "" for float32 vectors, "fp16" for half precision with faiss scalar
+            quantisation, "byte" for signed byte vectors with lucene
+        pca_dimensions (int): dimensions vectors are reduced to by a PCA fitted at ingest, 0 to keep them all
+        space_type (str): distance of the knn searches
+        m (int): HNSW links per node, more improves recall at the cost of memory
+        ef_construction (int): HNSW candidates considered while indexing
+        ef_search (int): HNSW candidates considered while searching, more improves recall at the cost of latency
+    """
+
+    quantization: str = OPENSEARCH_QUANTIZATION
+    pca_dimensions: int = OPENSEARCH_PCA_DIMENSIONS
+    space_type: str = "l2"
+    m: int = OPENSEARCH_HNSW_M
+    ef_construction: int = OPENSEARCH_HNSW_EF_CONSTRUCTION
+    ef_search: int = OPENSEARCH_HNSW_EF_SEARCH
+
+    def __post_init__(self) -> None:
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Quantization {self.quantization} is not one of {QUANTIZATIONS}"
+            )
+
+    @property
+    def needs_transform(self) -> bool:
+        """Whether vectors have to be transformed before they are stored or searched."""
+        return bool(self.pca_dimensions) or self.quantization == "byte"
+
+    def fit_transform(self, vectors: Sequence[Sequence[float]]) -> VectorTransform:
+        return VectorTransform.fit(
+            vectors, self.pca_dimensions, self.quantization == "byte"
+        )
+
+    def mapping(self, dimensions: int) -> Dict:
+        """
+        Returns the body an index is created with.
+        Args:
+            dimensions (int): length of the vectors stored, after any PCA
+        """
+        method = {
+            "name": "hnsw",
+            "space_type": self.space_type,
+            "engine": ENGINES[self.quantization],
+            "parameters": {"ef_construction": self.ef_construction, "m": self.m},
+        }
+        field = {"type": "knn_vector", "dimension": dimensions, "method": method}
+        if self.quantization == "fp16":
+            method["parameters"]["encoder"] = {
+                "name": "sq",
+                "parameters": {"type": "fp16", "clip": True},
+            }
+        elif self.quantization == "byte":
+            field["data_type"] = "byte"
+        return {
+            "settings": {
+                "index": {"knn": True, "knn.algo_param.ef_search": self.ef_search}
+            },
+            "mappings": {"properties": {"vector_field": field}},
+        }
+
+
+def save_transform(client, index_name: str, transform: VectorTransform) -> None:
+    """
+    Stores the transform of an index as a document of the transform index, rather than in
+    the mapping of the index where it would sit in the cluster state.
+    """
+    if not client.indices.exists(index=OPENSEARCH_TRANSFORM_INDEX):
+        client.indices.create(
+            index=OPENSEARCH_TRANSFORM_INDEX,
+            # the transforms are only read back whole, never searched
+            body={"mappings": {"dynamic": False, "properties": {}}},
+            ignore=400,
+        )
+    try:
+        # keyed by the index an alias points at, as load_transform looks it up
+        index_names = list(client.indices.get_mapping(index=index_name))
+    except NotFoundError:
+        index_names = [index_name]
+    for name in index_names:
+        client.index(
+            index=OPENSEARCH_TRANSFORM_INDEX,
+            id=name,
+            body={"transform": transform.to_meta()},
+            refresh=True,
+        )
+
+
+def load_transform(client, index_name: str) -> Optional[VectorTransform]:
+    """
+    Returns the transform of an index or of the index behind an alias, None if the index
+    doesn't exist or its vectors aren't transformed.
+    """
+    try:
+        mappings = client.indices.get_mapping(index=index_name)
+    except NotFoundError:
+        return None
+    try:
+        docs = client.mget(
+            index=OPENSEARCH_TRANSFORM_INDEX, body={"ids": list(mappings)}
+        )
+    except NotFoundError:
+        docs = {"docs": []}
+    for doc in docs["docs"]:
+        if doc.get("found"):
+            return VectorTransform.from_meta(doc["_source"]["transform"])
+    for mapping in mappings.values():
+        meta = mapping.get("mappings", {}).get("_meta", {}).get(TRANSFORM_META)
+        if meta:
+            return VectorTransform.from_meta(meta)
+    return None
+
+
+def delete_transforms(client, index_names: Iterable[str]) -> None:
+    """Deletes the stored transforms of indexes which have been deleted."""
+    for index_name in index_names:
+        client.delete(index=OPENSEARCH_TRANSFORM_INDEX, id=index_name, ignore=404)
+
+
+class TransformedEmbeddings(Embeddings):
+    """
+    Embeddings passed through the transform of the index they are searched against.
+
+    Attributes:
+        embeddings (Embeddings): embeddings function to transform
+        transform (Callable): returns the current transform, or None to pass vectors through
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        transform: Callable[[], Optional[VectorTransform]],
+    ) -> None:
+        self.embeddings = embeddings
+        self.transform = transform
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embeddings.embed_documents(texts)
+        transform = self.transform()
+        return transform.apply(vectors) if transform is not None else vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.embeddings.embed_query(text)
+        transform = self.transform()
+        return transform.apply([vector])[0] if transform is not None else vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        vectors = embed_queries(self.embeddings, texts)
+        transform = self.transform()
+        return transform.apply(vectors) if transform is not None else vectors
@@ -0,0 +1,272 @@
+import hashlib
+import itertools
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from config.logging import setup_logging
+from config.settings import (
+    INGEST_EMBED_WORKERS,
+    INGEST_INDEX_WORKERS,
+    INGEST_QUEUE_SIZE,
+    INGEST_RETRIES,
+    INGEST_RETRY_BACKOFF,
+)
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+_DONE = object()
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        # length prefix so parts can't run into each other
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def content_hash(doc: Document) -> str:
+    """Hash of the text and metadata of a document, which changes whenever it needs reindexing."""
+    return _sha256(
+        doc.page_content, json.dumps(doc.metadata, sort_keys=True, default=str)
+    )
+
+
+def document_id(doc: Document) -> str:
+    """
+    Deterministic id of a document, so reloading a source overwrites its documents.
+    Chunks of a keyed source row are identified by the row key and their offset in the
+    row, other documents by their content.
+    Args:
+        doc (Document): document to identify
+    """
+    source_key = doc.metadata.get(SOURCE_KEY_FIELD)
+    if source_key is None:
+        return content_hash(doc)
+    return _sha256(str(source_key), str(doc.metadata.get("start_index", 0)))
+
+
+@dataclass
+class StageStats:
+    """
+    Throughput of one stage of an ingestion.
+
+    Attributes:
+        name (str): name of the stage
+        docs (int): documents the stage completed
+        batches (int): batches the stage completed
+        retries (int): failed attempts which were retried
+        dead_letters (int): batches given up on
+        started_at (Optional[float]): when the stage started its first batch
+        finished_at (Optional[float]): when the stage finished its last batch
+    """
+
+    name: str
+    docs: int = 0
+    batches: int = 0
+    retries: int = 0
+    dead_letters: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def docs_per_second(self) -> float:
+        if not self.docs or self.started_at is None:
+            return 0.0
+        return self.docs / max(self.finished_at - self.started_at, 1e-9)
+
+
+@dataclass
+class DeadLetter:
+    """A batch which kept failing, kept so that it can be inspected and stored again."""
+
+    stage: str
+    documents: List[Document]
+    error: Exception
+
+
+@dataclass
+class IngestionReport:
+    """
+    Outcome of an ingestion.
+
+    Attributes:
+        stages (Dict[str, StageStats]): throughput of each stage by name
+        dead_letters (List[DeadLetter]): batches which failed every attempt
+        seconds (float): time the whole ingestion took
+        unchanged (int): documents skipped by a sync as they were already indexed
+        deleted (int): documents a sync deleted as they are no longer in the source
+    """
+
+    stages: Dict[str, StageStats]
+    dead_letters: List[DeadLetter] = field(default_factory=list)
+    seconds: float = 0.0
+    unchanged: int = 0
+    deleted: int = 0
+
+    @property
+    def docs_indexed(self) -> int:
+        return self.stages["index"].docs
+
+    def dead_letter_documents(self) -> List[Document]:
+        """Returns the documents of every dead lettered batch, to be stored again."""
+        return [doc for letter in self.dead_letters for doc in letter.documents]
+
+    def summary(self) -> str:
+        stages = ", ".join(
+            f"{s.name} {s.docs} docs at {s.docs_per_second:.1f} docs/s"
+            f" ({s.retries} retries, {s.dead_letters} dead lettered batches)"
+            for s in self.stages.values()
+        )
+        return f"Ingested in {self.seconds:.1f}s: {stages}"
+
+
+class IngestionPipeline:
+    """
+    Ingests batches of documents in two stages connected by bounded queues, so that
+    embedding the next batches overlaps indexing the previous ones. Each stage has its
+    own pool of worker threads, a failed batch is retried with exponential backoff and
+    dead lettered once out of retries so the rest of the load carries on.
+
+    Attributes:
+        embed (Callable): takes a batch of documents and returns their embedded form
+        index (Callable): takes a batch of documents and their embedded form and indexes them
+        embed_workers (int): number of batches embedded at once
+        index_workers (int): number of batches indexed at once
+        queue_size (int): maximum batches waiting for each stage, bounding memory use
+        retries (int): attempts made at a failed batch before dead lettering it
+        backoff (float): seconds before the first retry, doubled for each further retry
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[Document]], Any],
+        index: Callable[[List[Document], Any], None],
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        index_workers: int = INGEST_INDEX_WORKERS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        retries: int = INGEST_RETRIES,
+        backoff: float = INGEST_RETRY_BACKOFF,
+    ) -> None:
+        self.embed = embed
+        self.index = index
+        self.embed_workers = embed_workers
+        self.index_workers = index_workers
+        self.queue_size = queue_size
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+
+    def _attempt(self, stats: StageStats, func: Callable, *args):
+        for attempt in itertools.count():
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff * 2**attempt
+                logger.warning(
+                    f"{stats.name} batch failed with {e!r}, retrying in {delay:.1f}s"
+                )
+                with self._lock:
+                    stats.retries += 1
+                time.sleep(delay)
+
+    def _worker(
+        self,
+        report: IngestionReport,
+        stats: StageStats,
+        func: Callable,
+        inbox: queue.Queue,
+        outbox: Optional[queue.Queue],
+    ) -> None:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            documents = item[0]
+            started_at = time.perf_counter()
+            try:
+                result = self._attempt(stats, func, *item)
+            except Exception as e:
+                logger.error(
+                    f"Dead lettering a batch of {len(documents)} documents which failed "
+                    f"{stats.name} {self.retries + 1} times: {e!r}"
+                )
+                with self._lock:
+                    stats.dead_letters += 1
+                    report.dead_letters.append(DeadLetter(stats.name, documents, e))
+                continue
+            with self._lock:
+                stats.docs += len(documents)
+                stats.batches += 1
+                if stats.started_at is None:
+                    stats.started_at = started_at
+                stats.finished_at = time.perf_counter()
+            if outbox is not None:
+                outbox.put((documents, result))
+
+    def _start(self, n_workers: int, *args) -> List[threading.Thread]:
+        workers = [
+            threading.Thread(target=self._worker, args=args, daemon=True)
+            for _ in range(n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        return workers
+
+    @staticmethod
+    def _stop(workers: List[threading.Thread], inbox: queue.Queue) -> None:
+        for _ in workers:
+            inbox.put(_DONE)
+        for worker in workers:
+            worker.join()
+
+    def run(self, batches: Iterable[List[Document]]) -> IngestionReport:
+        """
+        Embeds and indexes batches of documents, returning the throughput of each stage
+        and the batches which were dead lettered.
+        Args:
+            batches (Iterable[List[Document]]): batches of documents, read as the stages have room for them
+        """
+        report = IngestionReport(
+            {name: StageStats(name) for name in ("embed", "index")}
+        )
+        embed_queue = queue.Queue(self.queue_size)
+        index_queue = queue.Queue(self.queue_size)
+        start = time.perf_counter()
+        embedders = self._start(
+            self.embed_workers,
+            report,
+            report.stages["embed"],
+            self.embed,
+            embed_queue,
+            index_queue,
+        )
+        indexers = self._start(
+            self.index_workers,
+            report,
+            report.stages["index"],
+            self.index,
+            index_queue,
+            None,
+        )
+        try:
+            for batch in batches:
+                embed_queue.put((batch,))
+        finally:
+            self._stop(embedders, embed_queue)
+            self._stop(indexers, index_queue)
+            report.seconds = time.perf_counter() - start
+        logger.info(report.summary())
+        return report
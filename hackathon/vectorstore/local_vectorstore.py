@@ -0,0 +1,779 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+
+from config.logging import setup_logging
+from config.settings import (
+    LOCAL_VECTOR_ANN_THRESHOLD,
+    LOCAL_VECTOR_NPROBE,
+    LOCAL_VECTOR_SPACE_TYPE,
+    LOCAL_VECTOR_STORE_PATH,
+    OPENSEARCH_BATCH_SIZE,
+)
+from hackathon.vectorstore.base import RetrievalResult, VectorStore, VectorStoreClient
+from hackathon.vectorstore.embedding_cache import cache_embeddings, embed_queries
+from hackathon.vectorstore.ingestion import (
+    IngestionPipeline,
+    IngestionReport,
+    content_hash,
+    document_id,
+)
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+SPACE_TYPES = ("l2", "cosinesimil", "innerproduct")
+# rows of a matrix scored at once, bounding the memory of the intermediate scores
+_BLOCK_ROWS = 65_536
+# vectors sampled per IVF list to train the list centroids
+_TRAINING_SAMPLES_PER_LIST = 40
+_KMEANS_ITERATIONS = 10
+
+
+def _field(metadata: Dict, field: str):
+    field = field.removeprefix("metadata.").removesuffix(".keyword")
+    return metadata.get(field)
+
+
+def _equals(value, expected) -> bool:
+    if isinstance(value, list):
+        return expected in value
+    return value == expected
+
+
+def _in_range(value, bounds: Dict) -> bool:
+    if value is None:
+        return False
+    checks = {
+        "gt": lambda b: value > b,
+        "gte": lambda b: value >= b,
+        "lt": lambda b: value < b,
+        "lte": lambda b: value <= b,
+    }
+    try:
+        return all(checks[op](b) for op, b in bounds.items() if op in checks)
+    except TypeError:
+        return False
+
+
+def _as_list(clauses) -> List[Dict]:
+    return clauses if isinstance(clauses, list) else [clauses]
+
+
+def matches_filter(metadata: Dict, pre_filter: Optional[Dict]) -> bool:
+    """
+    Whether document metadata passes a pre filter. The filter is either a dict of metadata
+    values to match, or the part of the opensearch query DSL used for pre filters, so the
+    same filter works against either store: bool (must, filter, should, must_not), term,
+    terms, match, range, exists and match_all, on fields with or without the metadata. prefix.
+    Args:
+        metadata (Dict): metadata of the document
+        pre_filter (Optional[Dict]): filter to apply, None matches everything
+    """
+    if not pre_filter:
+        return True
+    if len(pre_filter) != 1 or next(iter(pre_filter)) not in _QUERIES:
+        return all(
+            _equals(_field(metadata, field), expected)
+            for field, expected in pre_filter.items()
+        )
+    ((kind, body),) = pre_filter.items()
+    return _QUERIES[kind](metadata, body)
+
+
+def _bool(metadata: Dict, body: Dict) -> bool:
+    required = _as_list(body.get("must", [])) + _as_list(body.get("filter", []))
+    should = _as_list(body.get("should", []))
+    return (
+        all(matches_filter(metadata, clause) for clause in required)
+        and (not should or any(matches_filter(metadata, c) for c in should))
+        and not any(
+            matches_filter(metadata, c) for c in _as_list(body.get("must_not", []))
+        )
+    )
+
+
+def _unwrap(expected, key: str):
+    return expected[key] if isinstance(expected, dict) else expected
+
+
+_QUERIES: Dict[str, Callable[[Dict, Any], bool]] = {
+    "bool": _bool,
+    "term": lambda metadata, body: all(
+        _equals(_field(metadata, f), _unwrap(v, "value")) for f, v in body.items()
+    ),
+    "match": lambda metadata, body: all(
+        _equals(_field(metadata, f), _unwrap(v, "query")) for f, v in body.items()
+    ),
+    "terms": lambda metadata, body: all(
+        any(_equals(_field(metadata, f), v) for v in values)
+        for f, values in body.items()
+    ),
+    "range": lambda metadata, body: all(
+        _in_range(_field(metadata, f), bounds) for f, bounds in body.items()
+    ),
+    "exists": lambda metadata, body: _field(metadata, body["field"]) is not None,
+    "match_all": lambda metadata, body: True,
+}
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k highest scores of each row, highest first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid to each vector by euclidean distance."""
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    return np.concatenate(
+        [
+            np.argmax(vectors[i : i + _BLOCK_ROWS] @ centroids.T - half_norms, axis=1)
+            for i in range(0, len(vectors), _BLOCK_ROWS)
+        ]
+        or [np.empty(0, dtype=np.intp)]
+    )
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    # written alongside and renamed over, so a memory map of the old file stays valid
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(f"{path}.tmp", path)
+
+
+class NumpyVectorSearch(LangchainVectorStore):
+    """
+    LangChain vector store held in memory as a contiguous float32 matrix. Small corpora are
+    searched exactly with a matrix multiply of every query against every vector, corpora of
+    ann_threshold vectors or more through an IVF index, k-means lists of which only the
+    nprobe nearest to a query are scored. Higher scores are more similar, l2 and innerproduct
+    scores are on opensearch's scale and cosine similarity is mapped to between 0 and 1.
+
+    Attributes:
+        embedding_function (Embeddings): embeds the texts and queries
+        space_type (str): l2, cosinesimil or innerproduct
+        ann_threshold (int): corpus size from which searches use the IVF index
+        nprobe (int): number of IVF lists scored for each query
+        texts (List[str]): text of each row
+        metadatas (List[Dict]): metadata of each row
+        ids (List[str]): id of each row
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        space_type: str = LOCAL_VECTOR_SPACE_TYPE,
+        ann_threshold: int = LOCAL_VECTOR_ANN_THRESHOLD,
+        nprobe: int = LOCAL_VECTOR_NPROBE,
+    ) -> None:
+        if space_type not in SPACE_TYPES:
+            raise ValueError(f"Space type {space_type} is not one of {SPACE_TYPES}")
+        self.embedding_function = embedding_function
+        self.space_type = space_type
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.texts: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.intp)
+        self._trained_size = 0
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: len(self)]
+
+    def _reserve(self, dimensions: int, extra: int) -> None:
+        """Grows the matrix to fit extra rows, doubling its capacity to amortise copies."""
+        size = len(self)
+        if self._vectors.shape[1] not in (0, dimensions) and size:
+            raise ValueError(
+                f"Vectors of length {dimensions} can't be added to a store of length "
+                f"{self._vectors.shape[1]}"
+            )
+        capacity = self._vectors.shape[0]
+        if size + extra <= capacity and self._vectors.flags.writeable:
+            return
+        capacity = max(size + extra, 2 * capacity)
+        vectors = np.empty((capacity, dimensions), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        if size:
+            vectors[:size] = self._vectors[:size]
+            sq_norms[:size] = self._sq_norms[:size]
+        self._vectors, self._sq_norms = vectors, sq_norms
+
+    def add_vectors(
+        self,
+        vectors: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Adds embedded texts, replacing any rows which already have their ids.
+        Args:
+            vectors (List[List[float]]): vector of each text
+            texts (List[str]): texts to add
+            metadatas (Optional[List[Dict]]): metadata of each text
+            ids (Optional[List[str]]): id of each text, random if not given
+        """
+        if not texts:
+            return []
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        if self.space_type == "cosinesimil":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        with self._lock:
+            self._reserve(matrix.shape[1], len(texts))
+            rows = []
+            for id, text, metadata in zip(ids, texts, metadatas):
+                row = self._rows.get(id)
+                if row is None:
+                    row = self._rows[id] = len(self.ids)
+                    self.ids.append(id)
+                    self.texts.append(text)
+                    self.metadatas.append(metadata)
+                else:
+                    self.texts[row] = text
+                    self.metadatas[row] = metadata
+                rows.append(row)
+            self._vectors[rows] = matrix
+            self._sq_norms[rows] = np.einsum("ij,ij->i", matrix, matrix)
+            if self._centroids is not None:
+                assignments = np.resize(self._assignments, len(self))
+                assignments[rows] = _nearest(matrix, self._centroids)
+                self._assignments = assignments
+                self._lists = None
+        return list(ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding_function.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Deletes the rows with the given ids, compacting the matrix."""
+        with self._lock:
+            remove = {self._rows[id] for id in ids or [] if id in self._rows}
+            if not remove:
+                return True
+            keep = np.setdiff1d(
+                np.arange(len(self)), np.fromiter(remove, dtype=np.intp)
+            )
+            size = len(keep)
+            if not self._vectors.flags.writeable:
+                self._reserve(self._vectors.shape[1], 0)
+            self._vectors[:size] = self._vectors[keep]
+            self._sq_norms[:size] = self._sq_norms[keep]
+            self.texts = [self.texts[i] for i in keep]
+            self.metadatas = [self.metadatas[i] for i in keep]
+            self.ids = [self.ids[i] for i in keep]
+            self._rows = {id: row for row, id in enumerate(self.ids)}
+            if self._centroids is not None:
+                self._assignments = self._assignments[keep]
+                self._lists = None
+        return True
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Scores of queries against rows of the matrix, all rows if rows is None."""
+        if rows is None:
+            vectors, sq_norms = self.vectors, self._sq_norms[: len(self)]
+        else:
+            vectors, sq_norms = self._vectors[rows], self._sq_norms[rows]
+        dots = queries @ vectors.T
+        if self.space_type == "l2":
+            query_sq_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+            distances = np.maximum(sq_norms - 2 * dots + query_sq_norms, 0)
+            return 1 / (1 + distances)
+        if self.space_type == "cosinesimil":
+            return (1 + dots) / 2
+        return np.where(dots >= 0, dots + 1, 1 / (1 - dots))
+
+    def _ensure_ivf(self) -> None:
+        """Trains the IVF lists, again whenever the corpus has doubled since they were trained."""
+        size = len(self)
+        if self._centroids is not None and size <= 2 * self._trained_size:
+            if self._lists is None:
+                order = np.argsort(self._assignments, kind="stable")
+                offsets = np.searchsorted(
+                    self._assignments[order], np.arange(len(self._centroids) + 1)
+                )
+                self._lists = (order, offsets)
+            return
+        rng = np.random.default_rng(0)
+        n_lists = max(1, int(np.sqrt(size)))
+        sample = self.vectors[
+            np.sort(
+                rng.choice(
+                    size, min(size, n_lists * _TRAINING_SAMPLES_PER_LIST), replace=False
+                )
+            )
+        ]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = _nearest(sample, centroids)
+            counts = np.bincount(assignments, minlength=n_lists)
+            order = np.argsort(assignments, kind="stable")
+            starts = np.minimum(
+                np.searchsorted(assignments[order], np.arange(n_lists)), len(sample) - 1
+            )
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+        logger.info(f"Trained {n_lists} IVF lists on {len(sample)} of {size} vectors")
+        self._centroids = centroids
+        self._assignments = _nearest(self.vectors, centroids)
+        self._trained_size = size
+        self._lists = None
+        self._ensure_ivf()
+
+    def _ivf_candidates(self, query: np.ndarray) -> np.ndarray:
+        order, offsets = self._lists
+        half_norms = 0.5 * np.einsum("ij,ij->i", self._centroids, self._centroids)
+        closeness = self._centroids @ query - half_norms
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[p] : offsets[p + 1]] for p in probes])
+
+    def search_by_vectors(
+        self,
+        queries: List[List[float]],
+        k: int = 4,
+        pre_filter: Optional[Dict] = None,
+        exact: bool = False,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Finds the k most similar documents to each of a batch of query vectors.
+        Args:
+            queries (List[List[float]]): query vectors
+            k (int): number of documents to return for each query
+            pre_filter (Optional[Dict]): metadata filter applied before the search, see `matches_filter`
+            exact (bool): score every vector even when the corpus is large enough for the IVF index
+        """
+        matrix = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        if self.space_type == "cosinesimil":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms == 0, 1, norms)
+        with self._lock:
+            if not len(self):
+                return [[] for _ in queries]
+            allowed = None
+            if pre_filter:
+                allowed = np.fromiter(
+                    (matches_filter(m, pre_filter) for m in self.metadatas),
+                    dtype=bool,
+                    count=len(self),
+                )
+            if exact or len(self) < self.ann_threshold:
+                rows = None if allowed is None else np.flatnonzero(allowed)
+                results = [self._search_rows(matrix, rows, k)]
+            else:
+                self._ensure_ivf()
+                results = []
+                for query in matrix:
+                    rows = self._ivf_candidates(query)
+                    if allowed is not None:
+                        rows = rows[allowed[rows]]
+                    if len(rows) < k:
+                        # too few candidates in the probed lists, search exactly instead
+                        rows = None if allowed is None else np.flatnonzero(allowed)
+                    results.append(self._search_rows(query[None], rows, k))
+            return [hits for block in results for hits in block]
+
+    def _search_rows(
+        self, queries: np.ndarray, rows: Optional[np.ndarray], k: int
+    ) -> List[List[Tuple[Document, float]]]:
+        scores = self._scores(queries, rows)
+        top = _top_k(scores, k)
+        results = []
+        for query_scores, columns in zip(scores, top):
+            hits = []
+            for column in columns:
+                row = column if rows is None else rows[column]
+                document = Document(
+                    page_content=self.texts[row], metadata=self.metadatas[row]
+                )
+                hits.append((document, float(query_scores[column])))
+            results.append(hits)
+        return results
+
+    @staticmethod
+    def _pre_filter(kwargs: Dict) -> Optional[Dict]:
+        # opensearch callers pass pre_filter, langchain retrievers pass filter
+        return kwargs.get("pre_filter") or kwargs.get("filter")
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        vector = self.embedding_function.embed_query(query)
+        (hits,) = self.search_by_vectors([vector], k, self._pre_filter(kwargs))
+        return hits
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        (hits,) = self.search_by_vectors([embedding], k, self._pre_filter(kwargs))
+        return [doc for doc, _ in hits]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # scores are already higher for more relevant documents
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorSearch":
+        ids = kwargs.pop("ids", None)
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    def save(self, path: str) -> None:
+        """
+        Saves the store to a directory, the vectors as .npy files which `load` memory maps.
+        Args:
+            path (str): directory to save to
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            _save_array(os.path.join(path, "vectors.npy"), self.vectors)
+            if self._centroids is not None:
+                _save_array(os.path.join(path, "centroids.npy"), self._centroids)
+                _save_array(os.path.join(path, "assignments.npy"), self._assignments)
+            documents = {
+                "space_type": self.space_type,
+                "trained_size": self._trained_size,
+                "ids": self.ids,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+            }
+            with open(os.path.join(path, "documents.json.tmp"), "w") as f:
+                json.dump(documents, f)
+            os.replace(
+                os.path.join(path, "documents.json.tmp"),
+                os.path.join(path, "documents.json"),
+            )
+        logger.debug(f"Saved {len(self)} vectors to {path}")
+
+    @classmethod
+    def load(
+        cls, path: str, embedding_function: Embeddings, **kwargs: Any
+    ) -> "NumpyVectorSearch":
+        """
+        Loads a store saved by `save`, memory mapping its vectors rather than reading them.
+        Args:
+            path (str): directory the store was saved to
+            embedding_function (Embeddings): embeds the queries, the same as the store was built with
+            kwargs: further arguments of the store, such as nprobe
+        """
+        with open(os.path.join(path, "documents.json")) as f:
+            documents = json.load(f)
+        store = cls(embedding_function, space_type=documents["space_type"], **kwargs)
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        if len(vectors) != len(documents["ids"]):
+            raise ValueError(
+                f"Vector store at {path} holds {len(vectors)} vectors for "
+                f"{len(documents['ids'])} documents"
+            )
+        store.ids = documents["ids"]
+        store.texts = documents["texts"]
+        store.metadatas = documents["metadatas"]
+        store._rows = {id: row for row, id in enumerate(store.ids)}
+        store._vectors = vectors
+        store._sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+        centroids_path = os.path.join(path, "centroids.npy")
+        if documents["trained_size"] and os.path.exists(centroids_path):
+            store._centroids = np.load(centroids_path)
+            store._assignments = np.load(os.path.join(path, "assignments.npy"))
+            store._trained_size = documents["trained_size"]
+        logger.info(f"Loaded {len(store)} vectors from {path}")
+        return store
+
+
+class LocalVectorStore(VectorStore, VectorStoreClient):
+    """
+    Vector store held in process, for development and deployments small enough to need no
+    opensearch cluster. It both loads and searches the data, and is saved to path after
+    every load so it can be memory mapped back in by the next process.
+
+    Attributes:
+        embedding_function (Embeddings): an embeddings function which will be used to embed the documents to vectors,
+            wrapped in the persistent embedding cache
+        path (Optional[str]): directory the store is saved to, None to keep it in memory only
+        vectorstore (NumpyVectorSearch): the vectors and documents searched
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        path: Optional[str] = LOCAL_VECTOR_STORE_PATH,
+        space_type: str = LOCAL_VECTOR_SPACE_TYPE,
+        **pipeline_kwargs,
+    ) -> None:
+        """
+        Args:
+            space_type (str): l2, cosinesimil or innerproduct, a saved store keeps the one it was built with
+            pipeline_kwargs: keyword arguments passed on to the `IngestionPipeline` which stores data
+        """
+        self.embedding_function: Embeddings = cache_embeddings(embedding_function)
+        self.path = path or None
+        self.space_type = space_type
+        self.pipeline_kwargs = pipeline_kwargs
+        if self.path and os.path.exists(os.path.join(self.path, "documents.json")):
+            self.vectorstore = NumpyVectorSearch.load(
+                self.path, self.embedding_function
+            )
+        else:
+            self.vectorstore = self._empty_store()
+
+    def _empty_store(self) -> NumpyVectorSearch:
+        return NumpyVectorSearch(self.embedding_function, self.space_type)
+
+    def _split_into_batches(self, docs):
+        """Split the documents into batches, docs can be any iterable."""
+        docs = iter(docs)
+        while batch := list(itertools.islice(docs, OPENSEARCH_BATCH_SIZE)):
+            yield batch
+
+    def _embed_batch(self, docs: List[Document]) -> List[List[float]]:
+        return self.embedding_function.embed_documents(
+            [doc.page_content for doc in docs]
+        )
+
+    def _index_batch(
+        self,
+        vectorstore: NumpyVectorSearch,
+        docs: List[Document],
+        vectors: List[List[float]],
+    ):
+        vectorstore.add_vectors(
+            vectors,
+            [doc.page_content for doc in docs],
+            [dict(doc.metadata) for doc in docs],
+            [document_id(doc) for doc in docs],
+        )
+
+    def _ingest(
+        self, vectorstore: NumpyVectorSearch, documents: Iterable[Document]
+    ) -> IngestionReport:
+        pipeline = IngestionPipeline(
+            self._embed_batch,
+            partial(self._index_batch, vectorstore),
+            **self.pipeline_kwargs,
+        )
+        return pipeline.run(self._split_into_batches(documents))
+
+    def _save(self) -> None:
+        if self.path:
+            self.vectorstore.save(self.path)
+
+    def store_data(self, documents: Iterable[Document]) -> IngestionReport:
+        """
+        Embeds and stores documents, replacing any already stored under the same ids.
+        Args:
+            documents (Iterable[Document]): documents to store
+        """
+        report = self._ingest(self.vectorstore, documents)
+        self._save()
+        return report
+
+    def sync_data(self, documents: Iterable[Document]) -> IngestionReport:
+        """
+        Brings the store in line with documents, embedding only those which have changed
+        and deleting stored documents which are no longer in documents.
+        Args:
+            documents (Iterable[Document]): every document the store should hold
+        """
+        store = self.vectorstore
+        indexed = {
+            id: content_hash(Document(page_content=text, metadata=metadata))
+            for id, text, metadata in zip(store.ids, store.texts, store.metadatas)
+        }
+        seen = set()
+        unchanged = 0
+
+        def changed_documents():
+            nonlocal unchanged
+            for doc in documents:
+                doc_id = document_id(doc)
+                seen.add(doc_id)
+                if indexed.get(doc_id) == content_hash(doc):
+                    unchanged += 1
+                else:
+                    yield doc
+
+        report = self._ingest(store, changed_documents())
+        removed = [doc_id for doc_id in indexed if doc_id not in seen]
+        store.delete(removed)
+        report.unchanged = unchanged
+        report.deleted = len(removed)
+        self._save()
+        logger.info(
+            f"Synced local vector store: {report.docs_indexed} upserted, "
+            f"{unchanged} unchanged, {len(removed)} deleted"
+        )
+        return report
+
+    def reindex_data(self, documents: Iterable[Document]) -> IngestionReport:
+        """
+        Loads documents into a new store which replaces the current one once complete, so
+        searches run against the current store until then. If any batch fails the current store
+        is kept, and the report lists the failed batches.
+        Args:
+            documents (Iterable[Document]): every document the store should hold
+        """
+        vectorstore = self._empty_store()
+        report = self._ingest(vectorstore, documents)
+        if report.dead_letters:
+            logger.error(
+                f"{len(report.dead_letters)} batches failed, keeping the current store"
+            )
+            return report
+        self.vectorstore = vectorstore
+        self._save()
+        return report
+
+    def check_data_exists(self, store=None):
+        """
+        Checks if the store holds any documents, store is ignored as there is only one.
+        """
+        return len(self.vectorstore) > 0
+
+    def create_store(self, store=None):
+        """The store is created empty on init, so there is nothing to create."""
+        return True
+
+    def delete_data_store(self, store=None):
+        """
+        Deletes every document from the store along with its saved files.
+        """
+        self.vectorstore = self._empty_store()
+        if self.path and os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        return True
+
+    def retrieve_data_with_score(self, query):
+        """
+        Similarity search which returns values with score attachmend with up to 10 results
+        """
+        return self.vectorstore.similarity_search_with_score(query, k=10)
+
+    def retrieve_data(
+        self,
+        query: str,
+        search_type: str = "approximate_search",
+        space_type: str = None,
+        pre_filter=None,
+        k: int = 5,
+    ):
+        """
+        Similarity search which returns up to k results with an applied pre_filter on the metadata.
+        Args:
+            query (str): query to search vector documents with
+            search_type (str): script_scoring or painless_scripting search every vector,
+                approximate_search uses the IVF index once the corpus is large enough
+            space_type (str): unused, the store scores with the space type it was built with
+            pre_filter (object): filter to apply to the metadata, see `matches_filter`
+            k (int) integer for number of results to return defaults to 5
+        """
+        vector = self.embedding_function.embed_query(query)
+        (hits,) = self.vectorstore.search_by_vectors(
+            [vector],
+            k,
+            pre_filter,
+            exact=search_type in ("script_scoring", "painless_scripting"),
+        )
+        return [doc for doc, _ in hits]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        pre_filter: Optional[Dict] = None,
+    ) -> List[RetrievalResult]:
+        """
+        Similarity searches many queries with one batch of query embeddings and one matrix
+        multiply, results are returned in the order of the queries. Each query is timed as an
+        equal share of the batch, as they are searched together.
+        Args:
+            queries (List[str]): queries to search vector documents with
+            k (int): number of results to return for each query, defaults to 5
+            pre_filter (Optional[Dict]): filter to apply to the metadata, see `matches_filter`
+        """
+        if not queries:
+            return []
+        vectors = embed_queries(self.embedding_function, queries)
+        start = time.perf_counter()
+        hits = self.vectorstore.search_by_vectors(vectors, k, pre_filter)
+        seconds = (time.perf_counter() - start) / len(queries)
+        return [RetrievalResult(q, h, seconds) for q, h in zip(queries, hits)]
+
+    def get_as_retriever(self, search_kwargs: int = 2):
+        """
+        Returns a retriver that can be queried.
+        Args:
+            search_kwargs (int): integer for how many results to return in retriever calls
+        """
+        return self.vectorstore.as_retriever(search_kwargs={"k": search_kwargs})
+
+    def get_documents(self, limit: Optional[int] = None):
+        """
+        Returns documents from vectorstore up to limit values
+        Args:
+            limit (Optional(int)): limit for the amount of documents to return defaults to None
+        """
+        store = self.vectorstore
+        return [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in itertools.islice(
+                zip(store.texts, store.metadatas), limit
+            )
+        ]
+
+    def retrieve_data_with_relevance_scores(self, query):
+        return self.vectorstore.similarity_search_with_relevance_scores(query, k=10)
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from config.logging import setup_logging
+from config.settings import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL
+from hackathon.vectorstore.embedding_cache import embed_queries
+
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+
+class IndexGenerations:
+    """
+    Generation counter of each index, bumped whenever its contents change so that results
+    cached from an older generation are never served. The counters are per process, results
+    cached by a process which didn't make the change go stale for at most the cache TTL.
+    """
+
+    def __init__(self) -> None:
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, index_name: str) -> int:
+        return self._generations[index_name]
+
+    def bump(self, index_name: str) -> int:
+        with self._lock:
+            self._generations[index_name] += 1
+            logger.debug(
+                f"Index {index_name} is now generation {self._generations[index_name]}"
+            )
+            return self._generations[index_name]
+
+
+index_generations = IndexGenerations()
+
+
+class LRUCache:
+    """
+    In memory cache with TTL expiry and LRU eviction, with hit and miss counters.
+
+    Attributes:
+        max_entries (int): maximum number of entries kept
+        ttl (float): seconds an entry is valid for, 0 for no expiry
+        hits (int): number of lookups served from the cache
+        misses (int): number of lookups not in the cache
+        seconds_saved (float): time saved by the hits, as recorded when the values were stored
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for key, None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[2] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += entry[1]
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        """
+        Stores a value, evicting the least recently used entries to stay within max_entries.
+        Args:
+            key (Hashable): cache key
+            value (Any): value to store
+            cost (float): seconds it took to produce the value
+        """
+        with self._lock:
+            self._entries[key] = (value, cost, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Returns the hit and miss counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+            "entries": len(self._entries),
+        }
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Embeddings which keep the vectors of recent queries in memory, documents are passed through.
+
+    Attributes:
+        embeddings (Embeddings): embeddings function used for queries not in the cache
+        cache (LRUCache): cache of query vectors by query text
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: LRUCache) -> None:
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            start = time.perf_counter()
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(text, vector, time.perf_counter() - start)
+        return list(vector)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self.cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            start = time.perf_counter()
+            embedded = dict(zip(missing, embed_queries(self.embeddings, missing)))
+            cost = (time.perf_counter() - start) / len(missing)
+            for text, vector in embedded.items():
+                self.cache.set(text, vector, cost)
+            vectors = [embedded[t] if v is None else v for t, v in zip(texts, vectors)]
+        return [list(vector) for vector in vectors]
+
+
+class QueryCache:
+    """
+    Caches in front of a vector store, of query embeddings and of search results. Result keys
+    include the generation of the index searched, see `IndexGenerations`.
+
+    Attributes:
+        embeddings (LRUCache): query vectors by query text
+        results (LRUCache): search results by index, generation and search arguments
+    """
+
+    def __init__(
+        self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl: float = QUERY_CACHE_TTL
+    ) -> None:
+        self.embeddings = LRUCache(max_entries, ttl)
+        self.results = LRUCache(max_entries, ttl)
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of both caches, for export as metrics.
+        """
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
+
+
+query_cache = QueryCache() if QUERY_CACHE_MAX_ENTRIES else None
@@ -1,59 +1,127 @@
-from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+import copy
+import itertools
+import json
+import threading
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from langchain.vectorstores import Chroma, OpenSearchVectorSearch
+from langchain.vectorstores.opensearch_vector_search import (
+    _approximate_search_query_with_boolean_filter,
+    _default_approximate_search_query,
+    _default_script_query,
+)
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.vectorstores import VectorStoreRetriever
-from opensearchpy.helpers import bulk
+from opensearchpy.exceptions import ConnectionError, TransportError
+from opensearchpy.helpers import bulk, scan
 
 from config.logging import setup_logging
-from config.settings import OPENSEARCH_BATCH_SIZE
-from hackathon.vectorstore.opensearch import OpensearchClient
+from config.settings import (
+    HYBRID_RANK_CONSTANT,
+    HYBRID_WINDOW,
+    OPENSEARCH_BATCH_SIZE,
+    OPENSEARCH_HYBRID_PIPELINE,
+    OPENSEARCH_INDEX_GRACE_PERIOD,
+    OPENSEARCH_REFRESH_INTERVAL,
+    OPENSEARCH_REPLICAS,
+    OPENSEARCH_TRANSFORM_TTL,
+)
+from hackathon.vectorstore.base import RetrievalResult, VectorStore, VectorStoreClient
+from hackathon.vectorstore.embedding_cache import cache_embeddings, embed_queries
+from hackathon.vectorstore.hybrid import (
+    knn_query,
+    reciprocal_rank_fusion,
+    rrf_pipeline,
+    text_query,
+)
+from hackathon.vectorstore.index_config import (
+    IndexConfig,
+    TransformedEmbeddings,
+    VectorTransform,
+    delete_transforms,
+    load_transform,
+    save_transform,
+)
+from hackathon.vectorstore.ingestion import (
+    IngestionPipeline,
+    IngestionReport,
+    content_hash,
+    document_id,
+)
+from hackathon.vectorstore.query_cache import (
+    QueryCache,
+    QueryEmbeddingCache,
+    index_generations,
+    query_cache,
+)
+
+if TYPE_CHECKING:
+    # only used in annotations, so the stores can be imported without the client module
+    from hackathon.vectorstore.opensearch import OpensearchClient
 
 get_logger = setup_logging()
 logger = get_logger(__name__)
 
+HYBRID_SEARCH = "hybrid_search"
 
-class VectorStore(ABC):
-    """
-    VectorStore class in control of searching an exisiting vector store.
-    """
-
-    @abstractmethod
-    def store_data(self, documents: List[Document]):
-        raise NotImplementedError()
-
-    @abstractmethod
-    def retrieve_data(self, query: str):
-        raise NotImplementedError()
-
-    @abstractmethod
-    def get_as_retriever(self, search_kwargs: int = 2):
-        raise NotImplementedError()
 
 class OpenSearchStore(VectorStore):
     """
+    Searches an opensearch index. Pass the alias an `OpensearchClientStore` loads data behind
+    as the index_name, so searches carry on through reindexes.
 
     Attributes:
-        embedding_function (Embeddings): an embeddings function which will be used to embed the documents to vectors
+        embedding_function (Embeddings): an embeddings function which will be used to embed the documents to vectors,
+            wrapped in the persistent embedding cache
         index_name (str): string name for the index where the vectors are stored
         client (OpensearchClient): Opensearch client
+        cache (Optional[QueryCache]): cache of query embeddings and search results, None to disable
+        hybrid_pipeline (str): search pipeline which fuses hybrid search ranks server side,
+            created along with the index by `OpensearchClientStore`, "" to fuse them client side
+        rank_constant (int): rank constant of the reciprocal rank fusion of hybrid searches,
+            when fused client side
+        transform_ttl (float): seconds the vector transform of the index is kept before it
+            is read again, 0 to read it only when this process changes the index
     """
 
     def __init__(
         self,
         embedding_function: Embeddings,
         index_name,
-        client: OpensearchClient,
+        client: "OpensearchClient",
+        cache: Optional[QueryCache] = query_cache,
+        hybrid_pipeline: str = OPENSEARCH_HYBRID_PIPELINE,
+        rank_constant: int = HYBRID_RANK_CONSTANT,
+        transform_ttl: float = OPENSEARCH_TRANSFORM_TTL,
     ):
         self.vectorstore = None
-        self.embedding_function: Embeddings = embedding_function
+        self.embedding_function: Embeddings = cache_embeddings(embedding_function)
+        self.cache = cache
+        if cache is not None:
+            self.embedding_function = QueryEmbeddingCache(
+                self.embedding_function, cache.embeddings
+            )
+        # queries are reduced or quantised the same way as the vectors of the index
+        self.embedding_function = TransformedEmbeddings(
+            self.embedding_function, self._index_transform
+        )
+        self._transform: Optional[VectorTransform] = None
+        self._transform_generation: Optional[int] = None
+        self._transform_loaded = 0.0
+        self.transform_ttl = transform_ttl
         self.index_name = index_name
+        self.hybrid_pipeline = hybrid_pipeline
+        self.rank_constant = rank_constant
+        self._hybrid_pipeline_ready: Optional[bool] = None
         self.vectorstore = OpenSearchVectorSearch(
             client=client.client,
             index_name=self.index_name,
-            embedding_function=embedding_function,
+            embedding_function=self.embedding_function,
             opensearch_url=client.opensearch_endpoint,
             # connection_class=RequestsHttpConnection,
             # timeout=30,
@@ -68,11 +136,65 @@ class OpenSearchStore(VectorStore):
     def store_data(self, documents: List[Document]):
         raise NotImplementedError
 
+    def _index_transform(self) -> Optional[VectorTransform]:
+        """
+        Transform of the vectors in the index, reloaded whenever the index changes generation
+        and once transform_ttl has passed, as generations only count changes this process made
+        and the index_name alias may have been swapped to an index fitted differently.
+        """
+        generation = index_generations.get(self.index_name)
+        expired = (
+            self.transform_ttl
+            and time.monotonic() - self._transform_loaded > self.transform_ttl
+        )
+        if self._transform_generation != generation or expired:
+            self._transform = load_transform(self.vectorstore.client, self.index_name)
+            self._transform_generation = generation
+            self._transform_loaded = time.monotonic()
+        return self._transform
+
+    def _results_key(self, *args) -> Tuple:
+        # a new generation of the index is never served results cached from an older one
+        return (
+            self.index_name,
+            index_generations.get(self.index_name),
+            *(json.dumps(arg, sort_keys=True, default=str) for arg in args),
+        )
+
+    def _cached(self, search: Callable[[], Any], *args) -> Any:
+        """
+        Returns the results of search from the results cache, searching on a miss.
+        Args:
+            search (Callable): runs the search
+            args: everything the results depend on, besides the index searched
+        """
+        if self.cache is None:
+            return search()
+        key = self._results_key(*args)
+        results = self.cache.results.get(key)
+        if results is None:
+            start = time.perf_counter()
+            results = search()
+            self.cache.results.set(key, results, time.perf_counter() - start)
+        # callers are free to change the documents returned
+        return copy.deepcopy(results)
+
+    def cache_stats(self) -> Optional[Dict]:
+        """
+        Returns the hit ratio and time saved of the query embedding and results caches.
+        """
+        return self.cache.stats() if self.cache is not None else None
+
     def retrieve_data_with_score(self, query):
         """
         Similarity search which returns values with score attachmend with up to 10 results
         """
-        return self.vectorstore.similarity_search_with_score(query, k=10)
+        return self._cached(
+            lambda: self.vectorstore.similarity_search_with_score(query, k=10),
+            "with_score",
+            query,
+            10,
+        )
 
     def retrieve_data(
         self,
@@ -87,26 +209,224 @@ class OpenSearchStore(VectorStore):
         with search_type and space_type set and an applied pre_filter on the metadata.
         Args:
             query (str): query to search vector documents with
-            search_type (str):
-            space_type (str):
+            search_type (str): approximate_search, script_scoring, painless_scripting, or
+                hybrid_search for a `hybrid_search`
+            space_type (str): space type of script_scoring and painless_scripting searches
             pre_filter (object): filter to apply to the metadata results in the vector store
             k (int) integer for number of results to return defaults to 5
         """
-        return self.vectorstore.similarity_search(
-            query=query,
-            search_type=search_type,
-            space_type=space_type,
-            pre_filter=pre_filter,
-            k=k,
+        if search_type == HYBRID_SEARCH:
+            return [doc for doc, _ in self.hybrid_search(query, k, pre_filter)]
+        return self._cached(
+            lambda: self.vectorstore.similarity_search(
+                query=query,
+                search_type=search_type,
+                space_type=space_type,
+                pre_filter=pre_filter,
+                k=k,
+            ),
+            "documents",
+            query,
+            k,
+            pre_filter,
+            search_type,
+            space_type,
+        )
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        pre_filter: Optional[Dict] = None,
+        search_type: str = "approximate_search",
+        space_type: str = "l2",
+    ) -> List[RetrievalResult]:
+        """
+        Similarity searches many queries at once. The queries not in the results cache are
+        embedded as queries in one batch and searched in one _msearch request, results are
+        returned in the order of the queries with the time opensearch took over each.
+        Args:
+            queries (List[str]): queries to search vector documents with
+            k (int): number of results to return for each query, defaults to 5
+            pre_filter (Optional[Dict]): filter to apply to the metadata results in the vector store
+            search_type (str): approximate_search, script_scoring to score every document,
+                or hybrid_search to run a `hybrid_search` of each query
+            space_type (str): space type of script_scoring searches
+        """
+        if search_type == HYBRID_SEARCH:
+            return [self._hybrid_result(query, k, pre_filter) for query in queries]
+        if self.cache is None:
+            return self._msearch(queries, k, pre_filter, search_type, space_type)
+        keys = [
+            self._results_key("many", query, k, pre_filter, search_type, space_type)
+            for query in queries
+        ]
+        results = [self.cache.results.get(key) for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        searched = self._msearch(
+            [queries[i] for i in misses], k, pre_filter, search_type, space_type
         )
+        for i, result in zip(misses, searched):
+            if result.error is None:
+                self.cache.results.set(keys[i], result, result.seconds)
+            results[i] = result
+        return [copy.deepcopy(result) for result in results]
 
-    def get_as_retriever(self, search_kwargs: int = 2):
+    def _msearch(
+        self,
+        queries: List[str],
+        k: int,
+        pre_filter: Optional[Dict],
+        search_type: str,
+        space_type: str,
+    ) -> List[RetrievalResult]:
+        if not queries:
+            return []
+        start = time.perf_counter()
+        vectors = embed_queries(self.embedding_function, queries)
+        embedded = time.perf_counter()
+        body = []
+        for vector in vectors:
+            if search_type == "script_scoring":
+                search = _default_script_query(vector, k, space_type, pre_filter)
+            elif pre_filter:
+                search = _approximate_search_query_with_boolean_filter(
+                    vector, pre_filter, k=k
+                )
+            else:
+                search = _default_approximate_search_query(vector, k=k)
+            # the stored vectors are large and not needed in the results
+            search["_source"] = {"excludes": ["vector_field"]}
+            body += [{"index": self.index_name}, search]
+        responses = self.vectorstore.client.msearch(body=body)["responses"]
+        logger.debug(
+            f"Searched {len(queries)} queries in {embedded - start:.3f}s embedding "
+            f"and {time.perf_counter() - embedded:.3f}s searching"
+        )
+        results = []
+        for query, response in zip(queries, responses):
+            if "error" in response:
+                logger.error(f"Search of {query!r} failed: {response['error']}")
+                results.append(RetrievalResult(query, [], 0.0, str(response["error"])))
+                continue
+            hits = [
+                (self._hit_document(hit), hit["_score"])
+                for hit in response["hits"]["hits"]
+            ]
+            results.append(RetrievalResult(query, hits, response["took"] / 1000))
+        return results
+
+    def _hybrid_result(
+        self, query: str, k: int, pre_filter: Optional[Dict]
+    ) -> RetrievalResult:
+        start = time.perf_counter()
+        try:
+            hits = self.hybrid_search(query, k, pre_filter)
+        except TransportError as e:
+            logger.error(f"Hybrid search of {query!r} failed: {e!r}")
+            return RetrievalResult(query, [], 0.0, repr(e))
+        return RetrievalResult(query, hits, time.perf_counter() - start)
+
+    @staticmethod
+    def _hit_document(hit: Dict) -> Document:
+        return Document(
+            page_content=hit["_source"]["text"],
+            metadata=hit["_source"].get("metadata", {}),
+        )
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 5,
+        pre_filter: Optional[Dict] = None,
+        window: int = HYBRID_WINDOW,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Searches with a BM25 text query and a k-NN query in one request and fuses their
+        results by reciprocal rank, so exact names, acronyms and figures are found alongside
+        semantically similar text. Ranks are fused server side by the hybrid_pipeline search
+        pipeline, or client side when the cluster doesn't support it.
+        Args:
+            query (str): query to search documents with
+            k (int): number of results to return, defaults to 5
+            pre_filter (Optional[Dict]): filter to apply to the metadata results in the vector store
+            window (int): candidates each query contributes to the fusion
+        """
+        return self._cached(
+            lambda: self._hybrid_search(query, k, pre_filter, max(window, k)),
+            "hybrid",
+            query,
+            k,
+            pre_filter,
+            window,
+            self.rank_constant,
+        )
+
+    def _server_side_hybrid(self) -> bool:
+        """Whether hybrid search ranks are fused by the pipeline, until it first fails."""
+        return bool(self.hybrid_pipeline) and self._hybrid_pipeline_ready is not False
+
+    def _hybrid_search(
+        self, query: str, k: int, pre_filter: Optional[Dict], window: int
+    ) -> List[Tuple[Document, float]]:
+        vector = self.embedding_function.embed_query(query)
+        text = text_query(query, pre_filter)
+        knn = knn_query(vector, window, pre_filter)
+        client = self.vectorstore.client
+        # the stored vectors are large and not needed in the results
+        source = {"excludes": ["vector_field"]}
+        if self._server_side_hybrid():
+            try:
+                response = client.search(
+                    index=self.index_name,
+                    body={
+                        "size": k,
+                        "_source": source,
+                        "query": {"hybrid": {"queries": [text, knn]}},
+                    },
+                    params={"search_pipeline": self.hybrid_pipeline},
+                )
+                return [
+                    (self._hit_document(hit), hit["_score"])
+                    for hit in response["hits"]["hits"]
+                ]
+            except TransportError as e:
+                # the pipeline is missing, not permitted or unsupported by the cluster, an
+                # unreachable cluster fails the client side search as well
+                logger.warning(f"Hybrid query failed, fusing ranks client side: {e!r}")
+                if not isinstance(e, ConnectionError):
+                    self._hybrid_pipeline_ready = False
+
+        body = []
+        for search in (text, knn):
+            body += [
+                {"index": self.index_name},
+                {"size": window, "_source": source, "query": search},
+            ]
+        hits = {}
+        rankings = []
+        for response in client.msearch(body=body)["responses"]:
+            if "error" in response:
+                raise TransportError(500, "search_phase_execution_exception", response)
+            ranking = response["hits"]["hits"]
+            hits.update((hit["_id"], hit) for hit in ranking)
+            rankings.append([hit["_id"] for hit in ranking])
+        fused = reciprocal_rank_fusion(rankings, self.rank_constant)
+        return [(self._hit_document(hits[_id]), score) for _id, score in fused[:k]]
+
+    def get_as_retriever(self, search_kwargs: int = 2, search_type: str = "similarity"):
         """
         Returns a retriver that can be queried.
         Args:
             search_kwargs (int): integer for how many results to return in retriever calls
+            search_type (str): similarity or mmr, or hybrid_search for a retriever which
+                runs a `hybrid_search`
         """
-        return self.vectorstore.as_retriever(search_kwargs={"k": search_kwargs})
+        if search_type == HYBRID_SEARCH:
+            return HybridSearchRetriever(store=self, k=search_kwargs)
+        return self.vectorstore.as_retriever(
+            search_type=search_type, search_kwargs={"k": search_kwargs}
+        )
 
     def get_documents(self, limit: Optional[int] = None):
         """
@@ -117,45 +437,75 @@ class OpenSearchStore(VectorStore):
         return self.vectorstore.get(limit=limit)
 
     def retrieve_data_with_relevance_scores(self, query):
-        return self.vectorstore.similarity_search_with_relevance_scores(query, k=10)
+        return self._cached(
+            lambda: self.vectorstore.similarity_search_with_relevance_scores(
+                query, k=10
+            ),
+            "with_relevance_scores",
+            query,
+            10,
+        )
 
-class VectorStoreClient(ABC):
+
+class HybridSearchRetriever(BaseRetriever):
     """
-    Vector Store Client class charged with loading data into the vector store.
+    Retriever which finds documents with the hybrid search of an `OpenSearchStore`.
+
+    Attributes:
+        store (OpenSearchStore): store searched
+        k (int): number of documents to return
+        pre_filter (Optional[Dict]): filter to apply to the metadata results in the vector store
     """
 
-    @abstractmethod
-    def store_data(self, documents):
-        raise NotImplementedError()
+    store: OpenSearchStore
+    k: int = 2
+    pre_filter: Optional[Dict] = None
 
-    @abstractmethod
-    def check_data_exists(self, store=None):
-        raise NotImplementedError()
+    class Config:
+        arbitrary_types_allowed = True
 
-    @abstractmethod
-    def create_store(self, store=None):
-        raise NotImplementedError()
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        hits = self.store.hybrid_search(query, self.k, self.pre_filter)
+        return [doc for doc, _ in hits]
 
-    @abstractmethod
-    def delete_data_store(self, store=None):
-        raise NotImplementedError()
 
 class OpensearchClientStore(VectorStoreClient):
     """
+    Loads data into opensearch. `reindex_data` builds each full load into a new versioned index,
+    named `<index_name>-v<milliseconds>`, and swaps index_name over to it as an alias.
+
     Attributes:
-        embedding_function (Embeddings): an embeddings function which will be used to embed the documents to vectors
-        index_name (str): string name for the index where the vectors are stored
+        embedding_function (Embeddings): an embeddings function which will be used to embed the documents to vectors,
+            wrapped in the persistent embedding cache
+        index_name (str): string name for the index, or alias of the index, where the vectors are stored
         client (OpensearchClient): Opensearch client
+        grace_period (float): seconds an index replaced by a reindex is kept before it is deleted
+        index_config (IndexConfig): quantisation, dimensionality reduction and HNSW parameters of
+            the indexes created
+        hybrid_pipeline (str): search pipeline which fuses hybrid search ranks, created along
+            with the indexes so searches don't write to the cluster, "" to not create one
+        rank_constant (int): rank constant of the reciprocal rank fusion of the hybrid_pipeline
     """
 
     def __init__(
         self,
         embedding_function,
         index_name,
-        client: OpensearchClient,
+        client: "OpensearchClient",
+        grace_period: float = OPENSEARCH_INDEX_GRACE_PERIOD,
+        index_config: Optional[IndexConfig] = None,
+        hybrid_pipeline: str = OPENSEARCH_HYBRID_PIPELINE,
+        rank_constant: int = HYBRID_RANK_CONSTANT,
+        **pipeline_kwargs,
     ) -> None:
+        """
+        Args:
+            pipeline_kwargs: keyword arguments passed on to the `IngestionPipeline` which stores data
+        """
 
-        self.embedding_function: Embeddings = embedding_function
+        self.embedding_function: Embeddings = cache_embeddings(embedding_function)
         self.index_name = index_name
         self.vectorstore = OpenSearchVectorSearch(
             client=client.client,
@@ -166,35 +516,365 @@ class OpensearchClientStore(VectorStoreClient):
             # timeout=30,
             # port=443,
         )
+        self.grace_period = grace_period
+        self.index_config = index_config or IndexConfig()
+        self.hybrid_pipeline = hybrid_pipeline
+        self.rank_constant = rank_constant
+        self.pipeline_kwargs = pipeline_kwargs
+        self._ready_indexes = set()
+        self._transforms: Dict[str, VectorTransform] = {}
+        self._index_lock = threading.Lock()
 
     def _split_into_batches(self, docs):
-        """Split the document list into batches."""
-        for i in range(0, len(docs), OPENSEARCH_BATCH_SIZE):
-            logger.info(f"Batch of {i} to {i +OPENSEARCH_BATCH_SIZE} ...")
-            yield docs[i : i + OPENSEARCH_BATCH_SIZE]
-
-    def store_data(self, documents: List[Document]):
+        """Split the documents into batches, docs can be any iterable."""
+        docs = iter(docs)
+        for i in itertools.count(0, OPENSEARCH_BATCH_SIZE):
+            batch = list(itertools.islice(docs, OPENSEARCH_BATCH_SIZE))
+            if not batch:
+                return
+            logger.info(f"Batch of {i} to {i + len(batch)} ...")
+            yield batch
+
+    def store_data(self, documents: Iterable[Document]) -> IngestionReport:
         """
-        Stores data into opensearch, data is stored in batches and embedded as ingested.
+        Stores data into opensearch. Batches are embedded and bulk indexed by a pipeline so that
+        embedding overlaps indexing, failed batches are retried and dead lettered once out of retries.
         Args:
-            Documents (list[Document]): list of documents to store into opensearch.
+            Documents (Iterable[Document]): documents to store into opensearch.
         """
-        logger.info(f"Starting Opensearch ingestion of {len(documents)} documents")
-        for batch in self._split_into_batches(documents):
-            try:
-                response = self.vectorstore.add_documents(batch)
-            except Exception as e:
-                # TODO what if a batch fails
-                raise e
+        logger.info("Starting Opensearch ingestion")
+        report = self._ingest(self.index_name, documents)
         logger.info("Finished Opensearch ingestion")
+        return report
+
+    def _ingest(
+        self,
+        index_name: str,
+        documents: Iterable[Document],
+        index_settings: Optional[Dict] = None,
+    ) -> IngestionReport:
+        """
+        Embeds and bulk indexes documents into an index through an `IngestionPipeline`.
+        Args:
+            index_name (str): index or alias to store the documents in
+            documents (Iterable[Document]): documents to store
+            index_settings (Optional[Dict]): settings the index is created with if it doesn't exist
+        """
+        pipeline = IngestionPipeline(
+            partial(self._embed_batch, index_name),
+            partial(self._index_batch, index_name, index_settings or {}),
+            **self.pipeline_kwargs,
+        )
+        report = pipeline.run(self._split_into_batches(documents))
+        if report.docs_indexed:
+            self.vectorstore.client.indices.refresh(index=index_name)
+            index_generations.bump(index_name)
+        if report.dead_letters:
+            logger.error(
+                f"{len(report.dead_letter_documents())} documents failed to ingest"
+            )
+        return report
+
+    def reindex_data(self, documents: Iterable[Document]) -> IngestionReport:
+        """
+        Loads documents into a new version of the index and atomically swaps the index_name
+        alias over to it, so searches never see a missing or part loaded index. The new index is
+        built without refreshes or replicas, which are restored before the swap. Replaced indexes
+        are deleted once the grace period has passed. If any batch fails the new index is deleted
+        rather than swapped in, and the report lists the failed batches.
+        Args:
+            documents (Iterable[Document]): every document the index should hold
+        """
+        self.collect_old_indexes()
+        new_index = f"{self.index_name}-v{time.time_ns() // 1_000_000}"
+        logger.info(f"Building index {new_index} for {self.index_name}")
+        report = self._ingest(
+            new_index,
+            documents,
+            index_settings={"refresh_interval": "-1", "number_of_replicas": 0},
+        )
+        client = self.vectorstore.client
+        if not client.indices.exists(index=new_index):
+            logger.error(f"Nothing was indexed, keeping the current {self.index_name}")
+            return report
+        if report.dead_letters:
+            logger.error(
+                f"{len(report.dead_letters)} batches failed, deleting the incomplete "
+                f"{new_index} and keeping the current {self.index_name}"
+            )
+            self._delete_opensearch_index(new_index)
+            return report
+        client.indices.put_settings(
+            index=new_index,
+            body={
+                "index": {
+                    "refresh_interval": OPENSEARCH_REFRESH_INTERVAL,
+                    "number_of_replicas": OPENSEARCH_REPLICAS,
+                }
+            },
+        )
+        client.indices.refresh(index=new_index)
+        self._swap_alias(new_index)
+        if self.grace_period:
+            timer = threading.Timer(self.grace_period, self.collect_old_indexes)
+            timer.daemon = True
+            timer.start()
+        else:
+            self.collect_old_indexes()
+        return report
+
+    def _swap_alias(self, new_index: str):
+        """
+        Points the index_name alias at new_index alone, in one atomic request. An index which
+        was created under the name before aliasing is dropped by the same request.
+        """
+        client = self.vectorstore.client
+        actions = [{"add": {"index": new_index, "alias": self.index_name}}]
+        if client.indices.exists_alias(name=self.index_name):
+            old_indexes = list(client.indices.get_alias(name=self.index_name))
+            actions += [
+                {"remove": {"index": index, "alias": self.index_name}}
+                for index in old_indexes
+            ]
+        else:
+            old_indexes = []
+            if client.indices.exists(index=self.index_name):
+                actions.append({"remove_index": {"index": self.index_name}})
+        client.indices.update_aliases(body={"actions": actions})
+        if not old_indexes:
+            delete_transforms(client, [self.index_name])
+        index_generations.bump(self.index_name)
+        if old_indexes:
+            # marks when the old indexes stopped serving, for the grace period
+            client.indices.put_mapping(
+                index=",".join(old_indexes), body={"_meta": {"retired_at": time.time()}}
+            )
+        logger.info(f"Alias {self.index_name} now points at {new_index}")
+
+    def collect_old_indexes(self) -> List[str]:
+        """
+        Deletes versions of the index which the alias no longer points at and were replaced
+        longer than the grace period ago, returning their names.
+        """
+        client = self.vectorstore.client
+        pattern = f"{self.index_name}-v*"
+        live = set()
+        if client.indices.exists_alias(name=self.index_name):
+            live = set(client.indices.get_alias(name=self.index_name))
+        mappings = client.indices.get_mapping(index=pattern)
+        now = time.time()
+        deleted = []
+        for index, mapping in mappings.items():
+            retired_at = mapping.get("mappings", {}).get("_meta", {}).get("retired_at")
+            # an index without retired_at is either still being built or was never swapped in
+            if index in live or retired_at is None:
+                continue
+            if now - retired_at >= self.grace_period:
+                client.indices.delete(index=index)
+                self._ready_indexes.discard(index)
+                self._transforms.pop(index, None)
+                deleted.append(index)
+        if deleted:
+            delete_transforms(client, deleted)
+            logger.info(f"Deleted replaced indexes {deleted}")
+        return deleted
+
+    def sync_data(self, documents: Iterable[Document]) -> IngestionReport:
+        """
+        Brings the index in line with documents without dropping it, so it can be queried
+        throughout. Only documents whose content has changed since they were indexed are
+        embedded and upserted, and indexed documents no longer in documents are deleted.
+        Args:
+            documents (Iterable[Document]): every document the index should hold
+        """
+        if self._needs_refit():
+            logger.warning(
+                f"Vector transform of {self.index_name} was fitted to too few vectors, "
+                "reindexing to refit it"
+            )
+            return self.reindex_data(documents)
+        indexed = self._indexed_hashes()
+        logger.info(f"Syncing Opensearch index holding {len(indexed)} documents")
+        seen = set()
+        unchanged = 0
+
+        def changed_documents():
+            nonlocal unchanged
+            for doc in documents:
+                doc_id = document_id(doc)
+                seen.add(doc_id)
+                if indexed.get(doc_id) == content_hash(doc):
+                    unchanged += 1
+                else:
+                    yield doc
+
+        report = self._ingest(self.index_name, changed_documents())
+        removed = [doc_id for doc_id in indexed if doc_id not in seen]
+        if removed:
+            self._put_bulk_in_opensearch(
+                {"_op_type": "delete", "_index": self.index_name, "_id": doc_id}
+                for doc_id in removed
+            )
+            self.vectorstore.client.indices.refresh(index=self.index_name)
+            index_generations.bump(self.index_name)
+        report.unchanged = unchanged
+        report.deleted = len(removed)
+        logger.info(
+            f"Synced Opensearch index: {report.docs_indexed} upserted, "
+            f"{unchanged} unchanged, {len(removed)} deleted"
+        )
+        return report
+
+    def _needs_refit(self) -> bool:
+        """
+        Whether the transform of the index is undersampled and a reindex, which fits the
+        transform to its first batch, would fit it to more vectors.
+        """
+        if not self.index_config.needs_transform or not self._check_index():
+            return False
+        client = self.vectorstore.client
+        transform = load_transform(client, self.index_name)
+        if transform is None or not transform.undersampled:
+            return False
+        count = client.count(index=self.index_name)["count"]
+        return min(count, OPENSEARCH_BATCH_SIZE) > transform.samples
+
+    def _indexed_hashes(self) -> Dict[str, str]:
+        """Returns the content hash of every document in the index by id."""
+        if not self._check_index():
+            return {}
+        hits = scan(
+            self.vectorstore.client,
+            index=self.index_name,
+            query={"query": {"match_all": {}}, "_source": ["content_hash"]},
+        )
+        return {hit["_id"]: hit["_source"].get("content_hash") for hit in hits}
+
+    def _embed_batch(self, index_name: str, docs: List[Document]) -> List[Dict]:
+        """
+        Embeds a batch of documents into bulk index actions. Ids are deterministic, so that
+        retrying an index or reloading a source overwrites the documents already stored.
+        """
+        vectors = self.embedding_function.embed_documents(
+            [doc.page_content for doc in docs]
+        )
+        vectors = self._transform_vectors(index_name, vectors)
+        id_field = "id" if self.vectorstore.is_aoss else "_id"
+        return [
+            {
+                "_op_type": "index",
+                "_index": index_name,
+                "vector_field": vector,
+                "text": doc.page_content,
+                "metadata": doc.metadata,
+                "content_hash": content_hash(doc),
+                id_field: document_id(doc),
+            }
+            for doc, vector in zip(docs, vectors)
+        ]
+
+    def _transform_vectors(
+        self, index_name: str, vectors: List[List[float]]
+    ) -> List[List[float]]:
+        """
+        Applies the transform of the index to vectors when index_config reduces or quantises them.
+        An index without a transform yet takes that of the live index if it matches index_config,
+        so queries of the alias are transformed the same way throughout a reindex, otherwise
+        one is fitted to vectors. The transform is stored with `save_transform`.
+        """
+        if not self.index_config.needs_transform:
+            return vectors
+        with self._index_lock:
+            transform = self._transforms.get(index_name)
+            if transform is None:
+                client = self.vectorstore.client
+                transform = load_transform(client, index_name)
+                stored = transform is not None
+                if transform is None and index_name != self.index_name:
+                    live = load_transform(client, self.index_name)
+                    if live is not None and live.matches(self.index_config):
+                        transform = live
+                if transform is None:
+                    transform = self.index_config.fit_transform(vectors)
+                    logger.info(
+                        f"Fitted vector transform of {index_name} to {len(vectors)} vectors"
+                    )
+                if transform.undersampled:
+                    logger.warning(
+                        f"Vector transform of {index_name} was fitted to {transform.samples} "
+                        f"vectors, fewer than its {transform.pca_dimensions} dimensions, "
+                        "it is refitted by the next sync once there are more documents"
+                    )
+                if not stored:
+                    save_transform(client, index_name, transform)
+                self._transforms[index_name] = transform
+        return transform.apply(vectors)
+
+    def _index_batch(
+        self,
+        index_name: str,
+        index_settings: Dict,
+        docs: List[Document],
+        actions: List[Dict],
+    ):
+        self._ensure_index(index_name, len(actions[0]["vector_field"]), index_settings)
+        return self._put_bulk_in_opensearch(actions)
+
+    def _ensure_index(
+        self, index_name: str, dimensions: int, index_settings: Optional[Dict] = None
+    ):
+        """
+        Creates the index with a knn mapping for vectors of the given length, if it doesn't exist.
+        Args:
+            index_name (str): index or alias to check
+            dimensions (int): length of the vectors stored in the index
+            index_settings (Optional[Dict]): further index settings to create the index with
+        """
+        with self._index_lock:
+            if index_name in self._ready_indexes:
+                return
+            if not self._check_index(index_name):
+                self._create_index(index_name, dimensions, index_settings)
+            self._ready_indexes.add(index_name)
+
+    def _create_index(
+        self, index_name: str, dimensions: int, index_settings: Optional[Dict] = None
+    ):
+        logger.info(f"Creating index {index_name}")
+        body = self.index_config.mapping(dimensions)
+        body["settings"]["index"].update(index_settings or {})
+        self.vectorstore.client.indices.create(index=index_name, body=body)
+        self.create_hybrid_pipeline()
+
+    def create_hybrid_pipeline(self) -> bool:
+        """
+        Creates or updates the hybrid_pipeline search pipeline, returns whether it was created.
+        Clusters which don't support it, or roles which may not create it, fuse hybrid search
+        ranks client side instead.
+        """
+        if not self.hybrid_pipeline:
+            return False
+        try:
+            self.vectorstore.client.transport.perform_request(
+                "PUT",
+                f"/_search/pipeline/{self.hybrid_pipeline}",
+                body=rrf_pipeline(self.rank_constant),
+            )
+        except TransportError as e:
+            logger.warning(
+                f"Couldn't create search pipeline {self.hybrid_pipeline}, "
+                f"hybrid search ranks will be fused client side: {e!r}"
+            )
+            return False
+        return True
 
     def _put_bulk_in_opensearch(self, docs):
         """
-        Deprecated!!!
-        Currently unused but using opensearch API to store documents into opensearch
+        Stores bulk index actions into opensearch with the opensearch bulk API,
+        raises if any action fails.
         """
-        logger.info(f"Putting {len(docs)} documents in OpenSearch")
         success, failed = bulk(self.vectorstore.client, docs)
+        logger.info(f"Put {success} documents in OpenSearch")
         return success, failed
 
     def check_data_exists(self, store=None):
@@ -216,7 +896,22 @@ class OpensearchClientStore(VectorStoreClient):
         return self.vectorstore.client.indices.exists(index=index_name)
 
     def create_store(self, store=None):
-        raise NotImplementedError
+        """
+        Creates the index with the mapping of index_config, returns False if it already exists.
+        A PCA or byte quantisation transform is fitted to the first batch of documents stored.
+        Args:
+            store (str): index to create, defaults to the index_name set up in init
+        """
+        index_name = store or self.index_name
+        if self._check_index(index_name):
+            return False
+        dimensions = self.index_config.pca_dimensions or len(
+            self.embedding_function.embed_query("dimensions")
+        )
+        with self._index_lock:
+            self._create_index(index_name, dimensions)
+            self._ready_indexes.add(index_name)
+        return True
 
     def delete_data_store(self, store=None):
         return self._delete_opensearch_index(store)
@@ -224,14 +919,22 @@ class OpensearchClientStore(VectorStoreClient):
     def _delete_opensearch_index(self, index_name=None):
         """
         Deletes the index created in opensearch, by interacting directly with opensearch client.
+        An alias is deleted along with every index behind it.
         Args:
             index_name (str): index to delete defaults to none and uses value in init
         """
         if not index_name:
             index_name = self.index_name
+        index_generations.bump(index_name)
+        client = self.vectorstore.client
+        if client.indices.exists_alias(name=index_name):
+            index_name = ",".join(client.indices.get_alias(name=index_name))
+        self._ready_indexes.clear()
+        self._transforms.clear()
         logger.info(f"Trying to delete index {index_name}")
         try:
-            response = self.vectorstore.client.indices.delete(index=index_name)
+            response = client.indices.delete(index=index_name)
+            delete_transforms(client, index_name.split(","))
             logger.info(f"Index {response} deleted")
             return response["acknowledged"]
         except Exception:
@@ -1,9 +1,54 @@
-from config.settings import S3_LOADER_FILE_NAME
-from hackathon.constants.constants import CONTENT_COLUMNS, METADATA_COLUMNS
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from langchain_core.documents import Document
+
+from config.logging import setup_logging
+from config.settings import LOAD_PROGRESS_EVERY, S3_LOADER_FILE_NAME
+from hackathon.constants.constants import (
+    CONTENT_COLUMNS,
+    KEY_COLUMNS,
+    LOAD_FILTERS,
+    METADATA_COLUMNS,
+)
 from hackathon.loader.chunker import Chunker
 from hackathon.loader.loader import Loader, load_and_process_file
+from hackathon.vectorstore.ingestion import IngestionReport
 from hackathon.vectorstore.vectorstore import VectorStoreClient
 
+get_logger = setup_logging()
+logger = get_logger(__name__)
+
+
+@dataclass
+class LoadProgress:
+    """
+    Counts of a load as documents stream from the source file into the store.
+
+    Attributes:
+        rows (int): rows read from the source file
+        chunks (int): chunks of the rows passed to the store
+        docs_indexed (int): documents the store indexed, set once the load completes
+    """
+
+    rows: int = 0
+    chunks: int = 0
+    docs_indexed: int = 0
+
+    def count(self, documents: Iterable[Document], counter: str) -> Iterator[Document]:
+        """Passes documents through, adding each to counter as it is read."""
+        for doc in documents:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if counter == "chunks" and self.chunks % LOAD_PROGRESS_EVERY == 0:
+                logger.info(f"Load progress: {self}")
+            yield doc
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows} rows read, {self.chunks} chunks, "
+            f"{self.docs_indexed} documents indexed"
+        )
+
 
 class VectorstoreLoader:
     def __init__(
@@ -15,6 +60,7 @@ class VectorstoreLoader:
         self.chunker = chunker
         self.vs_client = vectorstore_client
         self.loader = loader
+        self.progress = LoadProgress()
 
     def data_store_exists(self, **kwargs) -> bool:
         return self.vs_client.check_data_exists(**kwargs)
@@ -24,10 +70,19 @@ class VectorstoreLoader:
             return None
         return self._load_and_store_data(source_file)
 
-    def recreate_data_load(self, source_file=None, **kwargs):
-        if self.data_store_exists(**kwargs):
-            self.vs_client.delete_data_store(**kwargs)
-        return self._load_and_store_data(source_file)
+    def recreate_data_load(self, source_file=S3_LOADER_FILE_NAME, **kwargs):
+        """
+        Reloads the whole source file into a new data store which replaces the current one
+        once loaded, so the current one is queryable until then.
+        """
+        return self._stream(self.vs_client.reindex_data, source_file)
+
+    def sync_data_load(self, source_file=S3_LOADER_FILE_NAME, **kwargs):
+        """
+        Updates the data store in place to match the source file, only changed documents
+        are embedded and stored and the store stays queryable throughout.
+        """
+        return self._stream(self.vs_client.sync_data, source_file)
 
     def _create_data_store(self, **kwargs):
         return self.vs_client.create_store(**kwargs)
@@ -35,14 +90,36 @@ class VectorstoreLoader:
     def _load_and_store_data(self, source_file=S3_LOADER_FILE_NAME, **kwargs):
         if not self.data_store_exists(**kwargs):
             self._create_data_store(**kwargs)
-        loaded_documents = load_and_process_file(
-            self.loader,
-            source_file,
-            metadata_columns=METADATA_COLUMNS,
-            content_columns=CONTENT_COLUMNS,
+        return self._stream(self.vs_client.store_data, source_file)
+
+    def _stream(
+        self,
+        store: Callable[[Iterable[Document]], IngestionReport],
+        source_file,
+    ) -> IngestionReport:
+        """
+        Streams the documents of the source file into a store method, memory is bounded by
+        the batch sizes of the stages rather than the size of the file. Progress is kept in
+        `progress`.
+        """
+        self.progress = LoadProgress()
+        report = store(self._load_documents(source_file))
+        self.progress.docs_indexed = report.docs_indexed
+        logger.info(f"Loaded {source_file}: {self.progress}")
+        return report
+
+    def _load_documents(self, source_file) -> Iterator[Document]:
+        loaded_documents = self.progress.count(
+            load_and_process_file(
+                self.loader,
+                source_file,
+                metadata_columns=METADATA_COLUMNS,
+                content_columns=CONTENT_COLUMNS,
+                key_columns=KEY_COLUMNS,
+                filters=LOAD_FILTERS,
+            ),
+            "rows",
         )
         if self.chunker:
-            chunked_documents = self.chunker.chunk_documents(loaded_documents)
-            return self.vs_client.store_data(chunked_documents)
-        else:
-            return self.vs_client.store_data(loaded_documents)
+            loaded_documents = self.chunker.chunk_documents(loaded_documents)
+        return self.progress.count(loaded_documents, "chunks")
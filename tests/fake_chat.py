@@ -0,0 +1,104 @@
+import json
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+
+class FakeBot:
+    """
+    In memory stand in for a chat bot backend. A posted message is answered once the
+    conversation has been fetched `delay` times, the reply then grows by one of its `chunks`
+    on every further fetch and is marked finished once whole.
+
+    Attributes:
+        posts (List[Dict]): messages posted, with the conversation they were posted to
+        gets (int): number of times a conversation was fetched
+    """
+
+    def __init__(
+        self,
+        reply: Callable[[str], str] = lambda message: f"Reply to {message}",
+        delay: int = 0,
+        chunks: int = 1,
+    ):
+        self.reply = reply
+        self.delay = delay
+        self.chunks = chunks
+        self.posts: List[Dict] = []
+        self.gets = 0
+        self._conversations: Dict[str, Dict] = {}
+
+    def post(self, body: Dict) -> Dict:
+        message = body["message"]["content"][0]["body"]
+        conversation_id = body.get("conversationId") or f"c{len(self._conversations)}"
+        message_id = f"m{len(self.posts)}"
+        self.posts.append({"message": message, "conversationId": conversation_id})
+        self._conversations[conversation_id] = {
+            "message_id": message_id,
+            "reply": self.reply(message),
+            "gets": 0,
+        }
+        return {"conversationId": conversation_id, "messageId": message_id}
+
+    def get(self, conversation_id: str) -> Dict:
+        self.gets += 1
+        conversation = self._conversations[conversation_id]
+        conversation["gets"] += 1
+        message_id = conversation["message_id"]
+        shown = conversation["gets"] - self.delay
+        if shown <= 0:
+            return {
+                "lastMessageId": message_id,
+                "messageMap": {message_id: {"role": "user"}},
+            }
+        words = conversation["reply"].split(" ")
+        size = -(-len(words) // self.chunks)
+        body = " ".join(words[: shown * size])
+        return {
+            "lastMessageId": "reply",
+            "messageMap": {
+                "reply": {
+                    "role": "assistant",
+                    "parent": message_id,
+                    "content": [{"body": body}],
+                    "stopReason": "end_turn" if body == conversation["reply"] else None,
+                }
+            },
+        }
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answers a request of an httpx `MockTransport`."""
+        if request.method == "POST":
+            return httpx.Response(200, json=self.post(json.loads(request.content)))
+        return httpx.Response(200, json=self.get(request.url.path.rsplit("/", 1)[1]))
+
+
+class FakeSession:
+    """Stands in for the requests session of `API`, sending every request to one bot."""
+
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+
+    def post(self, url: str, json: Dict, **kwargs):
+        response = self.bot.post(json)
+        return SimpleNamespace(json=lambda: response)
+
+    def get(self, url: str, **kwargs):
+        response = self.bot.get(url.rsplit("/", 1)[1])
+        return SimpleNamespace(json=lambda: response)
+
+
+def fake_client(bots: Dict[str, FakeBot], statuses: Optional[List[int]] = None):
+    """
+    httpx client whose requests are answered by the bot of their host, after answering
+    the first requests with statuses if given.
+    """
+    statuses = list(statuses or [])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if statuses:
+            return httpx.Response(statuses.pop(0), json={})
+        return bots[request.url.host].handle(request)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
@@ -0,0 +1,190 @@
+import fnmatch
+import json
+from typing import Dict, List, Optional
+
+from opensearchpy.exceptions import NotFoundError
+from opensearchpy.serializer import JSONSerializer
+
+
+class FakeIndex:
+    def __init__(self, body: Optional[Dict] = None):
+        body = body or {}
+        self.settings = dict(body.get("settings", {}).get("index", {}))
+        self.mappings = dict(body.get("mappings", {}))
+        self.docs: Dict[str, Dict] = {}
+        self.refreshes = 0
+
+
+class FakeIndices:
+    def __init__(self, cluster: "FakeOpenSearch"):
+        self.cluster = cluster
+
+    def exists(self, index: str) -> bool:
+        return bool(self.cluster.resolve(index, missing_ok=True))
+
+    def create(self, index: str, body: Optional[Dict] = None, ignore=None):
+        if index in self.cluster.indexes:
+            if ignore == 400:
+                return {"acknowledged": False}
+            raise AssertionError(f"index {index} already exists")
+        self.cluster.indexes[index] = FakeIndex(body)
+        return {"acknowledged": True}
+
+    def delete(self, index: str):
+        for name in self.cluster.resolve(index):
+            del self.cluster.indexes[name]
+            for indexes in self.cluster.aliases.values():
+                indexes.discard(name)
+        return {"acknowledged": True}
+
+    def get_mapping(self, index: str) -> Dict:
+        return {
+            name: {"mappings": self.cluster.indexes[name].mappings}
+            for name in self.cluster.resolve(index)
+        }
+
+    def put_mapping(self, index: str, body: Dict):
+        for name in self.cluster.resolve(index):
+            self.cluster.indexes[name].mappings.update(body)
+        return {"acknowledged": True}
+
+    def put_settings(self, index: str, body: Dict):
+        for name in self.cluster.resolve(index):
+            self.cluster.indexes[name].settings.update(body["index"])
+        return {"acknowledged": True}
+
+    def refresh(self, index: str):
+        for name in self.cluster.resolve(index):
+            self.cluster.indexes[name].refreshes += 1
+
+    def exists_alias(self, name: str) -> bool:
+        return bool(self.cluster.aliases.get(name))
+
+    def get_alias(self, name: str) -> Dict:
+        if not self.exists_alias(name):
+            raise NotFoundError(404, "aliases_not_found_exception", name)
+        return {index: {"aliases": {name: {}}} for index in self.cluster.aliases[name]}
+
+    def update_aliases(self, body: Dict):
+        # applied atomically, so check every action before changing anything
+        for action in body["actions"]:
+            for target in action.values():
+                self.cluster.resolve(target["index"])
+        for action in body["actions"]:
+            if "add" in action:
+                add = action["add"]
+                self.cluster.aliases.setdefault(add["alias"], set()).add(add["index"])
+            elif "remove" in action:
+                remove = action["remove"]
+                self.cluster.aliases[remove["alias"]].discard(remove["index"])
+            elif "remove_index" in action:
+                del self.cluster.indexes[action["remove_index"]["index"]]
+        self.cluster.alias_updates.append(body["actions"])
+        return {"acknowledged": True}
+
+
+class FakeTransport:
+    def __init__(self):
+        self.serializer = JSONSerializer()
+        self.requests: List = []
+
+    def perform_request(self, method: str, url: str, body=None, **kwargs):
+        self.requests.append((method, url, body))
+        return {"acknowledged": True}
+
+
+class FakeOpenSearch:
+    """
+    In memory stand in for the opensearch client, covering the index, alias and document
+    APIs the vector stores use, bulk and scroll included so the opensearchpy helpers work.
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, FakeIndex] = {}
+        self.aliases: Dict[str, set] = {}
+        self.alias_updates: List = []
+        self.indices = FakeIndices(self)
+        self.transport = FakeTransport()
+
+    def resolve(self, index: str, missing_ok: bool = False) -> List[str]:
+        """Names of the indexes behind a comma separated list of indexes, aliases or patterns."""
+        names = []
+        for part in index.split(","):
+            if self.aliases.get(part):
+                names += sorted(self.aliases[part])
+            elif "*" in part:
+                names += sorted(fnmatch.filter(self.indexes, part))
+            elif part in self.indexes:
+                names.append(part)
+            elif not missing_ok:
+                raise NotFoundError(404, "index_not_found_exception", part)
+        return names
+
+    def _single(self, index: str) -> FakeIndex:
+        (name,) = self.resolve(index)
+        return self.indexes[name]
+
+    def index(self, index: str, id: str, body: Dict, refresh=None):
+        if index not in self.indexes and not self.aliases.get(index):
+            self.indexes[index] = FakeIndex()
+        self._single(index).docs[id] = body
+        return {"result": "created"}
+
+    def delete(self, index: str, id: str, ignore=None):
+        try:
+            del self._single(index).docs[id]
+        except (KeyError, NotFoundError):
+            if ignore != 404:
+                raise NotFoundError(404, "not_found", id)
+        return {"result": "deleted"}
+
+    def mget(self, index: str, body: Dict) -> Dict:
+        docs = self._single(index).docs
+        return {
+            "docs": [
+                (
+                    {"_id": id, "found": True, "_source": docs[id]}
+                    if id in docs
+                    else {"_id": id, "found": False}
+                )
+                for id in body["ids"]
+            ]
+        }
+
+    def count(self, index: str) -> Dict:
+        return {"count": sum(len(self.indexes[n].docs) for n in self.resolve(index))}
+
+    def bulk(self, body: str, *args, **kwargs) -> Dict:
+        lines = iter(line for line in body.splitlines() if line)
+        items = []
+        for line in lines:
+            ((op, meta),) = json.loads(line).items()
+            docs = self._single(meta["_index"]).docs
+            if op == "delete":
+                docs.pop(meta["_id"], None)
+            else:
+                docs[meta["_id"]] = json.loads(next(lines))
+            items.append({op: {"_id": meta["_id"], "status": 200}})
+        return {"errors": False, "items": items}
+
+    def search(self, index: str, body: Dict, **kwargs) -> Dict:
+        hits = [
+            {"_index": name, "_id": id, "_source": source}
+            for name in self.resolve(index)
+            for id, source in self.indexes[name].docs.items()
+        ]
+        return {
+            "_scroll_id": "scroll",
+            "_shards": {"total": 1, "successful": 1},
+            "hits": {"hits": hits},
+        }
+
+    def scroll(self, body: Dict, **kwargs) -> Dict:
+        return {"_scroll_id": "scroll", "_shards": {}, "hits": {"hits": []}}
+
+    def clear_scroll(self, body: Dict, **kwargs):
+        return {"succeeded": True}
+
+    def documents(self, index: str) -> Dict[str, Dict]:
+        """The documents of an index or of the index behind an alias."""
+        return self._single(index).docs
@@ -0,0 +1,134 @@
+from typing import List
+
+from langchain_core.documents import Document
+
+from hackathon.loader.chunker import TextChunker, TranscriptChunker
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def utterance(speaker: str, text: str, time: int, **metadata) -> Document:
+    return Document(
+        page_content=text, metadata={"Speaker": speaker, "Time": time, **metadata}
+    )
+
+
+def meeting() -> List[Document]:
+    return [
+        utterance("Chair", "Call to order.", 1),
+        utterance("Chair", "First item.", 2),
+        utterance("Ms Brown", "I move the budget.", 3),
+        utterance("Mr Hobbs", "Seconded.", 4),
+        utterance("Chair", "All in favour say aye.", 5),
+    ]
+
+
+def chunker(**kwargs) -> TranscriptChunker:
+    return TranscriptChunker(length_function=words, **kwargs)
+
+
+def test_utterances_are_packed_into_whole_turns_with_overlap():
+    chunks = list(chunker(max_tokens=12, overlap_turns=1).chunk_documents(meeting()))
+
+    assert [chunk.page_content for chunk in chunks] == [
+        "Chair: Call to order. First item.\n\nMs Brown: I move the budget.",
+        "Ms Brown: I move the budget.\n\nMr Hobbs: Seconded.",
+        "Mr Hobbs: Seconded.\n\nChair: All in favour say aye.",
+    ]
+    assert chunks[0].metadata == {
+        "speakers": ["Chair", "Ms Brown"],
+        "start_time": 1,
+        "end_time": 3,
+        "start_index": 0,
+    }
+    assert [chunk.metadata["start_index"] for chunk in chunks] == [0, 1, 2]
+
+
+def test_rendered_transcripts_are_split_on_paragraphs():
+    transcript = Document(
+        page_content="\n\nChair: Call to order.\n\nMs Brown: So moved.\n\nAside",
+        metadata={"source": "minutes"},
+    )
+
+    (chunk,) = chunker(max_tokens=100).chunk_documents([transcript])
+
+    assert chunk.page_content == (
+        "Chair: Call to order.\n\nMs Brown: So moved.\n\n: Aside"
+    )
+    assert chunk.metadata == {
+        "source": "minutes",
+        "speakers": ["Chair", "Ms Brown", ""],
+        "start_index": 0,
+    }
+
+
+def test_turns_over_the_budget_are_split():
+    speech = utterance("Chair", " ".join(f"word{i}" for i in range(20)), 1)
+
+    chunks = list(chunker(max_tokens=6, overlap_turns=0).chunk_documents([speech]))
+
+    assert len(chunks) > 1
+    assert all(chunk.page_content.startswith("Chair: ") for chunk in chunks)
+    assert all(words(chunk.page_content) <= 6 for chunk in chunks)
+    assert " ".join(c.page_content[len("Chair: ") :] for c in chunks) == (
+        speech.page_content
+    )
+
+
+def test_chunks_never_span_transcripts():
+    documents = [
+        utterance("Chair", "Order.", 1, meeting_id="a"),
+        utterance("Chair", "Order.", 1, meeting_id="b"),
+        utterance("Ms Brown", "Aye.", 2, meeting_id="b"),
+    ]
+
+    chunks = list(
+        chunker(max_tokens=100, transcript_field="meeting_id").chunk_documents(
+            documents
+        )
+    )
+
+    assert [chunk.metadata["meeting_id"] for chunk in chunks] == ["a", "b"]
+    assert [chunk.metadata["start_index"] for chunk in chunks] == [0, 0]
+
+
+def test_chunks_are_yielded_before_the_documents_are_read():
+    read = []
+
+    def documents():
+        for doc in meeting() * 100:
+            read.append(doc)
+            yield doc
+
+    next(chunker(max_tokens=12).chunk_documents(documents()))
+
+    assert len(read) < 10
+
+
+def test_text_chunker_keeps_short_documents_whole():
+    doc = Document(page_content="short", metadata={"row": 1})
+
+    (chunk,) = TextChunker(chunk_size=100, overlap=10).chunk_documents([doc])
+
+    assert chunk == Document(
+        page_content="short", metadata={"row": 1, "start_index": 0}
+    )
+
+
+def test_text_chunker_start_index_locates_each_chunk():
+    text = " ".join(f"sentence {i}." for i in range(60))
+
+    chunks = list(
+        TextChunker(chunk_size=80, overlap=20).chunk_documents(
+            [Document(page_content=text)]
+        )
+    )
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert text[start : start + len(chunk.page_content)] == chunk.page_content
+    starts = [chunk.metadata["start_index"] for chunk in chunks]
+    assert starts == sorted(set(starts))
@@ -0,0 +1,79 @@
+from config.settings import LLM_REPLY_TOKEN_ALLOWANCE
+from hackathon.llm.conversation import ConversationSession, select_snippets
+from hackathon.llm.llm_api import API
+from hackathon.llm.tokens import count_tokens
+from tests.fake_chat import FakeBot, FakeSession
+
+TRANSCRIPT = "\n\n".join(
+    [
+        "Chair: Welcome to the meeting of the parks committee.",
+        "Ms Brown: The budget for the new playground is twelve thousand pounds.",
+        "Mr Hobbs: The roads need resurfacing before the winter.",
+        "Chair: Thank you, the meeting is closed.",
+    ]
+)
+
+
+def session(bot: FakeBot, **kwargs) -> ConversationSession:
+    return ConversationSession(
+        API("key", "http://bot", session=FakeSession(bot)), TRANSCRIPT, **kwargs
+    )
+
+
+def test_the_transcript_is_sent_only_with_the_first_query():
+    bot = FakeBot()
+    conversation = session(bot)
+
+    prompts = ["What is the budget?", "And the roads?"]
+    first, _ = [conversation.query(prompt) for prompt in prompts]
+
+    assert first.startswith("Reply to With knowledge of this transcript:")
+    assert TRANSCRIPT in bot.posts[0]["message"]
+    assert bot.posts[1] == {"message": "And the roads?", "conversationId": "c0"}
+    stats = conversation.stats()
+    assert stats["queries"] == 2
+    assert stats["tokens_sent"] == sum(count_tokens(p["message"]) for p in bot.posts)
+    assert stats["naive_tokens"] == sum(
+        count_tokens(TRANSCRIPT) + count_tokens(prompt) for prompt in prompts
+    )
+    assert stats["tokens_saved"] == stats["naive_tokens"] - stats["tokens_sent"] > 0
+    assert stats["context_tokens"] == sum(
+        count_tokens(post["message"]) + count_tokens(f"Reply to {post['message']}")
+        for post in bot.posts
+    )
+
+
+def test_an_existing_conversation_is_not_sent_the_transcript():
+    bot = FakeBot()
+    conversation = session(bot, conversation_id="primed")
+
+    conversation.query("What is the budget?")
+
+    assert bot.posts == [{"message": "What is the budget?", "conversationId": "primed"}]
+
+
+def test_queries_which_would_overflow_are_sent_relevant_passages():
+    bot = FakeBot()
+    limit = LLM_REPLY_TOKEN_ALLOWANCE + count_tokens(TRANSCRIPT)
+    conversation = session(bot, context_token_limit=limit)
+
+    chunks = list(conversation.stream_query("How much is the playground budget?"))
+
+    message = bot.posts[0]["message"]
+    assert "".join(chunks) == f"Reply to {message}"
+    assert message.startswith("With knowledge of these passages from a transcript:")
+    assert "twelve thousand pounds" in message and "roads" not in message
+    # retrieval queries each go to a new conversation, so this one is never primed
+    assert not conversation.primed
+    assert conversation.context_tokens == 0
+
+
+def test_snippets_are_the_most_relevant_passages_in_transcript_order():
+    snippets = select_snippets(TRANSCRIPT, "the meeting budget", token_budget=45)
+
+    assert snippets.split("\n\n") == [
+        "Chair: Welcome to the meeting of the parks committee.",
+        "Ms Brown: The budget for the new playground is twelve thousand pounds.",
+        "Chair: Thank you, the meeting is closed.",
+    ]
+    assert select_snippets(TRANSCRIPT, "budget", token_budget=5) == ""
@@ -0,0 +1,64 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from hackathon.vectorstore.embedding_cache import CachedEmbeddings, EmbeddingStore
+from hackathon.vectorstore.embeddings import BatchingEmbeddings
+from hackathon.vectorstore.query_cache import LRUCache, QueryEmbeddingCache
+
+
+class RecordingEmbeddings(Embeddings):
+    """Embeds a text as its length and records every request made."""
+
+    def __init__(self):
+        self.requests: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.requests.append([text])
+        return [float(len(text)), 0.0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        self.requests.append(list(texts))
+        return [[float(len(text)), 0.0] for text in texts]
+
+
+def test_queries_are_packed_into_batches():
+    inner = RecordingEmbeddings()
+    embeddings = BatchingEmbeddings(inner, max_batch_size=3, max_in_flight=2)
+    queries = [f"question {i}" * (i + 1) for i in range(7)]
+
+    vectors = embeddings.embed_queries(queries)
+
+    assert vectors == [[float(len(q)), 0.0] for q in queries]
+    assert sorted(map(len, inner.requests)) == [1, 3, 3]
+
+
+def test_query_misses_reach_the_endpoint_in_one_request(tmp_path):
+    inner = RecordingEmbeddings()
+    embeddings = QueryEmbeddingCache(
+        CachedEmbeddings(BatchingEmbeddings(inner), EmbeddingStore(str(tmp_path))),
+        LRUCache(100, 60),
+    )
+    embeddings.embed_query("parks")
+    inner.requests.clear()
+
+    vectors = embeddings.embed_queries(["roads", "parks", "budget", "roads"])
+
+    assert vectors == [[5.0, 0.0], [5.0, 0.0], [6.0, 0.0], [5.0, 0.0]]
+    assert inner.requests == [["roads", "budget"]]
+
+
+def test_only_documents_are_kept_on_disk(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    embeddings = CachedEmbeddings(RecordingEmbeddings(), store)
+
+    embeddings.embed_documents(["budget", "parks"])
+    embeddings.embed_query("how much is the budget?")
+    embeddings.embed_queries(["roads", "schools"])
+
+    assert len(store) == 2
+    assert len(EmbeddingStore(str(tmp_path))) == 2
@@ -0,0 +1,41 @@
+import numpy as np
+
+from hackathon.vectorstore.index_config import IndexConfig, VectorTransform
+
+
+def squared_distances(queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    return ((queries[:, None] - vectors[None]) ** 2).sum(axis=-1)
+
+
+def test_pca_fitted_to_a_small_sample_keeps_its_ranking():
+    rng = np.random.default_rng(0)
+    vectors, queries = rng.normal(size=(3, 16)), rng.normal(size=(4, 16))
+
+    transform = VectorTransform.fit(vectors, pca_dimensions=8)
+
+    reduced = np.asarray(transform.apply(vectors))
+    assert reduced.shape == (3, 8)
+    np.testing.assert_array_equal(
+        squared_distances(np.asarray(transform.apply(queries)), reduced).argsort(),
+        squared_distances(queries, vectors).argsort(),
+    )
+
+
+def test_undersampled_transform_is_not_reused():
+    rng = np.random.default_rng(0)
+    config = IndexConfig(pca_dimensions=8, quantization="byte")
+
+    small = config.fit_transform(rng.normal(size=(3, 16)))
+    large = config.fit_transform(rng.normal(size=(50, 16)))
+
+    assert small.undersampled and not small.matches(config)
+    assert not large.undersampled and large.matches(config)
+    assert VectorTransform.from_meta(small.to_meta()).undersampled
+
+
+def test_transform_without_recorded_samples_matches():
+    transform = VectorTransform.from_meta(
+        {"mean": None, "components": None, "scale": 1}
+    )
+
+    assert transform.matches(IndexConfig(quantization="byte"))
@@ -0,0 +1,127 @@
+import threading
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.vectorstore import ingestion
+from hackathon.vectorstore.ingestion import IngestionPipeline, content_hash, document_id
+
+
+def batches(count: int, size: int = 2) -> List[List[Document]]:
+    return [
+        [Document(page_content=f"doc {b}.{i}") for i in range(size)]
+        for b in range(count)
+    ]
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    sleeps = []
+    monkeypatch.setattr(ingestion.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_every_batch_is_embedded_then_indexed():
+    indexed = []
+    lock = threading.Lock()
+
+    def index(docs, vectors):
+        with lock:
+            indexed.extend(zip((d.page_content for d in docs), vectors))
+
+    pipeline = IngestionPipeline(
+        lambda docs: [len(d.page_content) for d in docs],
+        index,
+        embed_workers=3,
+        index_workers=2,
+        queue_size=1,
+    )
+
+    report = pipeline.run(batches(10))
+
+    assert sorted(indexed) == sorted(
+        (d.page_content, len(d.page_content)) for batch in batches(10) for d in batch
+    )
+    assert (report.docs_indexed, report.stages["embed"].batches) == (20, 10)
+    assert not report.dead_letters
+
+
+def test_failed_batches_are_retried_with_backoff(sleeps):
+    failures = {"embed": 2}
+
+    def embed(docs):
+        if failures["embed"]:
+            failures["embed"] -= 1
+            raise ConnectionError("endpoint busy")
+        return docs
+
+    pipeline = IngestionPipeline(
+        embed, lambda docs, _: None, embed_workers=1, retries=3, backoff=0.5
+    )
+
+    report = pipeline.run(batches(1))
+
+    assert sleeps == [0.5, 1.0]
+    assert (report.stages["embed"].retries, report.docs_indexed) == (2, 2)
+
+
+def test_batches_out_of_retries_are_dead_lettered_and_the_rest_indexed(sleeps):
+    def index(docs, _):
+        if docs[0].page_content == "doc 1.0":
+            raise RuntimeError("mapping conflict")
+
+    pipeline = IngestionPipeline(lambda docs: docs, index, retries=1, backoff=0)
+
+    report = pipeline.run(batches(3))
+
+    assert report.docs_indexed == 4
+    (letter,) = report.dead_letters
+    assert letter.stage == "index" and isinstance(letter.error, RuntimeError)
+    assert [d.page_content for d in report.dead_letter_documents()] == [
+        "doc 1.0",
+        "doc 1.1",
+    ]
+    assert (report.stages["index"].retries, report.stages["index"].dead_letters) == (
+        1,
+        1,
+    )
+
+
+def test_batches_are_read_as_the_stages_have_room():
+    read = []
+    release = threading.Event()
+
+    def source():
+        for batch in batches(20):
+            read.append(batch)
+            yield batch
+
+    def index(docs, _):
+        release.wait()
+
+    pipeline = IngestionPipeline(
+        lambda docs: docs, index, embed_workers=1, index_workers=1, queue_size=1
+    )
+    thread = threading.Thread(target=pipeline.run, args=(source(),))
+    thread.start()
+    thread.join(0.2)
+    # one batch being indexed, one embedded and one waiting in each queue
+    assert len(read) <= 5
+    release.set()
+    thread.join()
+    assert len(read) == 20
+
+
+def test_ids_are_stable_per_source_row_and_chunk():
+    chunk = Document(
+        page_content="text", metadata={SOURCE_KEY_FIELD: "r1", "start_index": 10}
+    )
+    edited = Document(page_content="new text", metadata=chunk.metadata)
+
+    assert document_id(chunk) == document_id(edited)
+    assert content_hash(chunk) != content_hash(edited)
+    assert document_id(Document(page_content="text")) == content_hash(
+        Document(page_content="text")
+    )
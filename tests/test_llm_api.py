@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from config.settings import LLM_API_POOL_SIZE
+from hackathon.llm import llm_api
+from hackathon.llm.llm_api import (
+    API,
+    AsyncAPI,
+    ResponseNotReady,
+    ResponseRewritten,
+    ResponseTimeout,
+    create_session,
+)
+from tests.fake_chat import FakeBot, FakeSession, fake_client
+
+
+def status_client(statuses, requests):
+    """Client whose backend answers each request with the next of statuses."""
+    statuses = iter(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.method)
+        return httpx.Response(next(statuses), json={"conversationId": "c1"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_gets_are_retried_on_server_errors():
+    requests = []
+
+    async def get():
+        async with status_client([503, 502, 200], requests) as client:
+            api = AsyncAPI(API("key", "http://bot"), client, backoff_factor=0)
+            return await api.get_conversation("c1")
+
+    assert asyncio.run(get()) == {"conversationId": "c1"}
+    assert requests == ["GET"] * 3
+
+
+def test_posts_are_not_retried_once_sent():
+    requests = []
+
+    async def post():
+        async with status_client([503, 200], requests) as client:
+            api = AsyncAPI(API("key", "http://bot"), client, backoff_factor=0)
+            return await api._request("POST", "/conversation", json={})
+
+    assert asyncio.run(post()).status_code == 503
+    assert requests == ["POST"]
+
+
+def test_session_only_retries_gets_once_sent():
+    retry = create_session().get_adapter("https://bot").max_retries
+
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("POST", 503)
+    assert retry.allowed_methods == {"GET"}
+
+
+def test_gets_give_up_after_the_retries():
+    requests = []
+
+    async def get():
+        async with status_client([503] * 5, requests) as client:
+            api = AsyncAPI(
+                API("key", "http://bot"), client, retries=2, backoff_factor=0
+            )
+            return await api._request("GET", "/conversation/c1")
+
+    assert asyncio.run(get()).status_code == 503
+    assert requests == ["GET"] * 3
+
+
+def test_replies_to_an_earlier_message_are_not_ready():
+    bot = FakeBot()
+
+    async def replies():
+        async with fake_client({"bot": bot}) as client:
+            api = AsyncAPI(API("key", "http://bot"), client)
+            first = await api.invoke_post("First")
+            second = await api.invoke_post("Second", first["conversationId"])
+            with pytest.raises(ResponseNotReady):
+                await api.get_response(first["conversationId"], first["messageId"])
+            return await api.get_response(second["conversationId"], second["messageId"])
+
+    assert asyncio.run(replies()) == "Reply to Second"
+    assert bot.posts[1] == {"message": "Second", "conversationId": "c0"}
+
+
+def test_apis_share_one_session():
+    assert llm_api.summary_api.session is llm_api.conversation_api.session
+    adapter = llm_api.api_session.get_adapter("https://bot")
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == LLM_API_POOL_SIZE
+
+
+def streaming_api(bot: FakeBot) -> API:
+    return API("key", "http://bot", session=FakeSession(bot))
+
+
+def test_replies_are_streamed_as_they_grow():
+    bot = FakeBot(lambda message: "one two three four five six", delay=2, chunks=3)
+    api = streaming_api(bot)
+    posted = api.invoke_post("Minutes")
+
+    chunks = list(
+        api.stream_response(posted["conversationId"], posted["messageId"], interval=0)
+    )
+
+    assert chunks == ["one two", " three four", " five six"]
+    assert bot.gets == 5
+
+
+class ScriptedSession:
+    """Session answering every fetch with the next of a list of replies."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    def get(self, url, **kwargs):
+        body, stop_reason = self.replies.pop(0)
+        reply = {
+            "role": "assistant",
+            "content": [{"body": body}],
+            "stopReason": stop_reason,
+        }
+        conversation = {"lastMessageId": "r", "messageMap": {"r": reply}}
+        return SimpleNamespace(json=lambda: conversation)
+
+
+def test_rewritten_replies_end_the_stream():
+    api = API(
+        "key", "http://bot", session=ScriptedSession(("Draft", None), ("Final", None))
+    )
+    stream = api.stream_response("c0", interval=0)
+
+    assert next(stream) == "Draft"
+    with pytest.raises(ResponseRewritten):
+        next(stream)
+
+
+def test_streams_time_out_once_the_reply_stops_growing():
+    api = API("key", "http://bot", session=ScriptedSession(*[("Stalled", None)] * 50))
+    stream = api.stream_response("c0", interval=0.01, timeout=0.05)
+
+    assert next(stream) == "Stalled"
+    with pytest.raises(ResponseTimeout):
+        next(stream)
+
+
+@pytest.mark.parametrize(
+    "reply, finished",
+    [
+        ({"content": [{"body": "Done"}]}, True),
+        ({"content": [{"body": "Done"}], "stopReason": "end_turn"}, True),
+        ({"content": [{"body": "Partial"}], "stopReason": None}, False),
+    ],
+)
+def test_reply_finished(reply, finished):
+    assert API.reply_finished(reply) is finished
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from hackathon.llm import llm_orchestrator
+from hackathon.llm.llm_api import API, AsyncAPI, ResponseTimeout
+from hackathon.llm.llm_orchestrator import SummaryOrchestrator, poll_response
+from hackathon.llm.response_cache import SQLiteResponseCache
+from tests.fake_chat import FakeBot, fake_client
+
+BOTS = ("summary", "facts", "glossary", "conversation")
+
+
+def poll(bot: FakeBot, **poll_kwargs) -> str:
+    async def run():
+        async with fake_client({"bot": bot}) as client:
+            api = AsyncAPI(API("key", "http://bot"), client)
+            posted = await api.invoke_post("Minutes")
+            return await poll_response(
+                api, posted["conversationId"], posted["messageId"], **poll_kwargs
+            )
+
+    return asyncio.run(run())
+
+
+def test_polls_back_off_until_the_reply_is_ready(monkeypatch):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_orchestrator.asyncio, "sleep", sleep)
+    bot = FakeBot(delay=4)
+
+    reply = poll(bot, initial_delay=1, backoff=2, max_delay=5)
+
+    assert reply == "Reply to Minutes"
+    assert sleeps == [1, 2, 4, 5]
+    assert bot.gets == 5
+
+
+def test_polling_gives_up_after_the_timeout():
+    bot = FakeBot(delay=1000)
+
+    with pytest.raises(ResponseTimeout):
+        poll(bot, initial_delay=0.01, timeout=0.05)
+
+    assert 2 <= bot.gets < 10
+
+
+def test_unfinished_replies_are_polled_until_finished():
+    bot = FakeBot(chunks=3)
+
+    assert poll(bot, initial_delay=0) == "Reply to Minutes"
+    assert bot.gets == 3
+
+
+@pytest.fixture
+def bots(monkeypatch):
+    bots = {
+        name: FakeBot(lambda message, name=name: f"{name} of {message}")
+        for name in BOTS
+    }
+    monkeypatch.setattr(
+        llm_orchestrator, "create_async_client", lambda: fake_client(bots)
+    )
+    return bots
+
+
+def orchestrator(**kwargs) -> SummaryOrchestrator:
+    return SummaryOrchestrator(
+        *(API("key", f"http://{name}") for name in BOTS), initial_delay=0, **kwargs
+    )
+
+
+def test_every_bot_is_run_and_the_glossary_is_of_the_summary(bots):
+    result = orchestrator().run("Minutes")
+
+    assert result == {
+        "summary": "summary of Minutes",
+        "facts": "facts of Minutes",
+        "glossary": "glossary of summary of Minutes",
+        "conversationConversationId": "c0",
+    }
+
+
+def test_cached_responses_are_reused_but_conversations_are_not(bots, tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"))
+
+    first = orchestrator(cache=cache).run("Minutes")
+    second = orchestrator(cache=cache).run("Minutes")
+
+    assert first["summary"] == second["summary"]
+    assert [len(bots[name].posts) for name in BOTS] == [1, 1, 1, 2]
+    assert first["conversationConversationId"] != second["conversationConversationId"]
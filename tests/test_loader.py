@@ -0,0 +1,82 @@
+import boto3
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.loader.loader import S3Loader, load_and_process_file
+
+BUCKET = "transcripts"
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key="data.bin", Body=DATA)
+        yield client
+
+
+def loader(**kwargs) -> S3Loader:
+    return S3Loader(BUCKET, endpoint_url=None, **kwargs)
+
+
+def test_load_reads_small_objects_whole(s3):
+    with loader(part_size=len(DATA)).load("data.bin") as f:
+        assert f.read() == DATA
+
+
+@pytest.mark.parametrize("spool_bytes", [len(DATA), 1000])
+def test_load_downloads_large_objects_in_parts(s3, spool_bytes):
+    with loader(part_size=999, max_concurrency=4, spool_bytes=spool_bytes).load(
+        "data.bin"
+    ) as f:
+        assert f.read() == DATA
+
+
+def test_open_streams_the_object_in_order(s3):
+    with loader(part_size=999, max_concurrency=3).open("data.bin") as f:
+        head = f.read(10)
+        assert head + f.read() == DATA
+
+
+def test_open_fails_if_the_object_changes_while_read(s3):
+    with loader(part_size=100, max_concurrency=1).open("data.bin") as f:
+        f.read(1)
+        s3.put_object(Bucket=BUCKET, Key="data.bin", Body=DATA[::-1])
+
+        with pytest.raises(ClientError, match="PreconditionFailed"):
+            f.read()
+
+
+def test_csv_is_processed_while_streamed(s3):
+    data = pd.DataFrame(
+        {
+            "id": range(50),
+            "Speaker": ["Chair", "Ms Brown"] * 25,
+            "Text": [f"turn {i}" for i in range(50)],
+        }
+    )
+    s3.put_object(Bucket=BUCKET, Key="minutes.csv", Body=data.to_csv(index=False))
+
+    documents = list(
+        load_and_process_file(
+            loader(part_size=256, max_concurrency=2),
+            "minutes.csv",
+            metadata_columns=["Speaker"],
+            content_columns=["Text"],
+            key_columns=["id"],
+            filters=[("Speaker", "==", "Chair")],
+        )
+    )
+
+    assert [doc.page_content for doc in documents] == [
+        f"turn {i}" for i in range(0, 50, 2)
+    ]
+    assert documents[1].metadata == {"Speaker": "Chair", SOURCE_KEY_FIELD: "2"}
@@ -0,0 +1,210 @@
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.vectorstore import local_vectorstore
+from hackathon.vectorstore.local_vectorstore import (
+    LocalVectorStore,
+    NumpyVectorSearch,
+    matches_filter,
+)
+
+VOCABULARY = ["budget", "housing", "parks", "roads", "schools"]
+
+
+class WordCountEmbeddings(Embeddings):
+    """Embeds a text as the count of each vocabulary word in it."""
+
+    def __init__(self):
+        self.documents_embedded = 0
+        self.queries_embedded = 0
+
+    def _embed(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(words.count(word)) for word in VOCABULARY]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.documents_embedded += len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries_embedded += 1
+        return self._embed(text)
+
+
+@pytest.fixture(autouse=True)
+def no_embedding_cache(monkeypatch):
+    monkeypatch.setattr(local_vectorstore, "cache_embeddings", lambda e: e)
+
+
+def documents() -> List[Document]:
+    return [
+        Document(
+            page_content=f"{word} {word}",
+            metadata={SOURCE_KEY_FIELD: word, "topic": word, "year": year},
+        )
+        for word, year in zip(VOCABULARY, [2020, 2021, 2022, 2023, 2024])
+    ]
+
+
+def test_search_returns_nearest_first():
+    store = NumpyVectorSearch.from_texts(
+        [doc.page_content for doc in documents()], WordCountEmbeddings()
+    )
+
+    hits = store.similarity_search_with_score("parks", k=2)
+
+    assert hits[0][0].page_content == "parks parks"
+    assert hits[0][1] > hits[1][1]
+
+
+def test_pre_filter_limits_the_search():
+    docs = documents()
+    store = NumpyVectorSearch.from_texts(
+        [doc.page_content for doc in docs],
+        WordCountEmbeddings(),
+        metadatas=[doc.metadata for doc in docs],
+    )
+    pre_filter = {"range": {"metadata.year": {"gte": 2023}}}
+
+    hits = store.similarity_search("parks", k=5, pre_filter=pre_filter)
+
+    assert {doc.metadata["topic"] for doc in hits} == {"roads", "schools"}
+
+
+@pytest.mark.parametrize(
+    "pre_filter, expected",
+    [
+        ({"topic": "roads"}, True),
+        ({"term": {"metadata.topic": "parks"}}, False),
+        ({"terms": {"topic": ["parks", "roads"]}}, True),
+        ({"bool": {"must_not": [{"match": {"topic": "roads"}}]}}, False),
+        ({"exists": {"field": "metadata.missing"}}, False),
+        (None, True),
+    ],
+)
+def test_matches_filter(pre_filter, expected):
+    assert matches_filter({"topic": "roads", "year": 2023}, pre_filter) is expected
+
+
+def test_ivf_search_agrees_with_exact_search():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(600, 8)).tolist()
+    store = NumpyVectorSearch(WordCountEmbeddings(), ann_threshold=100, nprobe=64)
+    store.add_vectors(vectors, [str(i) for i in range(600)])
+    queries = rng.normal(size=(5, 8)).tolist()
+
+    approximate = store.search_by_vectors(queries, k=3)
+    exact = store.search_by_vectors(queries, k=3, exact=True)
+
+    assert [[d.page_content for d, _ in hits] for hits in approximate] == [
+        [d.page_content for d, _ in hits] for hits in exact
+    ]
+
+
+def test_add_with_existing_id_replaces_and_delete_compacts():
+    store = NumpyVectorSearch(WordCountEmbeddings())
+    store.add_texts(["budget", "parks", "roads"], ids=["a", "b", "c"])
+
+    store.add_texts(["schools"], ids=["b"])
+    store.delete(["a"])
+
+    assert store.ids == ["b", "c"]
+    assert store.texts == ["schools", "roads"]
+    assert store.similarity_search("schools", k=1)[0].page_content == "schools"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    docs = documents()
+    store = NumpyVectorSearch.from_texts(
+        [doc.page_content for doc in docs],
+        WordCountEmbeddings(),
+        metadatas=[doc.metadata for doc in docs],
+        space_type="cosinesimil",
+    )
+    store.save(str(tmp_path))
+
+    loaded = NumpyVectorSearch.load(str(tmp_path), WordCountEmbeddings())
+
+    assert loaded.space_type == "cosinesimil"
+    assert loaded.ids == store.ids
+    np.testing.assert_array_equal(loaded.vectors, store.vectors)
+    assert loaded.similarity_search_with_score("roads", k=1) == (
+        store.similarity_search_with_score("roads", k=1)
+    )
+
+
+def test_sync_embeds_only_changes_and_deletes_missing(tmp_path):
+    embeddings = WordCountEmbeddings()
+    store = LocalVectorStore(embeddings, path=str(tmp_path))
+    store.store_data(documents())
+    embeddings.documents_embedded = 0
+    docs = documents()[1:]
+    docs[0] = Document(
+        page_content="housing housing housing", metadata=docs[0].metadata
+    )
+
+    report = store.sync_data(docs)
+
+    assert (report.docs_indexed, report.unchanged, report.deleted) == (1, 3, 1)
+    assert embeddings.documents_embedded == 1
+    reloaded = LocalVectorStore(embeddings, path=str(tmp_path))
+    assert len(reloaded.get_documents()) == 4
+    assert reloaded.retrieve_data("housing", k=1)[0].page_content == (
+        "housing housing housing"
+    )
+
+
+class FailingEmbeddings(WordCountEmbeddings):
+    """Fails to embed any batch which contains the word schools."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if any("schools" in text for text in texts):
+            raise RuntimeError("endpoint unavailable")
+        return super().embed_documents(texts)
+
+
+def test_reindex_keeps_the_current_store_if_a_batch_fails(tmp_path):
+    embeddings = FailingEmbeddings()
+    store = LocalVectorStore(embeddings, path=str(tmp_path), retries=0, backoff=0)
+    store.store_data(documents()[:2])
+
+    report = store.reindex_data(documents())
+
+    assert len(report.dead_letters) == 1
+    assert len(report.dead_letter_documents()) == len(documents())
+    assert store.vectorstore.texts == ["budget budget", "housing housing"]
+    reloaded = LocalVectorStore(embeddings, path=str(tmp_path))
+    assert len(reloaded.get_documents()) == 2
+
+
+def test_retrieve_many_matches_retrieve_data():
+    embeddings = WordCountEmbeddings()
+    store = LocalVectorStore(embeddings, path=None)
+    store.store_data(documents())
+    queries = ["roads", "budget schools"]
+
+    results = store.retrieve_many(queries, k=2, pre_filter={"year": 2024})
+
+    assert [r.query for r in results] == queries
+    assert (embeddings.documents_embedded, embeddings.queries_embedded) == (5, 2)
+    for result in results:
+        assert [doc for doc, _ in result.hits] == store.retrieve_data(
+            result.query, k=2, pre_filter={"year": 2024}
+        )
+
+
+def test_delete_data_store_removes_saved_files(tmp_path):
+    path = tmp_path / "store"
+    store = LocalVectorStore(WordCountEmbeddings(), path=str(path))
+    store.store_data(documents())
+    assert store.check_data_exists()
+
+    store.delete_data_store()
+
+    assert not store.check_data_exists()
+    assert not path.exists()
@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.loader.processors import CSVProcessor, ProcessorFactory
+
+
+def test_metadata_is_cast_as_the_row_by_row_processing_did():
+    df = pd.DataFrame(
+        {
+            "text": [" Budget ", "Parks"],
+            "number": [1, 2],
+            "ratio": [0.5, np.nan],
+            "approved": [True, False],
+            "date": pd.to_datetime(["2020-01-01", "2020-01-02"]),
+            "tags": [["a", "b"], ("c",)],
+            "mixed": [3, "x"],
+            "id": ["r1", "r2"],
+        }
+    )
+    processor = CSVProcessor(
+        metadata_columns=["number", "ratio", "approved", "date", "tags", "mixed"],
+        content_columns=["text"],
+        key_columns=["id"],
+    )
+
+    first, second = processor._dataframe_process(df)
+
+    assert first.page_content == "Budget"
+    assert first.metadata == {
+        "number": 1,
+        "ratio": 0.5,
+        "approved": 1,
+        "date": "2020-01-01 00:00:00",
+        "tags": ["a", "b"],
+        "mixed": 3,
+        SOURCE_KEY_FIELD: "r1",
+    }
+    assert second.metadata["approved"] == 0
+    assert np.isnan(second.metadata["ratio"])
+    assert second.metadata["tags"] == "('c',)"
+    assert second.metadata["mixed"] == "x"
+
+
+def minutes(rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": [f"r{i}" for i in range(rows)],
+            "Speaker": ["Chair", "Clerk", "Ms Brown", "Mr Hobbs"] * (rows // 4),
+            "Text": [f"turn {i}" for i in range(rows)],
+            "Year": np.repeat([2020, 2021, 2022, 2023, 2024], rows // 5),
+            "Audio": [b"\x00" * 64] * rows,
+        }
+    )
+
+
+def processor(file_path: str, filters=None):
+    return ProcessorFactory.get_processor(
+        file_path,
+        metadata_columns=["Speaker"],
+        content_columns=["Text"],
+        key_columns=["id"],
+        filters=filters,
+    )
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = tmp_path / "minutes.parquet"
+    # a row group per year, so the year filters can skip whole row groups
+    pq.write_table(pa.Table.from_pandas(minutes(), preserve_index=False), path, 20)
+    assert pq.ParquetFile(path).num_row_groups == 5
+    return path
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        (None, minutes()),
+        ([("Year", ">=", 2023)], minutes().query("Year >= 2023")),
+        ([("Year", "<", 2021)], minutes().query("Year < 2021")),
+        (
+            [("Speaker", "in", ["Chair", "Clerk"]), ("Year", "!=", 2022)],
+            minutes().query("Speaker in ['Chair', 'Clerk'] and Year != 2022"),
+        ),
+        ([("Speaker", "not in", ["Chair"])], minutes().query("Speaker != 'Chair'")),
+        ([("Year", "==", 2030)], minutes().iloc[:0]),
+    ],
+)
+def test_parquet_reads_only_the_projected_columns_and_matching_rows(
+    parquet_path, filters, expected
+):
+    batches = list(processor(str(parquet_path), filters).read_batches(parquet_path))
+
+    assert all(list(df.columns) == ["Text", "Speaker", "id"] for df in batches)
+    read = pd.concat(batches) if batches else pd.DataFrame(columns=["id"])
+    assert list(read["id"]) == list(expected["id"])
+
+
+def test_parquet_is_read_from_file_objects(parquet_path):
+    with open(parquet_path, "rb") as f:
+        documents = list(
+            processor("minutes.parquet", [("Year", "==", 2024)]).transform_to_docs(f)
+        )
+
+    assert [doc.metadata[SOURCE_KEY_FIELD] for doc in documents] == [
+        f"r{i}" for i in range(80, 100)
+    ]
+
+
+def test_csv_filters_match_the_parquet_filters(tmp_path, parquet_path):
+    csv_path = tmp_path / "minutes.csv"
+    minutes().to_csv(csv_path, index=False)
+    filters = [("Speaker", "in", ["Chair", "Ms Brown"]), ("Year", ">", 2021)]
+
+    from_csv = pd.concat(processor(str(csv_path), filters).read_batches(csv_path))
+    from_parquet = pd.concat(
+        processor(str(parquet_path), filters).read_batches(parquet_path)
+    )
+
+    assert list(from_csv["id"]) == list(from_parquet["id"])
+    assert set(from_csv.columns) == {"Text", "Speaker", "id", "Year"}
+
+
+def test_unknown_filter_operators_are_rejected():
+    with pytest.raises(ValueError, match="like"):
+        processor("minutes.parquet", [("Text", "like", "turn%")])
+
+
+def test_parquet_row_groups_are_skipped_by_their_statistics(parquet_path, monkeypatch):
+    parquet_format = ds.ParquetFileFormat
+    row_groups = []
+
+    class CountingFormat:
+        def make_fragment(self, *args, **kwargs):
+            fragment = parquet_format().make_fragment(*args, **kwargs)
+            split = fragment.split_by_row_group
+
+            def split_by_row_group(*args, **kwargs):
+                row_groups.extend(split(*args, **kwargs))
+                return row_groups
+
+            return SimpleNamespace(
+                physical_schema=fragment.physical_schema,
+                split_by_row_group=split_by_row_group,
+            )
+
+    monkeypatch.setattr(ds, "ParquetFileFormat", CountingFormat)
+
+    filters = [("Year", "in", [2021, 2024])]
+    read = list(processor(str(parquet_path), filters).read_batches(parquet_path))
+
+    assert len(row_groups) == 2
+    assert sum(map(len, read)) == 40
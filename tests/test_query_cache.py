@@ -0,0 +1,90 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from hackathon.vectorstore import query_cache
+from hackathon.vectorstore.query_cache import (
+    IndexGenerations,
+    LRUCache,
+    QueryCache,
+    QueryEmbeddingCache,
+)
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as its length, recording every text embedded."""
+
+    def __init__(self):
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(max_entries=2, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "time", lambda: now[0])
+    cache = LRUCache(max_entries=10, ttl=5)
+    cache.set("a", 1)
+
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_stats_count_hits_and_the_time_they_saved():
+    cache = LRUCache(max_entries=10, ttl=0)
+    cache.set("a", 1, cost=0.25)
+
+    for key in ["a", "a", "b", "a"]:
+        cache.get(key)
+
+    assert cache.stats() == {
+        "hits": 3,
+        "misses": 1,
+        "hit_ratio": 0.75,
+        "seconds_saved": 0.75,
+        "entries": 1,
+    }
+
+
+def test_only_queries_not_in_the_cache_are_embedded():
+    embeddings = CountingEmbeddings()
+    cache = QueryCache(max_entries=10, ttl=0)
+    cached = QueryEmbeddingCache(embeddings, cache.embeddings)
+    cached.embed_query("budget")
+
+    vectors = cached.embed_queries(["budget", "roads", "roads"])
+
+    assert vectors == [[6.0], [5.0], [5.0]]
+    assert embeddings.embedded == ["budget", "roads"]
+    assert cache.stats()["embeddings"]["hits"] == 1
+    # documents are never cached
+    cached.embed_documents(["budget"])
+    assert embeddings.embedded == ["budget", "roads", "budget"]
+
+
+def test_generations_count_changes_per_index():
+    generations = IndexGenerations()
+
+    generations.bump("minutes")
+
+    assert (generations.get("minutes"), generations.get("other")) == (1, 0)
+    assert generations.bump("minutes") == 2
@@ -0,0 +1,147 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hackathon.transcripts.transcript_handling import TEXT_DTYPE, Transcript
+
+
+def transcript_csv(n_rows: int = 500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(
+        {
+            "Time": rng.integers(0, 100, n_rows).astype(float),
+            "Speaker": rng.choice(["Chair", "Ms Brown", "Mr Hobbs"], n_rows),
+            "Text": [f"turn {i}" for i in range(n_rows)],
+        }
+    )
+    data.loc[rng.random(n_rows) < 0.05, "Time"] = np.nan
+    return data
+
+
+def read(data: pd.DataFrame, chunksize) -> Transcript:
+    return Transcript(io.StringIO(data.to_csv(index=False)), chunksize=chunksize)
+
+
+def test_blank_time_in_unsorted_csv_goes_last():
+    transcript = Transcript(io.StringIO("Time,Speaker,Text\n3,A,c\n,B,x\n1,A,a\n"))
+
+    assert transcript.data["Text"].tolist() == ["a", "c", "x"]
+    assert transcript.data["Time"].isna().tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize("chunksize", [17, 100, 1000, None])
+def test_chunked_read_matches_stable_sort(chunksize):
+    data = transcript_csv()
+
+    transcript = read(data, chunksize)
+
+    expected = data.sort_values("Time", kind="stable")
+    assert transcript.data["Text"].tolist() == expected["Text"].tolist()
+    assert transcript.data["Time"].isna().sum() == expected["Time"].isna().sum()
+
+
+def test_sorted_csv_keeps_file_order():
+    data = transcript_csv().sort_values("Time", kind="stable")
+
+    transcript = read(data, chunksize=50)
+
+    assert transcript.data["Text"].tolist() == data["Text"].tolist()
+
+
+def test_csv_columns_are_typed():
+    transcript = read(transcript_csv(), chunksize=50)
+
+    assert transcript.data["Text"].dtype == TEXT_DTYPE
+    assert list(transcript.data["Speaker"].cat.categories) == [
+        "Chair",
+        "Mr Hobbs",
+        "Ms Brown",
+    ]
+
+
+def test_missing_text_renders_empty():
+    transcript = Transcript(io.StringIO("Time,Speaker,Text\n1,A,\n2,B,b\n"))
+
+    assert str(transcript) == "\n\nA: \n\nB: b"
+
+
+@pytest.fixture
+def saved_transcripts(tmp_path):
+    transcript = Transcript(io.StringIO("time,speaker,text,extra\n1,A,\n2,B,b,x\n"))
+    paths = {}
+    for extension in [".csv", ".parquet", ".arrow"]:
+        paths[extension] = tmp_path / f"transcript{extension}"
+        transcript.save_transcript(str(paths[extension]))
+    return paths
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".arrow"])
+def test_formats_read_the_same(saved_transcripts, extension):
+    transcript = Transcript(str(saved_transcripts[extension]))
+
+    assert transcript.data["Text"].dtype == TEXT_DTYPE
+    assert str(transcript) == "\n\nA: \n\nB: b"
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".arrow"])
+@pytest.mark.parametrize("columns", [["speaker", "text"], ["Speaker", "TEXT"]])
+def test_columns_match_in_any_case(saved_transcripts, extension, columns):
+    transcript = Transcript(str(saved_transcripts[extension]), columns=columns)
+
+    assert list(transcript.data.columns) == ["Speaker", "Text", "Approved?"]
+
+
+def meeting() -> Transcript:
+    return Transcript(
+        data=pd.DataFrame(
+            {
+                "Time": ["12:01", "12:02", "12:03"],
+                "Speaker": ["Chair", "Ms Brown", "Chair"],
+                "Text": ["Order.", "So moved.", "Agreed."],
+            }
+        )
+    )
+
+
+def test_update_data_records_row_edits():
+    transcript = meeting()
+    str(transcript)
+    data = transcript.data.copy()
+    data.loc[1, "Text"] = "Seconded."
+    data = data.drop(index=2)
+    data.loc[5] = ["12:04", "Mr Hobbs", "Aye.", False]
+
+    transcript.update_data(data)
+
+    assert transcript.version == 1
+    assert {(c.row, c.kind, c.column) for c in transcript.changes} == {
+        (2, "removed", None),
+        (5, "added", None),
+        (1, "changed", "Text"),
+    }
+    assert transcript.rows_changed_since(0) == {1, 2, 5}
+    assert str(transcript) == (
+        "\n\nChair: Order.\n\nMs Brown: Seconded.\n\nMr Hobbs: Aye."
+    )
+
+
+def test_update_data_without_edits_keeps_version():
+    transcript = meeting()
+
+    transcript.update_data(transcript.data.copy())
+
+    assert transcript.version == 0
+    assert transcript.changes == []
+
+
+def test_update_data_with_duplicate_index_replaces():
+    transcript = meeting()
+    data = pd.concat([transcript.data, transcript.data.iloc[:1]])
+
+    transcript.update_data(data)
+
+    assert [change.kind for change in transcript.changes_since(0)] == ["replaced"]
+    assert transcript.rows_changed_since(0) is None
+    assert str(transcript).endswith("Chair: Agreed.\n\nChair: Order.")
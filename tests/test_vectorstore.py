@@ -0,0 +1,319 @@
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from opensearchpy.exceptions import ConnectionError, TransportError
+
+from config.settings import (
+    HYBRID_RANK_CONSTANT,
+    OPENSEARCH_HYBRID_PIPELINE,
+    OPENSEARCH_REFRESH_INTERVAL,
+    OPENSEARCH_REPLICAS,
+    OPENSEARCH_TRANSFORM_INDEX,
+)
+from hackathon.constants.constants import SOURCE_KEY_FIELD
+from hackathon.vectorstore import vectorstore
+from hackathon.vectorstore.hybrid import rrf_pipeline
+from hackathon.vectorstore.index_config import (
+    TRANSFORM_META,
+    IndexConfig,
+    load_transform,
+)
+from hackathon.vectorstore.query_cache import QueryCache, index_generations
+from hackathon.vectorstore.vectorstore import OpensearchClientStore, OpenSearchStore
+from tests.fake_opensearch import FakeOpenSearch
+
+VOCABULARY = ["budget", "housing", "parks", "roads", "schools"]
+
+
+class WordCountEmbeddings(Embeddings):
+    """Embeds a text as the count of each vocabulary word in it."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(words.count(word)) for word in VOCABULARY]
+
+
+@pytest.fixture(autouse=True)
+def no_embedding_cache(monkeypatch):
+    monkeypatch.setattr(vectorstore, "cache_embeddings", lambda e: e)
+
+
+@pytest.fixture
+def cluster() -> FakeOpenSearch:
+    return FakeOpenSearch()
+
+
+def client_store(cluster: FakeOpenSearch, **kwargs) -> OpensearchClientStore:
+    store = OpensearchClientStore(
+        WordCountEmbeddings(),
+        "minutes",
+        SimpleNamespace(client=cluster, opensearch_endpoint="http://localhost:9200"),
+        **{"grace_period": 0, "retries": 0, "backoff": 0, **kwargs},
+    )
+    store.vectorstore.client = cluster
+    return store
+
+
+def search_store(cluster: FakeOpenSearch, **kwargs) -> OpenSearchStore:
+    store = OpenSearchStore(
+        WordCountEmbeddings(),
+        "minutes",
+        SimpleNamespace(client=cluster, opensearch_endpoint="http://localhost:9200"),
+        **kwargs,
+    )
+    store.vectorstore.client = cluster
+    return store
+
+
+def documents(count: int = len(VOCABULARY)) -> List[Document]:
+    return [
+        Document(
+            page_content=f"{word} {word} {VOCABULARY[i - 1]}",
+            metadata={SOURCE_KEY_FIELD: word},
+        )
+        for i, word in enumerate(VOCABULARY[:count])
+    ]
+
+
+def test_transform_is_stored_as_a_document_not_in_the_mapping(cluster):
+    store = client_store(cluster, index_config=IndexConfig(pca_dimensions=2))
+
+    store.store_data(documents())
+
+    assert TRANSFORM_META not in cluster.indexes["minutes"].mappings.get("_meta", {})
+    assert set(cluster.documents(OPENSEARCH_TRANSFORM_INDEX)) == {"minutes"}
+    transform = load_transform(cluster, "minutes")
+    assert (transform.samples, transform.pca_dimensions) == (5, 2)
+
+
+def test_transform_kept_in_the_mapping_of_older_indexes_is_loaded(cluster):
+    store = client_store(cluster, index_config=IndexConfig(pca_dimensions=2))
+    store.store_data(documents())
+    meta = cluster.documents(OPENSEARCH_TRANSFORM_INDEX).pop("minutes")["transform"]
+    cluster.indices.put_mapping(index="minutes", body={"_meta": {TRANSFORM_META: meta}})
+
+    assert load_transform(cluster, "minutes").samples == 5
+
+
+def test_undersampled_transform_is_refitted_by_a_sync(cluster):
+    store = client_store(cluster, index_config=IndexConfig(pca_dimensions=4))
+    store.store_data(documents(2))
+    store.sync_data(documents())
+    assert load_transform(cluster, "minutes").undersampled
+
+    report = store.sync_data(documents())
+
+    transform = load_transform(cluster, "minutes")
+    assert (transform.samples, transform.undersampled) == (5, False)
+    assert report.docs_indexed == 5
+    assert cluster.count(index="minutes")["count"] == 5
+    # the transform of the index the alias replaced went with it
+    assert set(cluster.documents(OPENSEARCH_TRANSFORM_INDEX)) == set(
+        cluster.aliases["minutes"]
+    )
+
+
+def test_transform_fitted_to_a_full_sample_is_kept_by_a_sync(cluster):
+    store = client_store(cluster, index_config=IndexConfig(pca_dimensions=2))
+    store.store_data(documents())
+
+    report = store.sync_data(documents())
+
+    assert (report.docs_indexed, report.unchanged) == (0, 5)
+    assert not cluster.aliases
+
+
+class Clock:
+    """Stands in for the time module, which only moves on when told to."""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def time_ns(self) -> int:
+        return int(self.now * 1e9)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(vectorstore.time, "time", clock.time)
+    monkeypatch.setattr(vectorstore.time, "time_ns", clock.time_ns)
+    return clock
+
+
+def test_reindex_swaps_the_alias_to_a_complete_new_index(cluster, clock):
+    store = client_store(cluster)
+    store.store_data(documents())
+
+    report = store.reindex_data(documents())
+
+    (new_index,) = cluster.aliases["minutes"]
+    assert new_index == f"minutes-v{clock.time_ns() // 1_000_000}"
+    assert report.docs_indexed == 5 and cluster.count(index="minutes")["count"] == 5
+    settings = cluster.indexes[new_index].settings
+    assert settings["refresh_interval"] == OPENSEARCH_REFRESH_INTERVAL
+    assert settings["number_of_replicas"] == OPENSEARCH_REPLICAS
+    # the index first created under the name is dropped by the same request
+    assert cluster.alias_updates == [
+        [
+            {"add": {"index": new_index, "alias": "minutes"}},
+            {"remove_index": {"index": "minutes"}},
+        ]
+    ]
+    assert set(cluster.indexes) == {new_index}
+
+
+def test_replaced_indexes_are_deleted_after_the_grace_period(cluster, clock):
+    store = client_store(cluster, grace_period=60)
+    store.reindex_data(documents())
+    (first,) = cluster.aliases["minutes"]
+    clock.advance(1)
+
+    store.reindex_data(documents())
+
+    (second,) = cluster.aliases["minutes"]
+    assert cluster.alias_updates[-1] == [
+        {"add": {"index": second, "alias": "minutes"}},
+        {"remove": {"index": first, "alias": "minutes"}},
+    ]
+    assert cluster.indexes[first].mappings["_meta"]["retired_at"] == clock.now
+    assert store.collect_old_indexes() == []
+    clock.advance(60)
+    assert store.collect_old_indexes() == [first]
+    assert set(cluster.indexes) == {second}
+
+
+def test_indexes_not_yet_swapped_in_are_never_collected(cluster, clock):
+    store = client_store(cluster)
+    store.reindex_data(documents())
+    cluster.indices.create(index="minutes-v1")
+
+    assert store.collect_old_indexes() == []
+    assert "minutes-v1" in cluster.indexes
+
+
+class FailingEmbeddings(WordCountEmbeddings):
+    """Fails to embed any batch holding a text about roads."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if any("roads" in text for text in texts):
+            raise RuntimeError("embedding endpoint rejected the batch")
+        return super().embed_documents(texts)
+
+
+def test_reindex_with_dead_letters_keeps_the_current_index(cluster, clock, monkeypatch):
+    store = client_store(cluster)
+    store.reindex_data(documents())
+    live = set(cluster.aliases["minutes"])
+    clock.advance(1)
+    monkeypatch.setattr(vectorstore, "OPENSEARCH_BATCH_SIZE", 1)
+    store.embedding_function = FailingEmbeddings()
+
+    report = store.reindex_data(documents())
+
+    assert sorted(doc.page_content for doc in report.dead_letter_documents()) == [
+        "roads roads parks",
+        "schools schools roads",
+    ]
+    assert cluster.aliases["minutes"] == live
+    assert set(cluster.indexes) == live
+    assert len(cluster.alias_updates) == 1
+
+
+def test_hybrid_pipeline_is_created_with_the_index(cluster):
+    store = client_store(cluster)
+
+    store.create_store()
+
+    ((method, url, body),) = cluster.transport.requests
+    assert (method, url) == ("PUT", f"/_search/pipeline/{OPENSEARCH_HYBRID_PIPELINE}")
+    assert body == rrf_pipeline(HYBRID_RANK_CONSTANT)
+    assert not client_store(cluster, hybrid_pipeline="").create_hybrid_pipeline()
+    assert len(cluster.transport.requests) == 1
+
+
+def test_every_change_to_the_index_starts_a_new_generation(cluster, clock):
+    store = client_store(cluster)
+    generations = [index_generations.get("minutes")]
+
+    store.store_data(documents())
+    generations.append(index_generations.get("minutes"))
+    store.sync_data(documents(3))
+    generations.append(index_generations.get("minutes"))
+    store.reindex_data(documents())
+    generations.append(index_generations.get("minutes"))
+
+    assert generations == sorted(set(generations))
+
+
+def test_results_cached_from_an_older_generation_are_not_served(cluster):
+    loader = client_store(cluster)
+    loader.store_data(documents())
+    store = search_store(cluster, cache=QueryCache(max_entries=10, ttl=0))
+    searches = []
+
+    def search(query, k):
+        searches.append(query)
+        return [(Document(page_content=query), 1.0)]
+
+    store.vectorstore.similarity_search_with_score = search
+
+    store.retrieve_data_with_score("budget")
+    store.retrieve_data_with_score("budget")
+    loader.store_data(documents(1))
+    store.retrieve_data_with_score("budget")
+
+    assert searches == ["budget", "budget"]
+    assert store.cache_stats()["results"]["hits"] == 1
+
+
+class NoPipelineCluster(FakeOpenSearch):
+    """Cluster which fails hybrid queries with error, answering multi searches instead."""
+
+    def __init__(self, error: Exception):
+        super().__init__()
+        self.error = error
+        self.hybrid_queries = 0
+
+    def search(self, index: str, body: Dict, **kwargs) -> Dict:
+        if "hybrid" in body.get("query", {}):
+            self.hybrid_queries += 1
+            raise self.error
+        return super().search(index, body, **kwargs)
+
+    def msearch(self, body: List[Dict]) -> Dict:
+        hits = self.search(body[0]["index"], {})["hits"]
+        return {"responses": [{"hits": hits}] * (len(body) // 2)}
+
+
+@pytest.mark.parametrize(
+    "error, hybrid_queries",
+    [
+        (TransportError(400, "illegal_argument_exception", "no pipeline"), 1),
+        (TransportError(403, "security_exception", "not permitted"), 1),
+        # a dropped connection doesn't mean the pipeline is unsupported
+        (ConnectionError("N/A", "connection reset", None), 2),
+    ],
+)
+def test_failed_hybrid_queries_fall_back_to_client_side_fusion(error, hybrid_queries):
+    cluster = NoPipelineCluster(error)
+    client_store(cluster).store_data(documents())
+    store = search_store(cluster, cache=None)
+
+    for _ in range(2):
+        results = store.hybrid_search("parks budget", k=2)
+
+    assert len(results) == 2
+    assert cluster.hybrid_queries == hybrid_queries